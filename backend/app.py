@@ -7,26 +7,115 @@ from flask import (
     url_for,
     session,
     jsonify,
-    send_file
+    Response,
+    g,
+    has_request_context
 )
 import sqlite3
-import csv
-import io
 import re
 import random
+import base64
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import requests
 
 from flask_cors import CORS
-from twilio.rest import Client
-import firebase_admin
-from firebase_admin import credentials, messaging
+
+from db_pool import ConnectionPool, PooledConnection, SnapshotConnection
+import log_config
+from migrations import SCHEMA_VERSION, SQL_NOW, run_migrations, get_schema_version
+from ttl_cache import TTLCache
+from scheduler import RecurringTaskScheduler
+from archiver import TaskArchiver
+import search
+from serialize import (PROJECT_FIELDS, TODO_FIELDS, RowSet, parse_shape, project_dict, task_dict, to_json,
+                       todo_dict, tuple_cursor)
+from events import EventBus
+from otp_store import (
+    MemoryOtpStore,
+    OtpRateLimited,
+    SqliteOtpStore,
+    VERIFY_EXPIRED,
+    VERIFY_LOCKED,
+    VERIFY_MISSING,
+    VERIFY_OK
+)
+from push import FcmSender, PushNotifier, StubSender
+from sms_queue import FakeSmsTransport, SmsQueue, TwilioTransport
+from importer import (
+    GroupImporter,
+    ImportValidationError,
+    RECORD_TYPES,
+    validate_payload,
+    validate_record
+)
+from exports import (
+    ExportArgsError,
+    HISTORY_EXPORT_COLUMNS,
+    PROJECT_EXPORT_COLUMNS,
+    parse_export_args,
+    stream_csv,
+    stream_group_archive,
+    stream_xlsx_export
+)
 
 app = Flask(__name__)
 app.secret_key = "my-very-strong-secret-key"  # Change this to something secure
 CORS(app)
 
-DATABASE = os.path.join(app.root_path, 'database.db')
+def current_request_id():
+    if has_request_context():
+        return g.get("request_id")
+    return None
+
+logger = logging.getLogger(log_config.APP_LOGGER)
+
+DATABASE = os.environ.get("DATABASE_PATH") or os.path.join(app.root_path, 'database.db')
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+db_pool = ConnectionPool(DATABASE, max_size=DB_POOL_SIZE)
+# Streaming exports check out connections from their own small pool, one short
+# checkout per chunk (see exports.py), so downloads never take API connections.
+# A chunk that cannot get a connection within the timeout aborts its download.
+export_pool = ConnectionPool(DATABASE, max_size=int(os.environ.get("EXPORT_POOL_SIZE", "2")),
+                             timeout=float(os.environ.get("EXPORT_POOL_TIMEOUT", "10")))
+# Live change feed behind /api/events, see events.py.
+event_bus = EventBus()
+
+def publish_change(group_id, entity: str, op: str, entity_id, fields: dict):
+    # entity: "task" or "project_todo"; op: "create", "update" or "delete".
+    # fields holds the full row for creates, only the changed columns for
+    # updates and is empty for deletes. Bulk endpoints use
+    # publish_bulk_changes() instead.
+    if group_id in (None, ""):
+        return
+    event_bus.publish(group_id, entity, {"op": op, "id": entity_id, "fields": fields})
+
+def publish_bulk_changes(entity: str, changes):
+    # changes: (group_id, op, entity_id, fields) tuples. Published as one
+    # {"op": "bulk", "changes": [{"op", "id", "fields"}, ...]} event per group.
+    by_group = {}
+    for group_id, op, entity_id, fields in changes:
+        if group_id in (None, ""):
+            continue
+        by_group.setdefault(str(group_id), []).append({"op": op, "id": entity_id, "fields": fields})
+    for group_id, items in by_group.items():
+        event_bus.publish(group_id, entity, {"op": "bulk", "changes": items})
+
+def publish_scheduler_changes(changes):
+    for group_id, op, task_id, fields in changes:
+        publish_change(group_id, "task", op, task_id, fields)
+
+recurring_scheduler = RecurringTaskScheduler(
+    db_pool.connection,
+    poll_interval=float(os.environ.get("SCHEDULER_POLL_SECONDS", "60")),
+    listener=publish_scheduler_changes
+)
 LIVE_BASE_URL = "https://molentracker.ermine.at"
 
 ######################### TWILIO CONFIGURATION #########################
@@ -35,21 +124,64 @@ TWILIO_AUTH_TOKEN = "4799cd1a4a179d21f1fc1083aab66736"
 TWILIO_FROM_NUMBER = "+14243294447"
 #########################################################################
 
+# OTP texts go out from background workers, see sms_queue.py. SMS_TRANSPORT=fake
+# swaps Twilio for a local stand-in (development, load tests).
+if os.environ.get("SMS_TRANSPORT") == "fake":
+    sms_transport = FakeSmsTransport(latency=float(os.environ.get("FAKE_SMS_LATENCY", "0")))
+else:
+    sms_transport = TwilioTransport(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER)
+sms_queue = SmsQueue(sms_transport, workers=int(os.environ.get("SMS_WORKERS", "4")))
+
 PHONE_TO_USERNAME = {
     "+436703596614": "otter",
     "+4369910503659": "weasel"
 }
 
-pending_otps = {}
+# Pending OTP codes. The SQLite store (default) is shared by all worker
+# processes; OTP_STORE=memory keeps them in this process only.
+_otp_settings = dict(
+    ttl=float(os.environ.get("OTP_TTL_SECONDS", "300")),
+    rate_limit=int(os.environ.get("OTP_RATE_LIMIT", "5")),
+    rate_window=float(os.environ.get("OTP_RATE_WINDOW_SECONDS", "900")),
+)
+if os.environ.get("OTP_STORE", "sqlite") == "memory":
+    otp_store = MemoryOtpStore(**_otp_settings)
+else:
+    otp_store = SqliteOtpStore(db_pool.connection, **_otp_settings)
+
+# username -> frozenset of permission names. Entries expire after the TTL and
+# are dropped explicitly whenever an endpoint changes a user's groups or the
+# permission table, so the TTL only bounds staleness across worker processes.
+permission_cache = TTLCache(
+    maxsize=int(os.environ.get("PERMISSION_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("PERMISSION_CACHE_TTL", "60"))
+)
 
-# ----- Firebase Admin Initialization -----
-try:
-    cred = credentials.Certificate("service-account.json")
-    firebase_admin.initialize_app(cred)
-    log_msg = "Firebase Admin initialized successfully."
-except Exception as e:
-    log_msg = f"Error initializing Firebase Admin: {e}"
-print(f"[DEBUG] {log_msg}")
+# Task events are pushed to the group's devices from a background thread, see
+# push.py. PUSH_SENDER=stub records the multicasts instead of calling FCM;
+# ENABLE_PUSH_NOTIFIER=0 keeps the thread from starting.
+push_notifier = PushNotifier(
+    db_pool.connection,
+    StubSender() if os.environ.get("PUSH_SENDER") == "stub"
+    else FcmSender(os.environ.get("FIREBASE_CREDENTIALS", "service-account.json")),
+    window=float(os.environ.get("PUSH_COALESCE_SECONDS", "2")),
+    due_poll_interval=float(os.environ.get("PUSH_DUE_POLL_SECONDS", "60"))
+)
+
+# Completed tasks older than ARCHIVE_AFTER_DAYS move to tasks_archive in the
+# background, see archiver.py. 0 (or ENABLE_ARCHIVER=0) turns archiving off.
+ARCHIVE_AFTER_DAYS = float(os.environ.get("ARCHIVE_AFTER_DAYS", "90"))
+
+def publish_archived_tasks(changes):
+    publish_bulk_changes("task", changes)
+
+task_archiver = TaskArchiver(
+    db_pool.connection,
+    max_age_days=ARCHIVE_AFTER_DAYS,
+    batch_size=int(os.environ.get("ARCHIVE_BATCH_SIZE", "500")),
+    interval=float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", "3600")),
+    listener=publish_archived_tasks
+)
 
 def normalize_phone(phone: str) -> str:
     p = re.sub(r"[^0-9+]", "", phone)
@@ -61,25 +193,36 @@ def generate_otp_code() -> str:
     return f"{random.randint(0,999999):06d}"
 
 def send_otp_sms(phone: str, code: str):
-    body_text = f"Your OTP code is: {code}"
-    try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        message = client.messages.create(
-            body=body_text,
-            from_=TWILIO_FROM_NUMBER,
-            to=phone
-        )
-        log(f"[send_otp_sms] Sent OTP {code} to phone={phone}, SID={message.sid}")
-    except Exception as e:
-        log(f"[send_otp_sms] Error sending OTP via Twilio: {e}")
+    # Only enqueues the text; delivery, retries and latency tracking happen in sms_queue.
+    if sms_queue.submit(phone, f"Your OTP code is: {code}"):
+        log("[send_otp_sms] Queued OTP %s for phone=%s", code, phone)
+    else:
+        log("[send_otp_sms] SMS queue full, OTP for phone=%s was not sent", phone)
 
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def log(msg):
-    print(f"[DEBUG] {msg}")
+    # Inside a request every caller shares one pooled connection, which is
+    # handed back to the pool in close_db_connection() on teardown. Outside a
+    # request (startup, background work) close() returns it immediately.
+    if has_request_context():
+        conn = g.get("db")
+        if conn is None:
+            conn = g.db = PooledConnection(db_pool, db_pool.acquire(), release_on_close=False)
+        return conn
+    return PooledConnection(db_pool, db_pool.acquire())
+
+@app.teardown_appcontext
+def close_db_connection(exc):
+    conn = g.pop("db", None)
+    if conn is not None:
+        conn.release()
+
+# Debug lines are %-style so that the arguments are only formatted when the
+# "tasktracker" logger is enabled for DEBUG (see log_config.py).
+def log(msg, *args):
+    logger.debug(msg, *args)
+
+def log_error(msg, *args):
+    logger.error(msg, *args)
 
 @app.template_filter("human_date")
 def human_date(value):
@@ -95,10 +238,11 @@ def time_taken(created_str, completed_str):
     dt_created = datetime.fromisoformat(created_str)
     dt_completed = datetime.fromisoformat(completed_str)
     diff = dt_completed - dt_created
-    days = diff.days
-    secs = diff.seconds
-    hours = secs // 3600
-    minutes = (secs % 3600) // 60
+    return format_duration(diff.days * 1440 + diff.seconds // 60)
+
+def format_duration(total_minutes) -> str:
+    days, rest = divmod(int(total_minutes), 1440)
+    hours, minutes = divmod(rest, 60)
     parts = []
     if days:
         parts.append(f"{days}d")
@@ -118,68 +262,72 @@ def requires_permission(permission_name):
     def decorator(f):
         def wrapper(*args, **kwargs):
             data = request.get_json(silent=True) or {}
-            log(f"[requires_permission] Request JSON: {data}")
+            log("[requires_permission] Request JSON: %s", data)
             username = session.get('username')
             if not username:
                 username = data.get("creator")
                 if username:
                     session['username'] = username
-                    log(f"[requires_permission] Set session username from request data: {username}")
+                    log("[requires_permission] Set session username from request data: %s", username)
                 else:
                     log("[requires_permission] Not authenticated: No session and no creator provided in request")
                     return jsonify({"error": "Not authenticated"}), 401
-            log(f"[requires_permission] Authenticated as: {session.get('username')}")
             user_perms = get_user_permissions(session.get('username'))
-            log(f"[requires_permission] Permissions for {session.get('username')}: {user_perms}")
             if permission_name not in user_perms:
-                log(f"[requires_permission] Permission '{permission_name}' required, but user '{session.get('username')}' permissions: {user_perms}")
+                log("[requires_permission] Permission '%s' required, but user '%s' permissions: %s", permission_name, session.get('username'), user_perms)
                 return jsonify({"error": "Permission denied", "required": permission_name}), 403
             return f(*args, **kwargs)
         wrapper.__name__ = f.__name__
         return wrapper
     return decorator
 
-def get_user_permissions(username: str) -> set:
+def get_user_permissions(username: str) -> frozenset:
+    permissions = permission_cache.get(username)
+    if permissions is not None:
+        return permissions
+    # Taken before the read, so an invalidation racing with it wins.
+    generation = permission_cache.generation(username)
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT group_id FROM user_groups WHERE username=?", (username,))
-    group_rows = cursor.fetchall()
-    groups = [row["group_id"] for row in group_rows]
-    permissions = set()
-    if groups:
-        placeholder = ','.join('?' * len(groups))
-        cursor.execute(f"""
-            SELECT p.name FROM permissions p 
-            JOIN group_permissions gp ON p.id = gp.permission_id 
-            WHERE gp.group_id IN ({placeholder})
-        """, groups)
-        perm_rows = cursor.fetchall()
-        for row in perm_rows:
-            permissions.add(row["name"])
+    cursor.execute("""
+        SELECT DISTINCT p.name FROM user_groups ug
+        JOIN group_permissions gp ON gp.group_id = ug.group_id
+        JOIN permissions p ON p.id = gp.permission_id
+        WHERE ug.username=?
+    """, (username,))
+    permissions = frozenset(row["name"] for row in cursor.fetchall())
     conn.close()
-    log(f"[get_user_permissions] User '{username}' has permissions: {permissions}")
+    permission_cache.set(username, permissions, generation)
+    log("[get_user_permissions] Loaded permissions for '%s': %s", username, sorted(permissions))
     return permissions
 
-def create_table_if_not_exists(cursor, table_name, create_sql):
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-    result = cursor.fetchone()
-    if result is None:
-        log(f"Table '{table_name}' does not exist. Creating it with SQL: {create_sql}")
+def create_table_if_not_exists(cursor, table_name, create_sql, existing=None):
+    # existing: set of table names read once by the caller, saves one probe per table.
+    if existing is None:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+        exists = cursor.fetchone() is not None
+    else:
+        exists = table_name in existing
+    if not exists:
+        log("Table '%s' does not exist. Creating it with SQL: %s", table_name, create_sql)
         cursor.execute(create_sql)
-        log(f"Table '{table_name}' created.")
+        log("Table '%s' created.", table_name)
     else:
-        log(f"Table '{table_name}' already exists.")
+        log("Table '%s' already exists.", table_name)
 
 def init_db():
     log("Initializing database...")
-    new_db = not os.path.exists(DATABASE)
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    if new_db:
-        log("No database file found. Creating all tables.")
+    # The pool has already created the file by now, so a new database is one
+    # that is still unversioned and has no tables yet.
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    existing = {row["name"] for row in cursor.fetchall()}
+    if get_schema_version(conn) == 0 and not existing:
+        log("New database. Creating all tables.")
     else:
-        log("Database file exists. Running CREATE TABLE IF NOT EXISTS for all tables.")
+        log("Database exists. Running CREATE TABLE IF NOT EXISTS for all tables.")
 
     # Create tasks table (now with project_id)
     create_table_if_not_exists(cursor, "tasks", '''
@@ -198,7 +346,7 @@ def init_db():
             group_id TEXT,
             project_id INTEGER
         )
-    ''')
+    ''', existing)
     # Create device_tokens table
     create_table_if_not_exists(cursor, "device_tokens", '''
         CREATE TABLE device_tokens (
@@ -206,7 +354,7 @@ def init_db():
             username TEXT,
             token TEXT
         )
-    ''')
+    ''', existing)
     # Create projects table
     create_table_if_not_exists(cursor, "projects", '''
         CREATE TABLE projects (
@@ -217,7 +365,7 @@ def init_db():
             creation_date TEXT,
             group_id TEXT
         )
-    ''')
+    ''', existing)
     # Create project_todos table
     create_table_if_not_exists(cursor, "project_todos", '''
         CREATE TABLE project_todos (
@@ -235,7 +383,7 @@ def init_db():
             completed_on TEXT,
             FOREIGN KEY(project_id) REFERENCES projects(id)
         )
-    ''')
+    ''', existing)
     # Create project_assignments table (new)
     create_table_if_not_exists(cursor, "project_assignments", '''
         CREATE TABLE project_assignments (
@@ -244,7 +392,7 @@ def init_db():
             username TEXT NOT NULL,
             FOREIGN KEY(project_id) REFERENCES projects(id)
         )
-    ''')
+    ''', existing)
     # Create users table
     create_table_if_not_exists(cursor, "users", '''
         CREATE TABLE users (
@@ -252,7 +400,7 @@ def init_db():
             phone TEXT UNIQUE NOT NULL,
             username TEXT UNIQUE NOT NULL
         )
-    ''')
+    ''', existing)
     # Create groups table
     create_table_if_not_exists(cursor, "groups", '''
         CREATE TABLE groups (
@@ -261,7 +409,7 @@ def init_db():
             description TEXT,
             creator TEXT
         )
-    ''')
+    ''', existing)
     # Create permissions table
     create_table_if_not_exists(cursor, "permissions", '''
         CREATE TABLE permissions (
@@ -269,7 +417,7 @@ def init_db():
             name TEXT UNIQUE NOT NULL,
             description TEXT
         )
-    ''')
+    ''', existing)
     # Create group_permissions mapping table
     create_table_if_not_exists(cursor, "group_permissions", '''
         CREATE TABLE group_permissions (
@@ -279,7 +427,7 @@ def init_db():
             FOREIGN KEY(group_id) REFERENCES groups(id),
             FOREIGN KEY(permission_id) REFERENCES permissions(id)
         )
-    ''')
+    ''', existing)
     # Create user_groups mapping table
     create_table_if_not_exists(cursor, "user_groups", '''
         CREATE TABLE user_groups (
@@ -289,7 +437,7 @@ def init_db():
             role TEXT DEFAULT 'user',
             FOREIGN KEY(group_id) REFERENCES groups(id)
         )
-    ''')
+    ''', existing)
     # Create sops table
     create_table_if_not_exists(cursor, "sops", '''
         CREATE TABLE sops (
@@ -301,7 +449,7 @@ def init_db():
             effective_date TEXT,
             group_id TEXT
         )
-    ''')
+    ''', existing)
     # Create sop_agreements table
     create_table_if_not_exists(cursor, "sop_agreements", '''
         CREATE TABLE sop_agreements (
@@ -312,7 +460,7 @@ def init_db():
             sop_version TEXT NOT NULL,
             FOREIGN KEY(sop_id) REFERENCES sops(id)
         )
-    ''')
+    ''', existing)
     cursor.execute('SELECT COUNT(*) as count FROM tasks')
     count_tasks = cursor.fetchone()['count']
     if count_tasks == 0:
@@ -322,24 +470,13 @@ def init_db():
         cursor.execute("INSERT INTO tasks (title, creation_date, group_id) VALUES (?, ?, ?)", ("Küche", now_str, "default"))
         cursor.execute("INSERT INTO tasks (title, creation_date, group_id) VALUES (?, ?, ?)", ("kochen", now_str, "default"))
         conn.commit()
-    conn.close()
-    log("Database init complete.")
-    # Now upgrade the tasks table if needed:
-    upgrade_tasks_table()
-
-def upgrade_tasks_table():
-    log("Checking if tasks table needs upgrade for column 'project_id'")
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA table_info(tasks)")
-    columns = [row["name"] for row in cursor.fetchall()]
-    if "project_id" not in columns:
-        log("Upgrading tasks table: adding 'project_id' column")
-        cursor.execute("ALTER TABLE tasks ADD COLUMN project_id INTEGER")
-        conn.commit()
+    applied = run_migrations(conn)
+    if applied:
+        log("Applied schema migrations %s; schema version is now %s", applied, get_schema_version(conn))
     else:
-        log("No upgrade needed for tasks table")
+        log("Schema is up to date (version %s)", get_schema_version(conn))
     conn.close()
+    log("Database init complete.")
 
 def get_registered_users():
     conn = get_db_connection()
@@ -348,17 +485,288 @@ def get_registered_users():
     rows = cursor.fetchall()
     conn.close()
     users = [row["username"] for row in rows]
-    log(f"[get_registered_users] Found {len(users)} registered user(s).")
+    log("[get_registered_users] Found %s registered user(s).", len(users))
     return users
 
+@app.before_request
+def start_on_first_request():
+    if not _started:
+        ensure_started()
+
+@app.before_request
+def assign_request_id():
+    # Clients and proxies may pass their own id; it is echoed back and attached to every log line.
+    g.request_id = (request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16])[:64]
+
 @app.after_request
 def add_header(response):
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+    if "request_id" in g:
+        response.headers["X-Request-ID"] = g.request_id
+    # Routes that support conditional requests set their own Cache-Control.
+    if "Cache-Control" not in response.headers:
+        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
     return response
 
+# ---------------- Pagination / Delta Sync ----------------
+# /api/tasks and /api/history accept:
+#   ?limit=N            page size (max TASK_PAGE_MAX); without it all rows are returned
+#   ?after_id=ID        keyset pagination: only rows with id > ID, ordered by id
+#   ?updated_since=TS   delta mode: only rows with updated_at > TS, ordered by (updated_at, id)
+#   ?cursor=TOKEN       continue from the X-Next-Cursor header of a previous page
+#   ?shape=columns      {"columns": [...], "rows": [[...], ...]} instead of a list
+#                       of objects (see serialize.py)
+# By default the body stays a plain JSON list. X-Next-Cursor is only set when
+# there are more rows; X-Sync-Token is the updated_since value to use for the
+# next delta poll. It encodes the (updated_at, id) of the newest row the client
+# has seen, and deltas compare (updated_at, id) like the keyset cursor does, so
+# rows sharing an updated_at millisecond are never skipped. A plain timestamp
+# is still accepted as updated_since and includes rows at that timestamp. The
+# page and its token are read in one transaction, i.e. from one snapshot.
+# Delta responses also report tasks that were deleted (or archived) since the
+# token, from the deleted_tasks tombstones (migration 3). Their body is an
+# object instead of a list: {"tasks": [...], "removed": [id, ...]}, or
+# {"columns", "rows", "removed"} with shape=columns. Tombstones share the
+# (updated_at, id) order with the live rows and count towards ?limit.
+# Responses carry an ETag and answer If-None-Match with 304.
+TASK_PAGE_MAX = 1000
+
+def encode_cursor(*parts) -> str:
+    raw = "|".join(str(p) for p in parts)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str) -> list:
+    padded = token + "=" * (-len(token) % 4)
+    return base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def parse_page_args(args):
+    # Returns a dict with limit, after_id, updated_since and after_updated_id.
+    # Raises ValueError with a client-facing message on bad input.
+    page = {"limit": None, "after_id": None, "updated_since": None, "after_updated_id": None}
+    limit = args.get("limit")
+    if limit is not None:
+        try:
+            page["limit"] = int(limit)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if page["limit"] < 1:
+            raise ValueError("limit must be positive")
+        page["limit"] = min(page["limit"], TASK_PAGE_MAX)
+    updated_since = args.get("updated_since") or None
+    after_id = args.get("after_id")
+    cursor = args.get("cursor")
+    try:
+        if updated_since and not _TIMESTAMP.match(updated_since):
+            # An X-Sync-Token.
+            page["updated_since"], after_updated_id = decode_cursor(updated_since)
+            page["after_updated_id"] = int(after_updated_id)
+        elif updated_since:
+            page["updated_since"], page["after_updated_id"] = updated_since, 0
+        if cursor:
+            parts = decode_cursor(cursor)
+            if len(parts) == 2:
+                page["updated_since"] = parts[0]
+                page["after_updated_id"] = int(parts[1])
+            else:
+                page["after_id"] = int(parts[0])
+        elif after_id is not None:
+            page["after_id"] = int(after_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    return page
+
+def read_transaction(conn):
+    # Several SELECTs that must see one snapshot. Inside /api/batch the
+    # connection already is in a read transaction, which is simply reused.
+    if conn.in_transaction:
+        return contextlib.nullcontext()
+    return _read_transaction(conn)
+
+@contextlib.contextmanager
+def _read_transaction(conn):
+    conn.execute("BEGIN")
+    try:
+        yield
+    finally:
+        conn.commit()
+
+def fetch_task_page(cursor, where: str, params: tuple, page: dict, group_id, table: str = "tasks"):
+    # Runs "SELECT * FROM <table> WHERE <where>" with the keyset / delta
+    # conditions from parse_page_args() and returns (RowSet, removed,
+    # next_cursor, sync_token). removed is None for full reads and the ids of
+    # the group's tombstones in the delta otherwise. cursor must come from
+    # tuple_cursor() and be used inside read_transaction(). table is "tasks"
+    # for live work and "tasks_all" (live plus archived, migration 10) for
+    # history.
+    where_params = tuple(params)
+    conditions = [where]
+    params = list(params)
+    if page["updated_since"] is not None:
+        if page["after_updated_id"] is not None:
+            conditions.append("(updated_at > ? OR (updated_at = ? AND id > ?))")
+            params += [page["updated_since"], page["updated_since"], page["after_updated_id"]]
+        else:
+            conditions.append("updated_at > ?")
+            params.append(page["updated_since"])
+        order = "updated_at, id"
+    else:
+        if page["after_id"] is not None:
+            conditions.append("id > ?")
+            params.append(page["after_id"])
+        order = "id"
+    sql = f"SELECT * FROM {table} WHERE {' AND '.join(conditions)} ORDER BY {order}"
+    if page["limit"] is not None:
+        sql += " LIMIT ?"
+        params.append(page["limit"] + 1)
+    cursor.execute(sql, params)
+    rows = RowSet.fetch(cursor)
+    if page["updated_since"] is not None:
+        return _merge_delta(cursor, rows, page, group_id, table)
+    next_cursor = None
+    if page["limit"] is not None and len(rows) > page["limit"]:
+        rows.truncate(page["limit"])
+        next_cursor = encode_cursor(rows.value(-1, "id"))
+    cursor.execute(f"SELECT updated_at, id FROM {table} WHERE {where} ORDER BY updated_at DESC, id DESC LIMIT 1",
+                   where_params)
+    newest = cursor.fetchone()
+    sync_token = encode_cursor(*newest) if newest else None
+    return rows, None, next_cursor, sync_token
+
+def _merge_delta(cursor, rows: RowSet, page: dict, group_id, table: str):
+    # Reads the tombstones after the same (updated_at, id) key as the delta
+    # rows and merges both in that order; a page holds at most limit of them
+    # together. Task ids are never reused, and a task's tombstone is only in
+    # groups it has left, so a key is either a row or a tombstone. Archiving
+    # deletes from tasks and so leaves a tombstone as well; history reads
+    # tasks_all, which still has the task, and skips those.
+    since, after_id = page["updated_since"], page["after_updated_id"] or 0
+    archived = ""
+    if table == "tasks_all":
+        archived = "AND NOT EXISTS (SELECT 1 FROM tasks_archive a WHERE a.id = d.id)"
+    sql = f"""
+        SELECT updated_at, id FROM deleted_tasks d
+        WHERE group_id=? AND (updated_at > ? OR (updated_at = ? AND id > ?)) {archived}
+        ORDER BY updated_at, id
+    """
+    params = [group_id, since, since, after_id]
+    if page["limit"] is not None:
+        sql += " LIMIT ?"
+        params.append(page["limit"] + 1)
+    cursor.execute(sql, params)
+    tombstones = cursor.fetchall()
+    updated_at, id_ = rows.columns.index("updated_at"), rows.columns.index("id")
+    keys = sorted([(row[updated_at], row[id_], False) for row in rows.rows] +
+                  [(stamp, task_id, True) for stamp, task_id in tombstones])
+    next_cursor = None
+    if page["limit"] is not None and len(keys) > page["limit"]:
+        keys = keys[:page["limit"]]
+        next_cursor = encode_cursor(keys[-1][0], keys[-1][1])
+    # Rows and tombstones are each sorted, so the page keeps a prefix of both.
+    removed = [task_id for _, task_id, is_tombstone in keys if is_tombstone]
+    rows.truncate(len(keys) - len(removed))
+    # The last key of the page is the newest the client has now seen.
+    sync_token = encode_cursor(keys[-1][0], keys[-1][1]) if keys else encode_cursor(since, after_id)
+    return rows, removed, next_cursor, sync_token
+
+def json_response(body: str, status: int = 200):
+    return app.response_class(body, status=status, mimetype="application/json")
+
+def task_page_response(rows: RowSet, removed, shape: str, next_cursor, sync_token):
+    if removed is None:
+        body = rows.to_json(shape)
+    elif shape == "columns":
+        body = to_json({"columns": rows.columns, "rows": rows.rows, "removed": removed})
+    else:
+        body = to_json({"tasks": rows.objects(), "removed": removed})
+    response = json_response(body)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if sync_token:
+        response.headers["X-Sync-Token"] = sync_token
+    return response
+
+# ---------------- Conditional GET ----------------
+# The polling endpoints derive their ETag from the data_versions counters
+# (migration 8) that triggers bump on every write, plus the query string. A
+# matching If-None-Match is answered with 304 after one primary-key lookup,
+# without reading or serializing any rows. Versions are read before the view
+# runs, so a write that lands in between can only cause one extra full fetch,
+# never a missed change.
+CACHE_REVALIDATE = "private, no-cache"
+# SOPs change rarely; clients may reuse them briefly without asking.
+CACHE_SOPS = "private, max-age=30, must-revalidate"
+
+def read_versions(cursor, scopes) -> tuple:
+    cursor.execute(f"SELECT scope, version FROM data_versions WHERE scope IN ({','.join('?' * len(scopes))})",
+                   tuple(scopes))
+    found = {row["scope"]: row["version"] for row in cursor.fetchall()}
+    return tuple(found.get(scope, 0) for scope in scopes)
+
+def versioned(version_fn, cache_control: str = CACHE_REVALIDATE):
+    # version_fn(cursor, *view_args) returns something hashable that changes
+    # whenever the response would, or None to skip conditional handling.
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            conn = get_db_connection()
+            versions = version_fn(conn.cursor(), *args, **kwargs)
+            if versions is None:
+                return f(*args, **kwargs)
+            key = repr((request.path, sorted(request.args.items(multi=True)), versions))
+            tag = hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest()
+            if request.if_none_match.contains_weak(tag):
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(tag, weak=True)
+            response.headers["Cache-Control"] = cache_control
+            return response
+        return wrapper
+    return decorator
+
+def group_arg_versions(cursor, *args, **kwargs):
+    group_id = request.args.get("group_id")
+    return read_versions(cursor, [f"group:{group_id}"]) if group_id else None
+
+def project_versions(cursor, *args, **kwargs):
+    group_id = request.args.get("group_id")
+    return read_versions(cursor, [f"group:{group_id}" if group_id else "table:projects"])
+
+def sop_versions(cursor, *args, **kwargs):
+    group_id = request.args.get("group_id")
+    return read_versions(cursor, [f"group:{group_id}" if group_id else "table:sops"])
+
+def user_group_versions(cursor, username):
+    # Membership (an index-only read) plus the version of every group the
+    # user belongs to, since the response carries open task counts.
+    cursor.execute("""
+        SELECT ug.group_id, ug.role, COALESCE(v.version, 0) AS version FROM user_groups ug
+        LEFT JOIN data_versions v ON v.scope = 'group:' || ug.group_id
+        WHERE ug.username=?
+        ORDER BY ug.group_id
+    """, (username,))
+    return tuple(tuple(row) for row in cursor.fetchall())
+
 # ---------------- API Endpoints ----------------
 
+# --- Database Pool Stats ---
+@app.route('/api/db/pool_stats', methods=['GET'])
+@requires_permission("manage_permissions")
+def api_db_pool_stats():
+    stats = db_pool.stats()
+    stats["export_pool"] = export_pool.stats()
+    log("[api_db_pool_stats] %s", stats)
+    return jsonify(stats), 200
+
 # --- Permissions Endpoints ---
+@app.route('/api/permissions/cache_stats', methods=['GET'])
+@requires_permission("manage_permissions")
+def api_permission_cache_stats():
+    return jsonify(permission_cache.stats()), 200
+
 @app.route('/api/permissions', methods=['GET'])
 @requires_permission("manage_permissions")
 def api_get_permissions():
@@ -367,7 +775,7 @@ def api_get_permissions():
     cursor.execute("SELECT * FROM permissions")
     perms = [dict(row) for row in cursor.fetchall()]
     conn.close()
-    log(f"[api_get_permissions] Returning {len(perms)} permissions")
+    log("[api_get_permissions] Returning %s permissions", len(perms))
     return jsonify(perms), 200
 
 @app.route('/api/permissions', methods=['POST'])
@@ -382,11 +790,12 @@ def api_create_permission():
     cursor = conn.cursor()
     cursor.execute("INSERT INTO permissions (name, description) VALUES (?, ?)", (name, description))
     conn.commit()
+    permission_cache.clear()
     new_id = cursor.lastrowid
     cursor.execute("SELECT * FROM permissions WHERE id=?", (new_id,))
     perm = dict(cursor.fetchone())
     conn.close()
-    log(f"[api_create_permission] Created permission: {perm}")
+    log("[api_create_permission] Created permission: %s", perm)
     return jsonify(perm), 201
 
 # --- Groups and User-Group Endpoints ---
@@ -394,7 +803,7 @@ def api_create_permission():
 def api_create_group():
     try:
         data = request.get_json() or {}
-        log(f"[api_create_group] Received data: {data}")
+        log("[api_create_group] Received data: %s", data)
         name = data.get("name", "").strip()
         description = data.get("description", "")
         creator = data.get("creator", "").strip()
@@ -404,11 +813,11 @@ def api_create_group():
 
         if not session.get("username"):
             session["username"] = creator
-            log(f"[api_create_group] Session username set to: {creator}")
+            log("[api_create_group] Session username set to: %s", creator)
 
         conn = get_db_connection()
         cursor = conn.cursor()
-        log(f"[api_create_group] Checking for duplicate group with name: {name}")
+        log("[api_create_group] Checking for duplicate group with name: %s", name)
         try:
             cursor.execute("SELECT * FROM groups WHERE name=?", (name,))
         except sqlite3.OperationalError as err:
@@ -428,58 +837,65 @@ def api_create_group():
                 raise
         existing_group = cursor.fetchone()
         if existing_group:
-            log(f"[api_create_group] Group with name '{name}' already exists.")
+            log("[api_create_group] Group with name '%s' already exists.", name)
             conn.close()
             return jsonify({"error": "Group with this name already exists"}), 400
 
-        log(f"[api_create_group] Inserting group into database with name: {name}, description: {description}, creator: {creator}")
+        log("[api_create_group] Inserting group into database with name: %s, description: %s, creator: %s", name, description, creator)
         cursor.execute("INSERT INTO groups (name, description, creator) VALUES (?, ?, ?)", (name, description, creator))
         conn.commit()
         new_id = cursor.lastrowid
-        log(f"[api_create_group] New group inserted with id: {new_id}")
+        log("[api_create_group] New group inserted with id: %s", new_id)
         cursor.execute("SELECT * FROM groups WHERE id=?", (new_id,))
         group = dict(cursor.fetchone())
         conn.close()
 
         conn = get_db_connection()
         cursor = conn.cursor()
-        log(f"[api_create_group] Inserting into user_groups: username={creator}, group_id={new_id}, role=admin")
+        log("[api_create_group] Inserting into user_groups: username=%s, group_id=%s, role=admin", creator, new_id)
         cursor.execute("INSERT INTO user_groups (username, group_id, role) VALUES (?, ?, ?)", (creator, new_id, "admin"))
         conn.commit()
+        permission_cache.invalidate(creator)
         conn.close()
-        log(f"[api_create_group] Group created successfully with id={new_id} by {creator}")
+        log("[api_create_group] Group created successfully with id=%s by %s", new_id, creator)
         return jsonify(group), 201
     except Exception as e:
-        log(f"[api_create_group] Exception occurred: {e}")
+        log_error("[api_create_group] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error during group creation"}), 500
 
 # --- Modified GET groups endpoint to include open task counts and proper label ---
 @app.route('/api/users/<username>/groups', methods=['GET'])
+@versioned(user_group_versions)
 def api_get_user_groups(username):
     try:
-        log(f"[api_get_user_groups] Request for groups for user: {username}")
-        log(f"[api_get_user_groups] Session contents: {dict(session)}")
+        log("[api_get_user_groups] Request for groups for user: %s", username)
+        log("[api_get_user_groups] Session contents: %s", dict(session))
         conn = get_db_connection()
         cursor = conn.cursor()
+        # tasks.group_id is TEXT and groups.id INTEGER: without the CAST the
+        # comparison gets numeric affinity and the count scans the whole index.
         cursor.execute("""
-            SELECT g.*, ug.role,
-              (SELECT COUNT(*) FROM tasks WHERE group_id = g.id AND completed = 0) as open_task_count,
-              CASE (SELECT COUNT(*) FROM tasks WHERE group_id = g.id AND completed = 0)
+            SELECT *,
+              CASE open_task_count
                    WHEN 1 THEN '1 offene Aufgabe'
-                   ELSE (SELECT COUNT(*) FROM tasks WHERE group_id = g.id AND completed = 0) || ' offene Aufgaben'
+                   ELSE open_task_count || ' offene Aufgaben'
               END as open_task_label
-            FROM groups g 
-            JOIN user_groups ug ON g.id = ug.group_id 
-            WHERE ug.username=?
+            FROM (
+                SELECT g.*, ug.role,
+                  (SELECT COUNT(*) FROM tasks WHERE group_id = CAST(g.id AS TEXT) AND completed = 0) as open_task_count
+                FROM groups g
+                JOIN user_groups ug ON g.id = ug.group_id
+                WHERE ug.username=?
+            )
         """, (username,))
         groups = [dict(row) for row in cursor.fetchall()]
         conn.close()
-        log(f"[api_get_user_groups] Returning {len(groups)} groups for {username}")
+        log("[api_get_user_groups] Returning %s groups for %s", len(groups), username)
         for group in groups:
-            log(f"[api_get_user_groups] Group '{group['name']}' has {group.get('open_task_count', 0)} open tasks -> label: {group.get('open_task_label')}")
+            log("[api_get_user_groups] Group '%s' has %s open tasks -> label: %s", group['name'], group.get('open_task_count', 0), group.get('open_task_label'))
         return jsonify(groups), 200
     except Exception as e:
-        log(f"[api_get_user_groups] Exception occurred: {e}")
+        log_error("[api_get_user_groups] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error during fetching user groups"}), 500
 
 # --- New endpoint to force group refresh ---
@@ -489,7 +905,7 @@ def api_refresh_groups():
     if not username:
         log("[api_refresh_groups] No username in session")
         return jsonify({"error": "Not authenticated"}), 401
-    log(f"[api_refresh_groups] Refreshing groups for user: {username}")
+    log("[api_refresh_groups] Refreshing groups for user: %s", username)
     return api_get_user_groups(username)
 
 @app.route('/api/users/<username>/groups', methods=['POST'])
@@ -503,14 +919,15 @@ def api_assign_group_to_user(username):
             return jsonify({"error": "Group ID is required"}), 400
         conn = get_db_connection()
         cursor = conn.cursor()
-        log(f"[api_assign_group_to_user] Assigning group {group_id} to user {username}")
+        log("[api_assign_group_to_user] Assigning group %s to user %s", group_id, username)
         cursor.execute("INSERT INTO user_groups (username, group_id, role) VALUES (?, ?, ?)", (username, group_id, "user"))
         conn.commit()
+        permission_cache.invalidate(username)
         conn.close()
-        log(f"[api_assign_group_to_user] Assigned group {group_id} to user {username}")
+        log("[api_assign_group_to_user] Assigned group %s to user %s", group_id, username)
         return jsonify({"status": "ok", "message": "Group assigned to user"}), 200
     except Exception as e:
-        log(f"[api_assign_group_to_user] Exception occurred: {e}")
+        log_error("[api_assign_group_to_user] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error during assigning group"}), 500
 
 @app.route('/api/groups/<int:group_id>/invite', methods=['POST'])
@@ -524,14 +941,15 @@ def api_invite_user_to_group(group_id):
             return jsonify({"error": "Invitee username is required"}), 400
         conn = get_db_connection()
         cursor = conn.cursor()
-        log(f"[api_invite_user_to_group] Inviting user {invitee} to group {group_id}")
+        log("[api_invite_user_to_group] Inviting user %s to group %s", invitee, group_id)
         cursor.execute("INSERT INTO user_groups (username, group_id, role) VALUES (?, ?, ?)", (invitee, group_id, "user"))
         conn.commit()
+        permission_cache.invalidate(invitee)
         conn.close()
-        log(f"[api_invite_user_to_group] Invited user {invitee} to group {group_id}")
+        log("[api_invite_user_to_group] Invited user %s to group %s", invitee, group_id)
         return jsonify({"status": "ok", "message": f"User {invitee} invited to group {group_id}"}), 200
     except Exception as e:
-        log(f"[api_invite_user_to_group] Exception occurred: {e}")
+        log_error("[api_invite_user_to_group] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error during inviting user"}), 500
 
 @app.route('/api/groups/<int:group_id>/users/<username>', methods=['PUT'])
@@ -541,60 +959,46 @@ def api_update_user_role_in_group(group_id, username):
         data = request.get_json() or {}
         role = data.get("role", "").strip()
         if role not in ["user", "editor", "admin"]:
-            log(f"[api_update_user_role_in_group] Invalid role: {role}")
+            log("[api_update_user_role_in_group] Invalid role: %s", role)
             return jsonify({"error": "Invalid role"}), 400
         conn = get_db_connection()
         cursor = conn.cursor()
-        log(f"[api_update_user_role_in_group] Updating role for user {username} in group {group_id} to {role}")
+        log("[api_update_user_role_in_group] Updating role for user %s in group %s to %s", username, group_id, role)
         cursor.execute("UPDATE user_groups SET role=? WHERE group_id=? AND username=?", (role, group_id, username))
         conn.commit()
+        permission_cache.invalidate(username)
         conn.close()
-        log(f"[api_update_user_role_in_group] Updated role for user {username} in group {group_id} to {role}")
+        log("[api_update_user_role_in_group] Updated role for user %s in group %s to %s", username, group_id, role)
         return jsonify({"status": "ok", "message": "User role updated"}), 200
     except Exception as e:
-        log(f"[api_update_user_role_in_group] Exception occurred: {e}")
+        log_error("[api_update_user_role_in_group] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error during updating user role"}), 500
 
 @app.route('/api/groups/export', methods=['GET'])
 @requires_permission("manage_permissions")
 def api_export_groups():
-    try:
-        username = request.args.get("username")
-        if not username:
-            log("[api_export_groups] Username is required for export.")
-            return jsonify({"error": "Username is required"}), 400
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM groups g 
-            JOIN user_groups ug ON g.id = ug.group_id 
-            WHERE ug.username=?
-        """, (username,))
-        groups = [dict(row) for row in cursor.fetchall()]
-        export_data = {"groups": groups, "data": {}}
-        for group in groups:
-            group_id = group["id"]
-            cursor.execute("SELECT * FROM tasks WHERE group_id=?", (group_id,))
-            tasks = [dict(row) for row in cursor.fetchall()]
-            cursor.execute("SELECT * FROM projects WHERE group_id=?", (group_id,))
-            projects = [dict(row) for row in cursor.fetchall()]
-            cursor.execute("SELECT * FROM sops WHERE group_id=?", (group_id,))
-            sops = [dict(row) for row in cursor.fetchall()]
-            export_data["data"][group_id] = {
-                "tasks": tasks,
-                "projects": projects,
-                "sops": sops
-            }
-        conn.close()
-        log(f"[api_export_groups] Exported data for user {username}")
-        return jsonify(export_data), 200
-    except Exception as e:
-        log(f"[api_export_groups] Exception occurred: {e}")
-        return jsonify({"error": "Internal server error during exporting groups"}), 500
+    # Streams every group of the user with tasks, projects (plus todos and
+    # assignments) and SOPs (plus agreements) in the shape /api/groups/import
+    # accepts. ?format=ndjson emits one record per line instead.
+    username = request.args.get("username")
+    if not username:
+        log("[api_export_groups] Username is required for export.")
+        return jsonify({"error": "Username is required"}), 400
+    fmt = request.args.get("format", "json")
+    if fmt not in ("json", "ndjson"):
+        return jsonify({"error": "format must be json or ndjson"}), 400
+    log("[api_export_groups] Exporting data for user %s as %s", username, fmt)
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    return Response(stream_group_archive(export_pool.connection, username, fmt), mimetype=mimetype)
 
 @app.route('/api/groups/import', methods=['POST'])
 @requires_permission("manage_permissions")
 def api_import_groups():
+    # Accepts the JSON archive or, with Content-Type application/x-ndjson, a
+    # stream of one record per line (username then comes from ?username=).
+    # See importer.py for both formats.
+    if request.mimetype == "application/x-ndjson":
+        return import_groups_ndjson()
     try:
         data = request.get_json() or {}
         username = data.get("username")
@@ -605,68 +1009,81 @@ def api_import_groups():
         if not imported_data:
             log("[api_import_groups] No group data provided for import.")
             return jsonify({"error": "No group data provided"}), 400
+        errors = validate_payload(imported_data)
+        if errors:
+            log("[api_import_groups] Rejected import with %s validation error(s)", len(errors))
+            return jsonify({"error": "Invalid import data", "details": errors}), 400
         conn = get_db_connection()
-        cursor = conn.cursor()
-        for group_id_str, group_data in imported_data.items():
-            for task in group_data.get("tasks", []):
-                cursor.execute("""
-                    INSERT INTO tasks (title, assigned_to, creation_date, due_date, completed, recurring, frequency_hours, always_assigned, group_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    task["title"],
-                    task["assigned_to"],
-                    task["creation_date"],
-                    task["due_date"],
-                    task["completed"],
-                    task["recurring"],
-                    task["frequency_hours"],
-                    task["always_assigned"],
-                    group_id_str
-                ))
-            for project in group_data.get("projects", []):
-                cursor.execute("""
-                    INSERT INTO projects (name, description, created_by, creation_date, group_id)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    project["name"],
-                    project["description"],
-                    project["created_by"],
-                    project["creation_date"],
-                    group_id_str
-                ))
-            for sop in group_data.get("sops", []):
-                cursor.execute("""
-                    INSERT INTO sops (title, content, version, published_date, effective_date, group_id)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    sop["title"],
-                    sop["content"],
-                    sop["version"],
-                    sop["published_date"],
-                    sop["effective_date"],
-                    group_id_str
-                ))
-        conn.commit()
+        with GroupImporter(conn) as importer:
+            for group_id_str, group_data in imported_data.items():
+                importer.add_group_data(str(group_id_str), group_data)
         conn.close()
-        log("[api_import_groups] Import successful")
-        return jsonify({"status": "ok", "message": "Import successful"}), 200
+        if importer.recurring_imported:
+            recurring_scheduler.rebuild()
+        for group_id in importer.group_ids:
+            event_bus.publish(group_id, "resync", {})
+        log("[api_import_groups] Import successful: %s", importer.counts)
+        return jsonify({"status": "ok", "message": "Import successful", "imported": importer.counts}), 200
+    except ImportValidationError as e:
+        log("[api_import_groups] Import rejected: %s", e)
+        return jsonify({"error": "Invalid import data", "details": e.errors}), 400
     except Exception as e:
-        log(f"[api_import_groups] Exception occurred: {e}")
+        log_error("[api_import_groups] Exception occurred: %s", e)
+        return jsonify({"error": "Internal server error during importing groups"}), 500
+
+def import_groups_ndjson():
+    username = request.args.get("username")
+    if not username:
+        return jsonify({"error": "Username is required for import"}), 400
+    line_no = 0
+    try:
+        conn = get_db_connection()
+        with GroupImporter(conn) as importer:
+            for raw_line in request.stream:
+                line_no += 1
+                if not raw_line.strip():
+                    continue
+                try:
+                    rec = json.loads(raw_line)
+                except ValueError:
+                    raise ImportValidationError([f"line {line_no}: invalid JSON"])
+                kind = rec.get("type") if isinstance(rec, dict) else None
+                group_id = rec.get("group_id") if isinstance(rec, dict) else None
+                if kind == "header":
+                    continue
+                if kind not in RECORD_TYPES or group_id in (None, ""):
+                    raise ImportValidationError([f"line {line_no}: record needs a known 'type' and a 'group_id'"])
+                errors = validate_record(kind, rec, f"line {line_no}")
+                if errors:
+                    raise ImportValidationError(errors)
+                importer.add(kind, str(group_id), rec)
+        conn.close()
+        if importer.recurring_imported:
+            recurring_scheduler.rebuild()
+        for group_id in importer.group_ids:
+            event_bus.publish(group_id, "resync", {})
+        log("[api_import_groups] NDJSON import of %s lines successful: %s", line_no, importer.counts)
+        return jsonify({"status": "ok", "message": "Import successful", "imported": importer.counts}), 200
+    except ImportValidationError as e:
+        log("[api_import_groups] NDJSON import rejected: %s", e)
+        return jsonify({"error": "Invalid import data", "details": e.errors}), 400
+    except Exception as e:
+        log_error("[api_import_groups] NDJSON import failed at line %s: %s", line_no, e)
         return jsonify({"error": "Internal server error during importing groups"}), 500
 
 @app.route('/api/groups/<group_id>/members', methods=['GET'])
 def api_get_group_members(group_id):
     try:
-        log(f"[api_get_group_members] Fetching members for group id: {group_id}")
+        log("[api_get_group_members] Fetching members for group id: %s", group_id)
         conn = get_db_connection()
-        cursor = conn.cursor()
+        cursor = tuple_cursor(conn)
         cursor.execute("SELECT username, role FROM user_groups WHERE group_id=?", (group_id,))
-        members = [dict(row) for row in cursor.fetchall()]
+        members = RowSet.fetch(cursor)
         conn.close()
-        log(f"[api_get_group_members] Found {len(members)} members for group id: {group_id}")
-        return jsonify(members), 200
+        log("[api_get_group_members] Found %s members for group id: %s", len(members), group_id)
+        return json_response(members.to_json())
     except Exception as e:
-        log(f"[api_get_group_members] Exception occurred: {e}")
+        log_error("[api_get_group_members] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error during fetching group members"}), 500
 
 # --- Tasks Endpoints ---
@@ -675,7 +1092,7 @@ def api_get_group_members(group_id):
 def api_create_recurring_task():
     try:
         data = request.get_json() or {}
-        log(f"[api_create_recurring_task] Received data: {data}")
+        log("[api_create_recurring_task] Received data: %s", data)
         title = data.get("title", "").strip()
         group_id = data.get("group_id", "").strip()
         duration_hours = data.get("duration_hours")
@@ -704,7 +1121,7 @@ def api_create_recurring_task():
 
         creation_date = datetime.utcnow().isoformat()
         due_date = (datetime.utcnow() + timedelta(hours=duration_hours)).isoformat()
-        log(f"[api_create_recurring_task] Creating recurring task with title='{title}', creation_date='{creation_date}', due_date='{due_date}', frequency_hours={frequency_hours}, always_assigned={always_assigned}")
+        log("[api_create_recurring_task] Creating recurring task with title='%s', creation_date='%s', due_date='%s', frequency_hours=%s, always_assigned=%s", title, creation_date, due_date, frequency_hours, always_assigned)
 
         completed = 0
         conn = get_db_connection()
@@ -716,60 +1133,55 @@ def api_create_recurring_task():
         """, (title, assigned_to, creation_date, due_date, completed, 1, group_id, frequency_hours, int(always_assigned), project_id))
         conn.commit()
         new_id = cursor.lastrowid
-        log(f"[api_create_recurring_task] Recurring task inserted with id={new_id}")
+        log("[api_create_recurring_task] Recurring task inserted with id=%s", new_id)
+        recurring_scheduler.schedule(new_id, due_date)
         cursor.execute("SELECT * FROM tasks WHERE id=?", (new_id,))
         row = cursor.fetchone()
         conn.close()
         if row is None:
             log("[api_create_recurring_task] No row returned after insert")
             return jsonify({"error": "Task creation failed: no row returned"}), 500
-        task = {
-            "id": row["id"],
-            "title": row["title"],
-            "assigned_to": row["assigned_to"],
-            "creation_date": row["creation_date"],
-            "due_date": row["due_date"],
-            "completed": row["completed"],
-            "completed_by": row["completed_by"],
-            "completed_on": row["completed_on"],
-            "recurring": bool(row["recurring"]),
-            "frequency_hours": row["frequency_hours"],
-            "always_assigned": bool(row["always_assigned"]),
-            "group_id": row["group_id"],
-            "project_id": row["project_id"]
-        }
-        log(f"[api_create_recurring_task] Successfully created recurring task: {task}")
+        task = task_dict(row)
+        log("[api_create_recurring_task] Successfully created recurring task: %s", task)
+        push_notifier.publish("task_created", task, actor=session.get("username"))
+        publish_change(task["group_id"], "task", "create", task["id"], task)
         log("[api_create_recurring_task] New task created; group counts should now update.")
         return jsonify(task), 201
     except Exception as e:
-        log(f"[api_create_recurring_task] Exception occurred: {e}")
+        log_error("[api_create_recurring_task] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route('/api/tasks', methods=['GET'], endpoint='api_get_tasks')
+@versioned(group_arg_versions)
 def api_get_tasks():
     group_id = request.args.get("group_id")
-    log(f"[api_get_tasks] Request received for group_id: {group_id}")
+    log("[api_get_tasks] Request received for group_id: %s", group_id)
     if not group_id:
         log("[api_get_tasks] Missing group_id parameter")
         return jsonify({"error": "Missing group_id parameter"}), 400
+    try:
+        page = parse_page_args(request.args)
+        shape = parse_shape(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE group_id=?", (group_id,))
-        rows = cursor.fetchall()
-        tasks = [dict(row) for row in rows]
+        cursor = tuple_cursor(conn)
+        with read_transaction(conn):
+            tasks, removed, next_cursor, sync_token = fetch_task_page(cursor, "group_id=?", (group_id,), page,
+                                                                      group_id)
         conn.close()
-        log(f"[api_get_tasks] Returning {len(tasks)} tasks for group {group_id}")
-        return jsonify(tasks), 200
+        log("[api_get_tasks] Returning %s tasks for group %s", len(tasks), group_id)
+        return task_page_response(tasks, removed, shape, next_cursor, sync_token)
     except Exception as e:
-        log(f"[api_get_tasks] Exception occurred: {e}")
+        log_error("[api_get_tasks] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error during fetching tasks"}), 500
 
 @app.route('/api/tasks', methods=['POST'], endpoint='api_create_task')
 def api_create_task():
     try:
         data = request.get_json() or {}
-        log(f"[api_create_task] Received data: {data}")
+        log("[api_create_task] Received data: %s", data)
         title = data.get("title", "").strip()
         group_id = data.get("group_id", "").strip()
         duration_hours = data.get("duration_hours")
@@ -796,7 +1208,7 @@ def api_create_task():
 
         creation_date = datetime.utcnow().isoformat()
         due_date = (datetime.utcnow() + timedelta(hours=duration_hours)).isoformat()
-        log(f"[api_create_task] Creating task with title='{title}', creation_date='{creation_date}', due_date='{due_date}', recurring='{recurring}'")
+        log("[api_create_task] Creating task with title='%s', creation_date='%s', due_date='%s', recurring='%s'", title, creation_date, due_date, recurring)
 
         completed = 0
         frequency_hours = None
@@ -811,34 +1223,22 @@ def api_create_task():
         """, (title, assigned_to, creation_date, due_date, completed, int(recurring), group_id, frequency_hours, always_assigned, project_id))
         conn.commit()
         new_id = cursor.lastrowid
-        log(f"[api_create_task] Task inserted with id={new_id}")
+        log("[api_create_task] Task inserted with id=%s", new_id)
         cursor.execute("SELECT * FROM tasks WHERE id=?", (new_id,))
         row = cursor.fetchone()
         conn.close()
         if row is None:
             log("[api_create_task] No row returned after insert")
             return jsonify({"error": "Task creation failed: no row returned"}), 500
-        task = {
-            "id": row["id"],
-            "title": row["title"],
-            "assigned_to": row["assigned_to"],
-            "creation_date": row["creation_date"],
-            "due_date": row["due_date"],
-            "completed": row["completed"],
-            "completed_by": row["completed_by"],
-            "completed_on": row["completed_on"],
-            "recurring": bool(row["recurring"]),
-            "frequency_hours": row["frequency_hours"],
-            "always_assigned": bool(row["always_assigned"]),
-            "group_id": row["group_id"],
-            "project_id": row["project_id"]
-        }
-        log(f"[api_create_task] Successfully created task: {task}")
+        task = task_dict(row)
+        log("[api_create_task] Successfully created task: %s", task)
+        push_notifier.publish("task_created", task, actor=session.get("username"))
+        publish_change(task["group_id"], "task", "create", task["id"], task)
         log("[api_create_task] New task created; group counts should now update.")
         return jsonify(task), 201
 
     except Exception as e:
-        log(f"[api_create_task] Exception occurred: {e}")
+        log_error("[api_create_task] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 # NEW: Endpoint to update an existing task (including assigning it to a project)
@@ -859,28 +1259,44 @@ def api_edit_task(task_id):
         conn.close()
         if row is None:
             return jsonify({"error": "Task not found"}), 404
-        task = {
-            "id": row["id"],
-            "title": row["title"],
-            "assigned_to": row["assigned_to"],
-            "creation_date": row["creation_date"],
-            "due_date": row["due_date"],
-            "completed": row["completed"],
-            "completed_by": row["completed_by"],
-            "completed_on": row["completed_on"],
-            "recurring": bool(row["recurring"]),
-            "frequency_hours": row["frequency_hours"],
-            "always_assigned": bool(row["always_assigned"]),
-            "group_id": row["group_id"],
-            "project_id": row["project_id"]
-        }
-        log(f"[api_edit_task] Updated task {task_id} with title: {title} and project_id: {project_id}")
+        task = task_dict(row)
+        log("[api_edit_task] Updated task %s with title: %s and project_id: %s", task_id, title, project_id)
+        publish_change(row["group_id"], "task", "update", task_id,
+                       {"title": row["title"], "project_id": row["project_id"], "updated_at": row["updated_at"]})
         return jsonify(task), 200
     except Exception as e:
-        log(f"[api_edit_task] Exception occurred: {e}")
+        log_error("[api_edit_task] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
-# --- NEW JOIN TASK ENDPOINT ---
+# --- Task lifecycle: join / finish / convert / delete ---
+# Each transition is one conditional "UPDATE ... WHERE <expected state>
+# RETURNING *" in its own short transaction, so concurrent callers cannot both
+# win: the loser's WHERE no longer matches and gets 409 (404 if the task does
+# not exist at all). updated_at is set in the statement itself because
+# RETURNING does not see what the updated_at trigger writes afterwards.
+def transition_task(sql: str, params: tuple):
+    # Returns the updated row, or None if the WHERE clause did not match.
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return rows[0] if rows else None
+
+def task_not_matched(task_id: int, conflict: str):
+    conn = get_db_connection()
+    exists = conn.execute("SELECT 1 FROM tasks WHERE id=?", (task_id,)).fetchone()
+    conn.close()
+    if exists is None:
+        return jsonify({"error": "Task not found"}), 404
+    return jsonify({"error": conflict}), 409
+
 @app.route('/api/tasks/<int:task_id>/join', methods=['POST'])
 def api_join_task(task_id):
     try:
@@ -889,40 +1305,395 @@ def api_join_task(task_id):
         if not username:
             log("[api_join_task] Missing username in join request")
             return jsonify({"error": "Username is required"}), 400
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
-        task = cursor.fetchone()
-        if not task:
-            conn.close()
-            log(f"[api_join_task] Task with id {task_id} not found")
+        row = transition_task(f"""
+            UPDATE tasks SET assigned_to=?, updated_at={SQL_NOW}
+            WHERE id=? AND (assigned_to IS NULL OR TRIM(assigned_to) = '')
+            RETURNING *
+        """, (username, task_id))
+        if row is None:
+            log("[api_join_task] Task %s not found or already assigned", task_id)
+            return task_not_matched(task_id, "Task is already assigned")
+        updated_task = dict(row)
+        log("[api_join_task] User %s joined task %s", username, task_id)
+        push_notifier.publish("task_joined", updated_task, actor=username)
+        publish_change(updated_task["group_id"], "task", "update", task_id,
+                       {"assigned_to": updated_task["assigned_to"], "updated_at": updated_task["updated_at"]})
+        return jsonify(updated_task), 200
+    except Exception as e:
+        log_error("[api_join_task] Exception occurred: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/tasks/<int:task_id>/finish', methods=['POST'])
+def api_finish_task(task_id):
+    try:
+        data = request.get_json() or {}
+        username = data.get("username")
+        if not username:
+            log("[api_finish_task] Missing username in finish request")
+            return jsonify({"error": "Username is required"}), 400
+        # A finished head of a recurring series stays scheduled; the
+        # scheduler spawns the next occurrence when it comes due.
+        row = transition_task(f"""
+            UPDATE tasks SET completed=1, completed_by=?, completed_on=?, updated_at={SQL_NOW}
+            WHERE id=? AND completed=0
+            RETURNING *
+        """, (username, datetime.utcnow().isoformat(), task_id))
+        if row is None:
+            log("[api_finish_task] Task %s not found or already completed", task_id)
+            return task_not_matched(task_id, "Task is already completed")
+        task = task_dict(row)
+        log("[api_finish_task] User %s finished task %s", username, task_id)
+        push_notifier.publish("task_finished", task, actor=username)
+        publish_change(task["group_id"], "task", "update", task_id,
+                       {"completed": task["completed"], "completed_by": task["completed_by"],
+                        "completed_on": task["completed_on"], "updated_at": row["updated_at"]})
+        return jsonify(task), 200
+    except Exception as e:
+        log_error("[api_finish_task] Exception occurred: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/tasks/<int:task_id>/convert_to_recurring', methods=['POST'])
+def api_convert_task_to_recurring(task_id):
+    try:
+        data = request.get_json() or {}
+        frequency_hours = data.get("frequency_hours")
+        always_assigned = data.get("always_assigned", True)
+        try:
+            frequency_hours = int(frequency_hours)
+        except (TypeError, ValueError):
+            return jsonify({"error": "frequency_hours must be an integer"}), 400
+        if frequency_hours < 1:
+            return jsonify({"error": "frequency_hours must be positive"}), 400
+        row = transition_task(f"""
+            UPDATE tasks SET recurring=1, frequency_hours=?, always_assigned=?, updated_at={SQL_NOW}
+            WHERE id=? AND recurring=0
+            RETURNING *
+        """, (frequency_hours, int(bool(always_assigned)), task_id))
+        if row is None:
+            log("[api_convert_task_to_recurring] Task %s not found or already recurring", task_id)
+            return task_not_matched(task_id, "Task is already recurring")
+        task = task_dict(row)
+        if row["due_date"]:
+            recurring_scheduler.schedule(task_id, row["due_date"])
+        log("[api_convert_task_to_recurring] Task %s now recurs every %s hours", task_id, frequency_hours)
+        publish_change(task["group_id"], "task", "update", task_id,
+                       {"recurring": task["recurring"], "frequency_hours": task["frequency_hours"],
+                        "always_assigned": task["always_assigned"], "updated_at": row["updated_at"]})
+        return jsonify(task), 200
+    except Exception as e:
+        log_error("[api_convert_task_to_recurring] Exception occurred: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/tasks/<int:task_id>', methods=['DELETE'])
+def api_delete_task(task_id):
+    try:
+        row = transition_task("DELETE FROM tasks WHERE id=? RETURNING id, group_id", (task_id,))
+        if row is None:
+            # Never existed or a concurrent delete got there first.
             return jsonify({"error": "Task not found"}), 404
-        if task["assigned_to"] and task["assigned_to"].strip() != "":
-            conn.close()
-            log(f"[api_join_task] Task {task_id} is already assigned to {task['assigned_to']}")
-            return jsonify({"error": "Task is already assigned"}), 400
-        cursor.execute("UPDATE tasks SET assigned_to=? WHERE id=?", (username, task_id))
+        recurring_scheduler.unschedule(task_id)
+        log("[api_delete_task] Deleted task %s", task_id)
+        publish_change(row["group_id"], "task", "delete", task_id, {})
+        return jsonify({"status": "ok", "id": task_id}), 200
+    except Exception as e:
+        log_error("[api_delete_task] Exception occurred: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
+
+# --- Bulk task operations ---
+# Each endpoint takes an array, validates every item and applies the valid
+# ones with executemany in a single IMMEDIATE transaction. The rows touched
+# are read back with one SELECT. The response lists one result per input item
+# ({"index", "status", "task" | "error"}), and each affected group gets one
+# coalesced change event.
+#   POST /api/tasks/bulk           {"tasks": [{title, group_id, duration_hours,
+#                                   assigned_to?, project_id?, frequency_hours?,
+#                                   always_assigned?}, ...]}
+#   POST /api/tasks/bulk/complete  {"username": ..., "task_ids": [...]}
+#   POST /api/tasks/bulk/reassign  {"assignments": [{"id", "assigned_to"}, ...]}
+BULK_MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", "500"))
+
+def bulk_items(data: dict, key: str):
+    # Returns (items, error response).
+    items = data.get(key)
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({"error": f"{key} must be a non-empty list"}), 400)
+    if len(items) > BULK_MAX_ITEMS:
+        return None, (jsonify({"error": f"At most {BULK_MAX_ITEMS} items per request"}), 400)
+    return items, None
+
+def run_bulk(fn):
+    # Runs fn(cursor) inside one IMMEDIATE transaction and returns its result.
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        result = fn(cursor)
         conn.commit()
-        cursor.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
-        updated_task = dict(cursor.fetchone())
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
         conn.close()
-        log(f"[api_join_task] User {username} joined task {task_id}")
-        return jsonify(updated_task), 200
+    return result
+
+def fetch_tasks_by_id(cursor, ids) -> dict:
+    ids = list(ids)
+    if not ids:
+        return {}
+    cursor.execute(f"SELECT * FROM tasks WHERE id IN ({','.join('?' * len(ids))})", ids)
+    return {row["id"]: row for row in cursor.fetchall()}
+
+def classify_task_ids(cursor, raw_ids, results, conflict_sql: str, conflict: str) -> dict:
+    # Fills results with 400/404/409 entries and returns {task_id: index} of
+    # the items that can be applied. conflict_sql is a condition on tasks that
+    # makes an item a 409.
+    candidates = {}
+    for index, task_id in raw_ids:
+        if not isinstance(task_id, int) or isinstance(task_id, bool):
+            results[index] = {"index": index, "status": 400, "error": "id must be an integer"}
+        elif task_id in candidates:
+            results[index] = {"index": index, "status": 409, "error": "Duplicate id in request"}
+        else:
+            candidates[task_id] = index
+    ids = list(candidates)
+    found = {}
+    if ids:
+        cursor.execute(f"SELECT id, ({conflict_sql}) AS conflict FROM tasks WHERE id IN ({','.join('?' * len(ids))})", ids)
+        found = {row["id"]: row["conflict"] for row in cursor.fetchall()}
+    applicable = {}
+    for task_id, index in candidates.items():
+        if task_id not in found:
+            results[index] = {"index": index, "status": 404, "error": "Task not found"}
+        elif found[task_id]:
+            results[index] = {"index": index, "status": 409, "error": conflict}
+        else:
+            applicable[task_id] = index
+    return applicable
+
+@app.route('/api/tasks/bulk', methods=['POST'])
+def api_bulk_create_tasks():
+    data = request.get_json(silent=True) or {}
+    items, error = bulk_items(data, "tasks")
+    if error:
+        return error
+    now = datetime.utcnow()
+    results = [None] * len(items)
+    rows_to_insert = []  # (index, params)
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {"index": index, "status": 400, "error": "Item must be an object"}
+            continue
+        title = str(item.get("title") or "").strip()
+        group_id = str(item.get("group_id") or "").strip()
+        try:
+            duration_hours = int(item.get("duration_hours"))
+            frequency_hours = item.get("frequency_hours")
+            frequency_hours = int(frequency_hours) if frequency_hours is not None else None
+        except (TypeError, ValueError):
+            results[index] = {"index": index, "status": 400,
+                              "error": "duration_hours and frequency_hours must be integers"}
+            continue
+        if not title or not group_id:
+            results[index] = {"index": index, "status": 400, "error": "Missing required parameters"}
+            continue
+        project_id = item.get("project_id")
+        try:
+            project_id = int(project_id) if project_id is not None else None
+        except (TypeError, ValueError):
+            project_id = None
+        recurring = frequency_hours is not None
+        always_assigned = int(bool(item.get("always_assigned", True)))
+        rows_to_insert.append((index, (
+            title, item.get("assigned_to"), now.isoformat(), (now + timedelta(hours=duration_hours)).isoformat(),
+            0, int(recurring), group_id, frequency_hours, always_assigned, project_id,
+        )))
+
+    def apply(cursor):
+        if not rows_to_insert:
+            return []
+        # The write lock is held, so the new rows get the ids after the
+        # current maximum, in insertion order.
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM tasks")
+        before = cursor.fetchone()[0]
+        cursor.executemany("""
+            INSERT INTO tasks
+            (title, assigned_to, creation_date, due_date, completed, recurring, group_id, frequency_hours, always_assigned, project_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [params for _, params in rows_to_insert])
+        cursor.execute("SELECT * FROM tasks WHERE id > ? ORDER BY id", (before,))
+        return cursor.fetchall()
+
+    try:
+        created = run_bulk(apply)
+    except Exception as e:
+        log_error("[api_bulk_create_tasks] Exception occurred: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
+    changes = []
+    actor = session.get("username")
+    for (index, _), row in zip(rows_to_insert, created):
+        task = task_dict(row)
+        results[index] = {"index": index, "status": 201, "task": task}
+        if task["recurring"]:
+            recurring_scheduler.schedule(task["id"], task["due_date"])
+        push_notifier.publish("task_created", task, actor=actor)
+        changes.append((task["group_id"], "create", task["id"], task))
+    publish_bulk_changes("task", changes)
+    log("[api_bulk_create_tasks] Created %s of %s tasks", len(created), len(items))
+    return jsonify({"results": results}), 200
+
+@app.route('/api/tasks/bulk/complete', methods=['POST'])
+def api_bulk_complete_tasks():
+    data = request.get_json(silent=True) or {}
+    username = data.get("username")
+    if not username:
+        return jsonify({"error": "Username is required"}), 400
+    task_ids, error = bulk_items(data, "task_ids")
+    if error:
+        return error
+    results = [None] * len(task_ids)
+    completed_on = datetime.utcnow().isoformat()
+
+    def apply(cursor):
+        applicable = classify_task_ids(cursor, enumerate(task_ids), results, "completed != 0",
+                                       "Task is already completed")
+        cursor.executemany(f"""
+            UPDATE tasks SET completed=1, completed_by=?, completed_on=?, updated_at={SQL_NOW} WHERE id=?
+        """, [(username, completed_on, task_id) for task_id in applicable])
+        return applicable, fetch_tasks_by_id(cursor, applicable)
+
+    try:
+        applicable, rows = run_bulk(apply)
     except Exception as e:
-        log(f"[api_join_task] Exception occurred: {e}")
+        log_error("[api_bulk_complete_tasks] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error"}), 500
+    changes = []
+    for task_id, index in applicable.items():
+        row = rows[task_id]
+        task = task_dict(row)
+        results[index] = {"index": index, "status": 200, "task": task}
+        push_notifier.publish("task_finished", task, actor=username)
+        changes.append((task["group_id"], "update", task_id,
+                        {"completed": task["completed"], "completed_by": task["completed_by"],
+                         "completed_on": task["completed_on"], "updated_at": row["updated_at"]}))
+    publish_bulk_changes("task", changes)
+    log("[api_bulk_complete_tasks] %s completed %s of %s tasks", username, len(applicable), len(task_ids))
+    return jsonify({"results": results}), 200
+
+@app.route('/api/tasks/bulk/reassign', methods=['POST'])
+def api_bulk_reassign_tasks():
+    data = request.get_json(silent=True) or {}
+    items, error = bulk_items(data, "assignments")
+    if error:
+        return error
+    results = [None] * len(items)
+    assignees = {}
+    raw_ids = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {"index": index, "status": 400, "error": "Item must be an object"}
+            continue
+        raw_ids.append((index, item.get("id")))
+        assignees[index] = item.get("assigned_to") or None
+
+    def apply(cursor):
+        applicable = classify_task_ids(cursor, raw_ids, results, "completed != 0", "Task is already completed")
+        cursor.executemany(f"UPDATE tasks SET assigned_to=?, updated_at={SQL_NOW} WHERE id=?",
+                           [(assignees[index], task_id) for task_id, index in applicable.items()])
+        return applicable, fetch_tasks_by_id(cursor, applicable)
+
+    try:
+        applicable, rows = run_bulk(apply)
+    except Exception as e:
+        log_error("[api_bulk_reassign_tasks] Exception occurred: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
+    changes = []
+    for task_id, index in applicable.items():
+        row = rows[task_id]
+        results[index] = {"index": index, "status": 200, "task": task_dict(row)}
+        changes.append((row["group_id"], "update", task_id,
+                        {"assigned_to": row["assigned_to"], "updated_at": row["updated_at"]}))
+    publish_bulk_changes("task", changes)
+    log("[api_bulk_reassign_tasks] Reassigned %s of %s tasks", len(applicable), len(items))
+    return jsonify({"results": results}), 200
+
+@app.route('/api/scheduler/stats', methods=['GET'])
+@requires_permission("manage_permissions")
+def api_scheduler_stats():
+    return jsonify(recurring_scheduler.stats()), 200
+
+@app.route('/api/sms/stats', methods=['GET'])
+@requires_permission("manage_permissions")
+def api_sms_stats():
+    return jsonify(sms_queue.stats()), 200
+
+@app.route('/api/otp/stats', methods=['GET'])
+@requires_permission("manage_permissions")
+def api_otp_stats():
+    return jsonify(otp_store.stats()), 200
+
+@app.route('/api/events', methods=['GET'])
+def api_events():
+    # Server-Sent Events for one group. Event types: "task" and "project_todo"
+    # with {"op", "id", "fields"} (op create/update/delete/archive, or "bulk"),
+    # and "resync" when the client has to refetch.
+    # EventSource sends Last-Event-ID on reconnect; ?last_event_id= works too.
+    group_id = request.args.get("group_id")
+    if not group_id:
+        return jsonify({"error": "Missing group_id parameter"}), 400
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    log("[api_events] Client subscribed to group %s (last event %s)", group_id, last_event_id)
+    return Response(event_bus.stream(group_id, last_event_id), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/events/stats', methods=['GET'])
+@requires_permission("manage_permissions")
+def api_events_stats():
+    return jsonify(event_bus.stats()), 200
+
+@app.route('/api/log_level', methods=['GET'])
+@requires_permission("manage_permissions")
+def api_get_log_level():
+    return jsonify(log_config.stats()), 200
+
+@app.route('/api/log_level', methods=['PUT'])
+@requires_permission("manage_permissions")
+def api_set_log_level():
+    # {"level": "DEBUG"} or {"logger": "scheduler", "level": "WARNING"}
+    data = request.get_json() or {}
+    try:
+        level = log_config.set_level(data.get("logger", log_config.APP_LOGGER), data.get("level", ""))
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid level"}), 400
+    logger.info("Log level of %s set to %s by %s", data.get("logger", log_config.APP_LOGGER), level, session.get("username"))
+    return jsonify(log_config.stats()), 200
+
+@app.route('/api/push/stats', methods=['GET'])
+@requires_permission("manage_permissions")
+def api_push_stats():
+    return jsonify(push_notifier.stats()), 200
+
+@app.route('/api/archive/stats', methods=['GET'])
+@requires_permission("manage_permissions")
+def api_archive_stats():
+    return jsonify(task_archiver.stats()), 200
 
 # --- SOP Endpoints ---
 @app.route('/api/sops', methods=['GET'])
 @requires_permission("manage_sops")
+@versioned(sop_versions, CACHE_SOPS)
 def api_get_sops():
+    # ?group_id= limits the list to one group (idx_sops_group).
+    group_id = request.args.get("group_id")
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM sops")
-    sops = [dict(row) for row in cursor.fetchall()]
+    cursor = tuple_cursor(conn)
+    if group_id:
+        cursor.execute("SELECT * FROM sops WHERE group_id=?", (group_id,))
+    else:
+        cursor.execute("SELECT * FROM sops")
+    sops = RowSet.fetch(cursor)
     conn.close()
-    log(f"[api_get_sops] Returning {len(sops)} SOPs")
-    return jsonify(sops), 200
+    log("[api_get_sops] Returning %s SOPs", len(sops))
+    return json_response(sops.to_json())
 
 @app.route('/api/sops', methods=['POST'])
 @requires_permission("manage_sops")
@@ -948,7 +1719,7 @@ def api_create_sop():
     cursor.execute("SELECT * FROM sops WHERE id=?", (new_id,))
     sop = dict(cursor.fetchone())
     conn.close()
-    log(f"[api_create_sop] Created SOP with id={new_id}")
+    log("[api_create_sop] Created SOP with id=%s", new_id)
     return jsonify(sop), 201
 
 @app.route('/api/sop_agreement', methods=['POST'])
@@ -974,7 +1745,7 @@ def api_agree_sop():
         cursor.execute("INSERT INTO sop_agreements (sop_id, username, agreed_at, sop_version) VALUES (?, ?, ?, ?)", (sop_id, username, agreed_at, sop_version))
     conn.commit()
     conn.close()
-    log(f"[api_agree_sop] User '{username}' agreed to SOP {sop_id} version {sop_version} at {agreed_at}")
+    log("[api_agree_sop] User '%s' agreed to SOP %s version %s at %s", username, sop_id, sop_version, agreed_at)
     return jsonify({"status": "ok", "message": "SOP agreed"}), 200
 
 # --- Notification Endpoint ---
@@ -986,7 +1757,7 @@ def register_token():
     if not token or not username:
         log("[register_token] Missing token or username.")
         return jsonify({"error": "Missing token or username"}), 400
-    log(f"[register_token] Received token for user {username}: {token}")
+    log("[register_token] Received token for user %s: %s", username, token)
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM device_tokens WHERE username=? AND token=?", (username, token))
@@ -1001,51 +1772,96 @@ def register_token():
     return jsonify({"status": "ok"}), 200
 
 # --- Projects Endpoints ---
+PROJECT_INCLUDES = ["todos", "assignments"]
+
 @app.route('/api/projects', methods=['GET'])
+@versioned(project_versions)
 def api_get_projects():
-    log("[api/projects] Fetching projects...")
+    # Served by a fixed number of queries regardless of the number of projects
+    # (up to 500 per todo / assignment query): the projects themselves, then
+    # all of their todos and assignments in one go each, grouped by project_id
+    # in Python.
+    #   ?fields=name,group_id      project columns to return (id is always included)
+    #   ?include=todos,assignments nested collections to load (default: both)
+    #   ?completed=0|1             only include todos with this completed state
+    group_id = request.args.get("group_id")
+    fields_arg = request.args.get("fields")
+    include_arg = request.args.get("include")
+    completed = request.args.get("completed")
+
+    if fields_arg:
+        fields = [f.strip() for f in fields_arg.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in PROJECT_FIELDS]
+        if unknown:
+            return jsonify({"error": "Unknown fields", "fields": unknown}), 400
+        if "id" not in fields:
+            fields.insert(0, "id")
+    else:
+        fields = list(PROJECT_FIELDS)
+    if include_arg is not None:
+        include = [i.strip() for i in include_arg.split(",") if i.strip()]
+        unknown = [i for i in include if i not in PROJECT_INCLUDES]
+        if unknown:
+            return jsonify({"error": "Unknown include", "include": unknown}), 400
+    else:
+        include = PROJECT_INCLUDES
+    if completed is not None:
+        if completed not in ("0", "1"):
+            return jsonify({"error": "completed must be 0 or 1"}), 400
+        completed = int(completed)
+
     conn = get_db_connection()
     cursor = conn.cursor()
-    group_id = request.args.get("group_id")
-    if (group_id):
-        cursor.execute("SELECT * FROM projects WHERE group_id=?", (group_id,))
+    if group_id:
+        project_filter, project_params = "WHERE group_id=?", (group_id,)
     else:
-        cursor.execute("SELECT * FROM projects")
-    projects_rows = cursor.fetchall()
+        project_filter, project_params = "", ()
+    # fields are validated against PROJECT_FIELDS above, so they are safe to interpolate.
+    cursor.execute(f"SELECT {', '.join(fields)} FROM projects {project_filter} ORDER BY id", project_params)
     projects_list = []
-    for proj in projects_rows:
-        proj_dict = {
-            "id": proj["id"],
-            "name": proj["name"],
-            "description": proj["description"],
-            "created_by": proj["created_by"],
-            "creation_date": proj["creation_date"],
-            "group_id": proj["group_id"],
-            "todos": []
-        }
-        log(f"[api/projects] Loaded project '{proj_dict['name']}' assigned to group '{proj_dict['group_id']}'")
-        cursor.execute("SELECT * FROM project_todos WHERE project_id=?", (proj["id"],))
-        todos = cursor.fetchall()
-        for todo in todos:
-            proj_dict["todos"].append({
-                "id": todo["id"],
-                "title": todo["title"],
-                "description": todo["description"],
-                "due_date": todo["due_date"],
-                "is_task": todo["is_task"],
-                "assigned_to": todo["assigned_to"],
-                "points": todo["points"],
-                "creation_date": todo["creation_date"],
-                "completed": todo["completed"],
-                "completed_by": todo["completed_by"],
-                "completed_on": todo["completed_on"]
-            })
-        cursor.execute("SELECT username FROM project_assignments WHERE project_id=?", (proj["id"],))
-        assignments = [row["username"] for row in cursor.fetchall()]
-        proj_dict["assignments"] = assignments
+    projects_by_id = {}
+    for proj in cursor.fetchall():
+        proj_dict = project_dict(proj, fields)
+        if "todos" in include:
+            proj_dict["todos"] = []
+        if "assignments" in include:
+            proj_dict["assignments"] = []
+        projects_by_id[proj["id"]] = proj_dict
         projects_list.append(proj_dict)
+
+    # Todos and assignments are filtered by the ids read above rather than by
+    # re-running the project filter: a project created in between would
+    # otherwise bring rows without an entry in projects_by_id.
+    project_ids = list(projects_by_id)
+    if project_ids and "todos" in include:
+        todo_cursor = tuple_cursor(conn)
+        # Stay well below SQLite's bound-parameter limit.
+        for i in range(0, len(project_ids), 500):
+            chunk = project_ids[i:i + 500]
+            todo_sql = f"""
+                SELECT project_id, {', '.join(TODO_FIELDS)} FROM project_todos
+                WHERE project_id IN ({','.join('?' * len(chunk))})
+            """
+            todo_params = chunk
+            if completed is not None:
+                todo_sql += " AND completed=?"
+                todo_params = chunk + [completed]
+            todo_cursor.execute(todo_sql + " ORDER BY project_id, id", todo_params)
+            for project_id, *todo in todo_cursor:
+                projects_by_id[project_id]["todos"].append(dict(zip(TODO_FIELDS, todo)))
+
+    if project_ids and "assignments" in include:
+        for i in range(0, len(project_ids), 500):
+            chunk = project_ids[i:i + 500]
+            cursor.execute(f"""
+                SELECT project_id, username FROM project_assignments
+                WHERE project_id IN ({','.join('?' * len(chunk))})
+                ORDER BY project_id, id
+            """, chunk)
+            for row in cursor.fetchall():
+                projects_by_id[row["project_id"]]["assignments"].append(row["username"])
     conn.close()
-    log(f"[api/projects] Found {len(projects_list)} projects")
+    log("[api/projects] Found %s projects", len(projects_list))
     return jsonify(projects_list), 200
 
 @app.route('/api/projects', methods=['POST'])
@@ -1058,7 +1874,7 @@ def api_create_project():
     description = data.get("description", "")
     created_by = data.get("created_by", "Unknown")
     creation_date = datetime.utcnow().isoformat()
-    log(f"[api/create_project] Creating project: name={name}, createdBy={created_by}, group_id={data.get('group_id', 'default')}")
+    log("[api/create_project] Creating project: name=%s, createdBy=%s, group_id=%s", name, created_by, data.get('group_id', 'default'))
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
@@ -1070,16 +1886,9 @@ def api_create_project():
     cursor.execute("SELECT * FROM projects WHERE id=?", (new_id,))
     proj = cursor.fetchone()
     conn.close()
-    project = {
-        "id": proj["id"],
-        "name": proj["name"],
-        "description": proj["description"],
-        "created_by": proj["created_by"],
-        "creation_date": proj["creation_date"],
-        "group_id": proj["group_id"],
-        "assignments": []
-    }
-    log(f"[api/create_project] Project created with id={new_id} and assigned to group '{project['group_id']}'")
+    project = project_dict(proj)
+    project["assignments"] = []
+    log("[api/create_project] Project created with id=%s and assigned to group '%s'", new_id, project['group_id'])
     return jsonify(project), 201
 
 @app.route('/api/projects/<int:project_id>/todos', methods=['POST'])
@@ -1093,7 +1902,7 @@ def api_create_project_todo(project_id):
     due_date = data.get("due_date", None)
     points = data.get("points", 0)
     creation_date = datetime.utcnow().isoformat()
-    log(f"[api/create_project_todo] Creating todo in project {project_id}: title={title}, due_date={due_date}, points={points}")
+    log("[api/create_project_todo] Creating todo in project %s: title=%s, due_date=%s, points=%s", project_id, title, due_date, points)
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
@@ -1104,23 +1913,14 @@ def api_create_project_todo(project_id):
     new_id = cursor.lastrowid
     cursor.execute("SELECT * FROM project_todos WHERE id=?", (new_id,))
     todo = cursor.fetchone()
+    cursor.execute("SELECT group_id FROM projects WHERE id=?", (project_id,))
+    project = cursor.fetchone()
     conn.close()
-    todo_dict = {
-        "id": todo["id"],
-        "project_id": todo["project_id"],
-        "title": todo["title"],
-        "description": todo["description"],
-        "due_date": todo["due_date"],
-        "is_task": todo["is_task"],
-        "assigned_to": todo["assigned_to"],
-        "points": todo["points"],
-        "creation_date": todo["creation_date"],
-        "completed": todo["completed"],
-        "completed_by": todo["completed_by"],
-        "completed_on": todo["completed_on"]
-    }
-    log(f"[api/create_project_todo] Todo created with id={new_id} in project {project_id}")
-    return jsonify(todo_dict), 201
+    payload = todo_dict(todo)
+    log("[api/create_project_todo] Todo created with id=%s in project %s", new_id, project_id)
+    if project is not None:
+        publish_change(project["group_id"], "project_todo", "create", new_id, payload)
+    return jsonify(payload), 201
 
 @app.route('/api/projects/<int:project_id>/todos/<int:todo_id>/convert', methods=['POST'])
 def api_convert_project_todo(project_id, todo_id):
@@ -1137,9 +1937,9 @@ def api_convert_project_todo(project_id, todo_id):
     allowed = [row["username"] for row in cursor.fetchall()]
     if allowed and (assigned_to not in allowed):
         conn.close()
-        log(f"[api/convert_project_todo] Assigned user {assigned_to} is not allowed for project {project_id}. Allowed: {allowed}")
+        log("[api/convert_project_todo] Assigned user %s is not allowed for project %s. Allowed: %s", assigned_to, project_id, allowed)
         return jsonify({"error": "User not allowed for this project"}), 403
-    log(f"[api/convert_project_todo] Converting todo {todo_id} in project {project_id} to aufgabe: assigned_to={assigned_to}, duration_hours={duration_hours}, points={points}")
+    log("[api/convert_project_todo] Converting todo %s in project %s to aufgabe: assigned_to=%s, duration_hours=%s, points=%s", todo_id, project_id, assigned_to, duration_hours, points)
     creation_date = datetime.utcnow()
     due_date = creation_date + timedelta(hours=duration_hours)
     cursor.execute("""
@@ -1150,59 +1950,44 @@ def api_convert_project_todo(project_id, todo_id):
     conn.commit()
     cursor.execute("SELECT * FROM project_todos WHERE id=? AND project_id=?", (todo_id, project_id))
     todo = cursor.fetchone()
+    cursor.execute("SELECT group_id FROM projects WHERE id=?", (project_id,))
+    project = cursor.fetchone()
     conn.close()
-    todo_dict = {
-        "id": todo["id"],
-        "project_id": todo["project_id"],
-        "title": todo["title"],
-        "description": todo["description"],
-        "due_date": todo["due_date"],
-        "is_task": todo["is_task"],
-        "assigned_to": todo["assigned_to"],
-        "points": todo["points"],
-        "creation_date": todo["creation_date"],
-        "completed": todo["completed"],
-        "completed_by": todo["completed_by"],
-        "completed_on": todo["completed_on"]
-    }
-    log(f"[api/convert_project_todo] Todo {todo_id} converted to aufgabe in project {project_id}")
-    return jsonify(todo_dict), 200
+    payload = todo_dict(todo)
+    log("[api/convert_project_todo] Todo %s converted to aufgabe in project %s", todo_id, project_id)
+    if project is not None:
+        publish_change(project["group_id"], "project_todo", "update", todo_id,
+                       {key: payload[key] for key in ("is_task", "assigned_to", "due_date", "points")})
+    return jsonify(payload), 200
 
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def export_response(chunks, mimetype: str, filename: str):
+    # No Content-Length, so the body goes out with chunked transfer encoding.
+    return Response(chunks, mimetype=mimetype,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+# Exports accept ?columns=a,b,c and a ?from= / ?to= date range (dates or ISO timestamps).
 @app.route('/api/projects/export_csv', methods=['GET'])
 def api_export_projects_csv():
     log("[api/projects/export_csv] Exporting projects as CSV...")
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM projects")
-    projects = cursor.fetchall()
-    si = io.StringIO()
-    cw = csv.writer(si)
-    cw.writerow(["id", "name", "description", "created_by", "creation_date", "group_id"])
-    for proj in projects:
-        cw.writerow([proj["id"], proj["name"], proj["description"], proj["created_by"], proj["creation_date"], proj["group_id"]])
-    conn.close()
-    output = io.BytesIO()
-    output.write(si.getvalue().encode("utf-8"))
-    output.seek(0)
-    return send_file(output, mimetype="text/csv", as_attachment=True, download_name="projects.csv")
+    try:
+        columns, where_sql, params = parse_export_args(request.args, PROJECT_EXPORT_COLUMNS, "creation_date")
+    except ExportArgsError as e:
+        return jsonify({"error": str(e)}), 400
+    source = f"projects WHERE 1=1{where_sql}"
+    return export_response(stream_csv(export_pool.connection, columns, source, params), "text/csv", "projects.csv")
 
 @app.route('/api/projects/export_xlsx', methods=['GET'])
 def api_export_projects_xlsx():
     log("[api/projects/export_xlsx] Exporting projects as XLSX...")
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM projects")
-    projects = cursor.fetchall()
-    si = io.StringIO()
-    cw = csv.writer(si)
-    cw.writerow(["id", "name", "description", "created_by", "creation_date", "group_id"])
-    for proj in projects:
-        cw.writerow([proj["id"], proj["name"], proj["description"], proj["created_by"], proj["creation_date"], proj["group_id"]])
-    conn.close()
-    output = io.BytesIO()
-    output.write(si.getvalue().encode("utf-8"))
-    output.seek(0)
-    return send_file(output, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", as_attachment=True, download_name="projects.xlsx")
+    try:
+        columns, where_sql, params = parse_export_args(request.args, PROJECT_EXPORT_COLUMNS, "creation_date")
+    except ExportArgsError as e:
+        return jsonify({"error": str(e)}), 400
+    source = f"projects WHERE 1=1{where_sql}"
+    return export_response(stream_xlsx_export(export_pool.connection, columns, source, params, "Projects"),
+                           XLSX_MIMETYPE, "projects.xlsx")
 
 # --- New Endpoints for Project Assignments ---
 
@@ -1215,10 +2000,10 @@ def api_get_project_assignments(project_id):
         rows = cursor.fetchall()
         assignments = [row["username"] for row in rows]
         conn.close()
-        log(f"[api_get_project_assignments] Returning assignments for project {project_id}: {assignments}")
+        log("[api_get_project_assignments] Returning assignments for project %s: %s", project_id, assignments)
         return jsonify(assignments), 200
     except Exception as e:
-        log(f"[api_get_project_assignments] Exception: {e}")
+        log_error("[api_get_project_assignments] Exception: %s", e)
         return jsonify({"error": "Internal server error during fetching project assignments"}), 500
 
 @app.route('/api/projects/<int:project_id>/assignments', methods=['POST'])
@@ -1238,10 +2023,10 @@ def api_add_project_assignment(project_id):
         cursor.execute("INSERT INTO project_assignments (project_id, username) VALUES (?, ?)", (project_id, username))
         conn.commit()
         conn.close()
-        log(f"[api_add_project_assignment] Added {username} to project {project_id}")
+        log("[api_add_project_assignment] Added %s to project %s", username, project_id)
         return jsonify({"status": "ok"}), 201
     except Exception as e:
-        log(f"[api_add_project_assignment] Exception: {e}")
+        log_error("[api_add_project_assignment] Exception: %s", e)
         return jsonify({"error": "Internal server error during assigning user to project"}), 500
 
 @app.route('/api/projects/<int:project_id>/assignments/<username>', methods=['DELETE'])
@@ -1253,105 +2038,166 @@ def api_remove_project_assignment(project_id, username):
         cursor.execute("DELETE FROM project_assignments WHERE project_id=? AND username=?", (project_id, username))
         conn.commit()
         conn.close()
-        log(f"[api_remove_project_assignment] Removed {username} from project {project_id}")
+        log("[api_remove_project_assignment] Removed %s from project %s", username, project_id)
         return jsonify({"status": "ok"}), 200
     except Exception as e:
-        log(f"[api_remove_project_assignment] Exception: {e}")
+        log_error("[api_remove_project_assignment] Exception: %s", e)
         return jsonify({"error": "Internal server error during removing project assignment"}), 500
 
+# --- Search ---
+# GET /api/search?q=...&group_id=...[&kind=task,todo,sop][&limit=20][&offset=0]
+# Ranked full-text hits with highlighted titles and body snippets, see search.py.
+@app.route('/api/search', methods=['GET'])
+@versioned(group_arg_versions)
+def api_search():
+    q = request.args.get("q", "").strip()
+    group_id = request.args.get("group_id")
+    if not q or not group_id:
+        return jsonify({"error": "q and group_id are required"}), 400
+    try:
+        kinds = search.parse_kinds(request.args.get("kind"))
+        limit = min(int(request.args.get("limit", search.SEARCH_DEFAULT_LIMIT)), search.SEARCH_MAX_LIMIT)
+        offset = int(request.args.get("offset", 0))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({"error": "limit must be positive and offset not negative"}), 400
+    try:
+        conn = get_db_connection()
+        results, next_offset = search.search(conn.cursor(), q, group_id, kinds, limit, offset)
+        conn.close()
+        log("[api_search] %s hits for %r in group %s", len(results), q, group_id)
+        return jsonify({"results": results, "next_offset": next_offset}), 200
+    except Exception as e:
+        log_error("[api_search] Exception occurred: %s", e)
+        return jsonify({"error": "Internal server error during search"}), 500
+
 # --- History / Archiving Endpoints ---
 @app.route('/api/history', methods=['GET'])
+@versioned(group_arg_versions)
 def api_get_history():
     group_id = request.args.get("group_id")
     if not group_id:
         log("[api_get_history] Missing group_id parameter")
         return jsonify({"error": "Missing group_id parameter"}), 400
+    try:
+        page = parse_page_args(request.args)
+        shape = parse_shape(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE completed = 1 AND group_id=?", (group_id,))
-        rows = cursor.fetchall()
-        tasks = [dict(row) for row in rows]
+        cursor = tuple_cursor(conn)
+        with read_transaction(conn):
+            tasks, removed, next_cursor, sync_token = fetch_task_page(
+                cursor, "completed = 1 AND group_id=?", (group_id,), page, group_id, "tasks_all")
         conn.close()
-        log(f"[api_get_history] Returning {len(tasks)} archived tasks for group {group_id}")
-        return jsonify(tasks), 200
+        log("[api_get_history] Returning %s archived tasks for group %s", len(tasks), group_id)
+        return task_page_response(tasks, removed, shape, next_cursor, sync_token)
     except Exception as e:
-        log(f"[api_get_history] Exception occurred: {e}")
+        log_error("[api_get_history] Exception occurred: %s", e)
         return jsonify({"error": "Internal server error during fetching history"}), 500
 
 @app.route('/export_history_csv', methods=['GET'])
 def export_history_csv():
     group_id = request.args.get("group_id", "default")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE completed = 1 AND group_id=?", (group_id,))
-        rows = cursor.fetchall()
-        si = io.StringIO()
-        cw = csv.writer(si)
-        cw.writerow(["id", "title", "assigned_to", "creation_date", "due_date", "completed", "completed_by", "completed_on", "recurring", "frequency_hours", "always_assigned", "group_id", "project_id"])
-        for row in rows:
-            cw.writerow([
-                row["id"],
-                row["title"],
-                row["assigned_to"],
-                row["creation_date"],
-                row["due_date"],
-                row["completed"],
-                row["completed_by"],
-                row["completed_on"],
-                row["recurring"],
-                row["frequency_hours"],
-                row["always_assigned"],
-                row["group_id"],
-                row.get("project_id")
-            ])
-        conn.close()
-        output = io.BytesIO()
-        output.write(si.getvalue().encode("utf-8"))
-        output.seek(0)
-        log(f"[export_history_csv] Exported CSV for group_id {group_id}")
-        return send_file(output, mimetype="text/csv", as_attachment=True, download_name="history.csv")
-    except Exception as e:
-        log(f"[export_history_csv] Exception occurred: {e}")
-        return jsonify({"error": "Internal server error during export"}), 500
+        columns, where_sql, params = parse_export_args(request.args, HISTORY_EXPORT_COLUMNS, "completed_on")
+    except ExportArgsError as e:
+        return jsonify({"error": str(e)}), 400
+    source = f"tasks_all WHERE completed = 1 AND group_id=?{where_sql}"
+    log("[export_history_csv] Streaming CSV for group_id %s", group_id)
+    return export_response(stream_csv(export_pool.connection, columns, source, [group_id] + params), "text/csv", "history.csv")
 
 @app.route('/export_history_xlsx', methods=['GET'])
 def export_history_xlsx():
     group_id = request.args.get("group_id", "default")
+    try:
+        columns, where_sql, params = parse_export_args(request.args, HISTORY_EXPORT_COLUMNS, "completed_on")
+    except ExportArgsError as e:
+        return jsonify({"error": str(e)}), 400
+    source = f"tasks_all WHERE completed = 1 AND group_id=?{where_sql}"
+    log("[export_history_xlsx] Streaming XLSX for group_id %s", group_id)
+    return export_response(stream_xlsx_export(export_pool.connection, columns, source, [group_id] + params, "History"),
+                           XLSX_MIMETYPE, "history.xlsx")
+
+# --- Stats Endpoint ---
+@app.route('/api/stats', methods=['GET'])
+def api_get_stats():
+    # Answered from the stats_daily rollup table (maintained by triggers, see
+    # migrations.py), so the cost grows with the number of days, not tasks.
+    #   ?days=N              size of the daily window (default 30, max 366)
+    #   ?username=NAME       only include this user in users/daily
+    #   ?include=all_tasks   also return the group's completed tasks (legacy clients)
+    group_id = request.args.get("group_id")
+    if not group_id:
+        return jsonify({"error": "Missing group_id parameter"}), 400
+    try:
+        days = min(max(int(request.args.get("days", 30)), 1), 366)
+    except ValueError:
+        return jsonify({"error": "days must be an integer"}), 400
+    username = request.args.get("username")
+    include = [i.strip() for i in request.args.get("include", "").split(",") if i.strip()]
+    since = (datetime.utcnow() - timedelta(days=days - 1)).date().isoformat()
+    user_filter, user_params = ("AND username=?", (username,)) if username else ("", ())
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE completed = 1 AND group_id=?", (group_id,))
-        rows = cursor.fetchall()
-        si = io.StringIO()
-        cw = csv.writer(si)
-        cw.writerow(["id", "title", "assigned_to", "creation_date", "due_date", "completed", "completed_by", "completed_on", "recurring", "frequency_hours", "always_assigned", "group_id", "project_id"])
-        for row in rows:
-            cw.writerow([
-                row["id"],
-                row["title"],
-                row["assigned_to"],
-                row["creation_date"],
-                row["due_date"],
-                row["completed"],
-                row["completed_by"],
-                row["completed_on"],
-                row["recurring"],
-                row["frequency_hours"],
-                row["always_assigned"],
-                row["group_id"],
-                row.get("project_id")
-            ])
+        cursor.execute(f"""
+            SELECT username, SUM(completed) AS completed, SUM(timed) AS timed,
+                   SUM(total_minutes) AS total_minutes, SUM(overdue) AS overdue, SUM(points) AS points
+            FROM stats_daily WHERE group_id=? {user_filter}
+            GROUP BY username ORDER BY completed DESC
+        """, (group_id,) + user_params)
+        users = []
+        for row in cursor.fetchall():
+            avg_minutes = row["total_minutes"] / row["timed"] if row["timed"] else None
+            users.append({
+                "username": row["username"],
+                "completed": row["completed"],
+                "overdue": row["overdue"],
+                "points": row["points"],
+                "avg_minutes": avg_minutes,
+                "avg_time": format_duration(avg_minutes) if avg_minutes is not None else ""
+            })
+        cursor.execute(f"""
+            SELECT day, SUM(completed) AS completed, SUM(timed) AS timed,
+                   SUM(total_minutes) AS total_minutes, SUM(overdue) AS overdue, SUM(points) AS points
+            FROM stats_daily WHERE group_id=? AND day >= ? {user_filter}
+            GROUP BY day ORDER BY day
+        """, (group_id, since) + user_params)
+        daily = [{
+            "day": row["day"],
+            "completed": row["completed"],
+            "overdue": row["overdue"],
+            "points": row["points"],
+            "avg_minutes": row["total_minutes"] / row["timed"] if row["timed"] else None
+        } for row in cursor.fetchall()]
+        cursor.execute("""
+            SELECT COUNT(*) AS open_tasks, COALESCE(SUM(due_date < ?), 0) AS open_overdue
+            FROM tasks WHERE group_id=? AND completed=0
+        """, (datetime.utcnow().isoformat(), group_id))
+        live = cursor.fetchone()
+        all_tasks = []
+        if "all_tasks" in include:
+            cursor.execute("SELECT * FROM tasks_all WHERE completed = 1 AND group_id=?", (group_id,))
+            all_tasks = [dict(row) for row in cursor.fetchall()]
         conn.close()
-        output = io.BytesIO()
-        output.write(si.getvalue().encode("utf-8"))
-        output.seek(0)
-        log(f"[export_history_xlsx] Exported XLSX (CSV formatted) for group_id {group_id}")
-        return send_file(output, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", as_attachment=True, download_name="history.xlsx")
+        stats = {
+            "group_id": group_id,
+            "completions": [{"completed_by": u["username"], "total_completed": u["completed"]}
+                            for u in users if u["completed"]],
+            "users": users,
+            "daily": daily,
+            "open_tasks": live["open_tasks"],
+            "open_overdue": live["open_overdue"],
+            "all_tasks": all_tasks
+        }
+        log("[api_get_stats] Returning stats for group %s (%s users, %s days)", group_id, len(users), len(daily))
+        return jsonify(stats), 200
     except Exception as e:
-        log(f"[export_history_xlsx] Exception occurred: {e}")
-        return jsonify({"error": "Internal server error during export"}), 500
+        log_error("[api_get_stats] Exception occurred: %s", e)
+        return jsonify({"error": "Internal server error during fetching stats"}), 500
 
 # --- Heartbeat, OTP, and Registration Endpoints ---
 @app.route('/api/heartbeat', methods=['GET'])
@@ -1363,14 +2209,19 @@ def api_heartbeat_duplicate():
 def api_request_otp():
     data = request.get_json() or {}
     raw_phone = data.get("phone", "").strip()
-    log(f"[api/request_otp] raw_phone={raw_phone}")
+    log("[api/request_otp] raw_phone=%s", raw_phone)
     if not raw_phone:
         return jsonify({"status": "error", "message": "No phone provided"}), 400
     phone = normalize_phone(raw_phone)
     code = generate_otp_code()
-    expires_at = datetime.utcnow() + timedelta(minutes=5)
-    pending_otps[phone] = {"code": code, "expires": expires_at}
-    log(f"[api/request_otp] Generated OTP for phone {phone} with code {code} (expires at {expires_at.isoformat()})")
+    try:
+        otp_store.put(phone, code)
+    except OtpRateLimited as e:
+        log("[api/request_otp] Rate limited phone %s", phone)
+        response = jsonify({"status": "error", "message": "Too many OTP requests, try again later"})
+        response.headers["Retry-After"] = str(int(e.retry_after) + 1)
+        return response, 429
+    log("[api/request_otp] Generated OTP for phone %s with code %s (valid for %ss)", phone, code, int(otp_store.ttl))
     send_otp_sms(phone, code)
     return jsonify({"status": "otp_sent"}), 200
 
@@ -1379,22 +2230,23 @@ def api_verify_otp():
     data = request.get_json() or {}
     raw_phone = data.get("phone", "").strip()
     otp_code = data.get("otp_code", "").strip()
-    log(f"[api/verify_otp] raw_phone={raw_phone}, otp_code={otp_code}")
+    log("[api/verify_otp] raw_phone=%s, otp_code=%s", raw_phone, otp_code)
     if not raw_phone or not otp_code:
         return jsonify({"status": "error", "message": "Missing phone or otp_code"}), 400
     phone = normalize_phone(raw_phone)
-    entry = pending_otps.get(phone)
-    if not entry:
-        log(f"[api/verify_otp] No OTP pending for phone {phone}")
+    result = otp_store.verify(phone, otp_code)
+    if result == VERIFY_MISSING:
+        log("[api/verify_otp] No OTP pending for phone %s", phone)
         return jsonify({"status": "fail", "message": "No OTP pending"}), 401
-    if datetime.utcnow() > entry["expires"]:
-        log(f"[api/verify_otp] OTP expired for phone {phone}")
-        del pending_otps[phone]
+    if result == VERIFY_EXPIRED:
+        log("[api/verify_otp] OTP expired for phone %s", phone)
         return jsonify({"status": "fail", "message": "OTP expired"}), 401
-    if otp_code != entry["code"]:
-        log(f"[api/verify_otp] Incorrect OTP for phone {phone}")
+    if result == VERIFY_LOCKED:
+        log("[api/verify_otp] Too many wrong codes for phone %s, OTP discarded", phone)
+        return jsonify({"status": "fail", "message": "Too many attempts, request a new code"}), 401
+    if result != VERIFY_OK:
+        log("[api/verify_otp] Incorrect OTP for phone %s", phone)
         return jsonify({"status": "fail", "message": "Incorrect code"}), 401
-    del pending_otps[phone]
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT username FROM users WHERE phone=?", (phone,))
@@ -1403,10 +2255,10 @@ def api_verify_otp():
     if row:
         username = row["username"]
         session['username'] = username
-        log(f"[api/verify_otp] User exists. Logging in as {username}")
+        log("[api/verify_otp] User exists. Logging in as %s", username)
         return jsonify({"status": "ok", "username": username}), 200
     else:
-        log(f"[api/verify_otp] No user registered for phone {phone}. Registration required.")
+        log("[api/verify_otp] No user registered for phone %s. Registration required.", phone)
         return jsonify({"status": "registration_required", "phone": phone}), 200
 
 @app.route('/api/register', methods=['POST'])
@@ -1414,7 +2266,7 @@ def api_register():
     data = request.get_json() or {}
     phone = data.get("phone", "").strip()
     username = data.get("username", "").strip()
-    log(f"[api/register] Attempting to register phone={phone} with username={username}")
+    log("[api/register] Attempting to register phone=%s with username=%s", phone, username)
     if not phone or not username:
         return jsonify({"status": "error", "message": "Missing phone or username"}), 400
     phone = normalize_phone(phone)
@@ -1423,18 +2275,141 @@ def api_register():
     cursor.execute("SELECT * FROM users WHERE phone=?", (phone,))
     if cursor.fetchone():
         conn.close()
-        log(f"[api/register] User with phone {phone} already registered.")
+        log("[api/register] User with phone %s already registered.", phone)
         return jsonify({"status": "error", "message": "User already registered"}), 400
     cursor.execute("INSERT INTO users (phone, username) VALUES (?,?)", (phone, username))
     conn.commit()
     conn.close()
     session['username'] = username
-    log(f"[api/register] Registered new user: {username} with phone {phone}")
+    log("[api/register] Registered new user: %s with phone %s", username, phone)
     return jsonify({"status": "ok", "username": username}), 200
 
-# Force initialization of the database upon module import.
-init_db()
+# ---------------- Batch ----------------
+# POST /api/batch runs several GET requests of this API in one round trip:
+#   {"requests": [{"id": "tasks", "path": "/api/tasks?group_id=1",
+#                  "headers": {"If-None-Match": "..."}}, ...]}
+# and answers {"responses": [{"id", "status", "headers", "body"}, ...]} in the
+# same order. Sub-requests go through the normal routing, hooks and permission
+# checks, using the caller's cookies. All of them share this request's
+# database connection inside one read transaction, so they see one consistent
+# snapshot. They get it wrapped in a SnapshotConnection, whose commit(),
+# rollback() and close() do nothing, so a handler finishing its own work cannot
+# end the snapshot for the others. They run concurrently on a small thread
+# pool; the connection serializes the SQLite calls, while routing, row
+# conversion and JSON encoding overlap. Only GET is accepted, and streamed
+# responses (exports, /api/events) are refused per item.
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", "20"))
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "4"))
+BATCH_RESPONSE_HEADERS = ("ETag", "Cache-Control", "X-Next-Cursor", "X-Sync-Token")
+# Threads are only started on the first submit.
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+
+def run_batch_item(conn, item: dict, cookie, request_id: str):
+    # Returns (status, headers, JSON text of the body).
+    headers = {str(k): str(v) for k, v in (item.get("headers") or {}).items()}
+    headers["X-Request-ID"] = request_id
+    if cookie:
+        headers["Cookie"] = cookie
+    with app.app_context():
+        g.db = conn
+        try:
+            with app.test_request_context(item["path"], method="GET", headers=headers):
+                response = app.full_dispatch_request()
+                # Error pages also come back as iterators, only 200s are real streams.
+                if response.is_streamed and response.status_code == 200:
+                    response.close()
+                    return 400, {}, to_json({"error": "Streamed responses are not supported in a batch"})
+                body = response.get_data(as_text=True)
+                if not response.is_json:
+                    body = to_json(body) if body else "null"
+                kept = {name: response.headers[name] for name in BATCH_RESPONSE_HEADERS if name in response.headers}
+                return response.status_code, kept, body or "null"
+        except Exception as e:
+            log_error("[api_batch] Sub-request %s failed: %s", item.get("path"), e)
+            return 500, {}, to_json({"error": "Internal server error"})
+        finally:
+            # The connection belongs to the outer request, which releases it.
+            g.pop("db", None)
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    data = request.get_json(silent=True) or {}
+    items = data.get("requests")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "requests must be a non-empty list"}), 400
+    if len(items) > BATCH_MAX_REQUESTS:
+        return jsonify({"error": f"At most {BATCH_MAX_REQUESTS} requests per batch"}), 400
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str) or not item["path"].startswith("/api/"):
+            return jsonify({"error": "Each request needs a path starting with /api/", "index": i}), 400
+        if item.get("method", "GET").upper() != "GET":
+            return jsonify({"error": "Only GET requests can be batched", "index": i}), 400
+        if item["path"].split("?", 1)[0].rstrip("/") == "/api/batch":
+            return jsonify({"error": "Batches cannot be nested", "index": i}), 400
+
+    conn = get_db_connection()
+    cookie = request.headers.get("Cookie")
+    outer_id = current_request_id()
+    conn.execute("BEGIN")
+    shared = SnapshotConnection(conn)
+    try:
+        futures = [batch_executor.submit(run_batch_item, shared, item, cookie, f"{outer_id}.{i}")
+                   for i, item in enumerate(items)]
+        results = [future.result() for future in futures]
+    finally:
+        conn.rollback()  # read-only; just ends the snapshot
+    log("[api_batch] Ran %s sub-requests", len(items))
+    # Sub-response bodies are already JSON text and are spliced in as is.
+    parts = []
+    for item, (status, headers, body) in zip(items, results):
+        parts.append(f'{{"id":{to_json(item.get("id"))},"status":{status},'
+                     f'"headers":{to_json(headers)},"body":{body}}}')
+    return json_response('{"responses":[' + ",".join(parts) + "]}")
+
+# ---------------- Startup ----------------
+# Importing this module has no side effects: no database access, no Firebase or
+# Twilio client, no threads. ensure_started() does the per-process setup once.
+# create_app() calls it eagerly; for servers that import "app:app" directly it
+# runs before the first request, i.e. inside each forked worker. Each
+# background thread has its own switch: ENABLE_SCHEDULER (recurring tasks),
+# ENABLE_PUSH_NOTIFIER and ENABLE_ARCHIVER, all on by default.
+_startup_lock = threading.Lock()
+_started = False
+
+def ensure_db():
+    # One-shot schema check: a database already at SCHEMA_VERSION needs a
+    # single PRAGMA read, everything else goes through init_db(). New tables
+    # therefore need a migration, not just an entry in init_db().
+    with db_pool.connection() as conn:
+        version = get_schema_version(conn)
+    if version == SCHEMA_VERSION:
+        log("Schema is up to date (version %s), skipping init_db()", version)
+        return
+    init_db()
+
+def ensure_started():
+    global _started
+    if _started:
+        return
+    with _startup_lock:
+        if _started:
+            return
+        log_config.configure_logging(current_request_id)
+        ensure_db()
+        if os.environ.get("ENABLE_SCHEDULER", "1") == "1":
+            recurring_scheduler.start()
+            log("Recurring task scheduler started with %s series", recurring_scheduler.stats()['scheduled'])
+        if os.environ.get("ENABLE_PUSH_NOTIFIER", "1") == "1":
+            push_notifier.start()
+        if os.environ.get("ENABLE_ARCHIVER", "1") == "1" and ARCHIVE_AFTER_DAYS > 0:
+            task_archiver.start()
+        _started = True
+
+def create_app():
+    ensure_started()
+    return app
 
 if __name__ == '__main__':
+    create_app()
     log("Starting Flask server on port 5444...")
     app.run(debug=True, port=5444)
@@ -0,0 +1,151 @@
+# archiver.py
+#
+# Moves completed tasks out of the live tasks table into tasks_archive
+# (migration 10) once they have been completed for longer than max_age_days.
+# Open work and recent completions stay in tasks, so the dashboard queries on
+# it stay small however long a group has been using the app. History and
+# exports read the tasks_all view, which covers both tables.
+#
+# For everything that reads tasks alone, an archived task is gone like a
+# deleted one. The delete leaves a deleted_tasks tombstone (migration 3), so
+# /api/tasks delta clients get its id in "removed", while /api/history skips
+# those tombstones. The search_fts delete trigger also drops it from the
+# index: search only covers live tasks, not the archive.
+#
+# A run archives in batches of batch_size tasks. Each batch is one short
+# IMMEDIATE transaction (copy, then delete by id), and the thread pauses
+# between batches, so the first run on a large backlog does not hold the write
+# lock for long. Completed recurring tasks that are still the head of their
+# series (next_occurrence_id IS NULL) stay in tasks: the scheduler spawns the
+# next occurrence from them.
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from migrations import TASK_ARCHIVE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+CANDIDATES_SQL = """
+    SELECT id, group_id FROM tasks
+    WHERE completed = 1 AND completed_on < ?
+      AND NOT (recurring = 1 AND next_occurrence_id IS NULL)
+    ORDER BY completed_on
+    LIMIT ?
+"""
+
+
+class TaskArchiver:
+    def __init__(self, connection_factory, max_age_days: float = 90, batch_size: int = 500,
+                 interval: float = 3600.0, pause: float = 0.05, listener=None):
+        # connection_factory() must return a context manager yielding a
+        # sqlite3 connection, e.g. ConnectionPool.connection. listener, if
+        # given, is called after each committed batch with a list of
+        # (group_id, "archive", task_id, {}) tuples.
+        self.connection_factory = connection_factory
+        self.max_age_days = max_age_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self.listener = listener
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._stats = {"runs": 0, "batches": 0, "archived": 0, "errors": 0,
+                       "last_run_ms": 0.0, "last_batch_ms": 0.0, "last_run": None}
+
+    def archive_batch(self, now=None) -> int:
+        now = now or datetime.utcnow()
+        cutoff = (now - timedelta(days=self.max_age_days)).isoformat()
+        columns = ", ".join(TASK_ARCHIVE_COLUMNS)
+        start = time.perf_counter()
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute(CANDIDATES_SQL, (cutoff, self.batch_size))
+                rows = cursor.fetchall()
+                if rows:
+                    ids = [row[0] for row in rows]
+                    placeholders = ",".join("?" * len(ids))
+                    cursor.execute(f"""
+                        INSERT INTO tasks_archive ({columns}, archived_at)
+                        SELECT {columns}, ? FROM tasks WHERE id IN ({placeholders})
+                    """, [now.isoformat()] + ids)
+                    cursor.execute(f"DELETE FROM tasks WHERE id IN ({placeholders})", ids)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self._stats["last_batch_ms"] = (time.perf_counter() - start) * 1000
+        if not rows:
+            return 0
+        self._stats["batches"] += 1
+        self._stats["archived"] += len(rows)
+        if self.listener is not None:
+            try:
+                self.listener([(group_id, "archive", task_id, {}) for task_id, group_id in rows])
+            except Exception as e:
+                logger.error("Task archiver listener failed: %s", e)
+        return len(rows)
+
+    def run_once(self, now=None) -> int:
+        # Archives everything that is due, batch by batch. Returns the count.
+        start = time.perf_counter()
+        total = 0
+        while True:
+            count = self.archive_batch(now)
+            total += count
+            if count < self.batch_size:
+                break
+            with self._cond:
+                if self._stopping:
+                    break
+                self._cond.wait(self.pause)
+        self._stats["runs"] += 1
+        self._stats["last_run_ms"] = (time.perf_counter() - start) * 1000
+        self._stats["last_run"] = datetime.utcnow().isoformat()
+        if total:
+            logger.debug("Task archiver moved %d tasks to tasks_archive", total)
+        return total
+
+    # ---- background thread ----
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="task-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+            try:
+                self.run_once()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error("Task archiver run failed: %s", e)
+            with self._cond:
+                if not self._stopping:
+                    self._cond.wait(self.interval)
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["max_age_days"] = self.max_age_days
+            stats["batch_size"] = self.batch_size
+            stats["running"] = self._thread is not None
+        return stats
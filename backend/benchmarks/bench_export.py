@@ -0,0 +1,114 @@
+# bench_export.py
+#
+# Memory benchmark for the streaming history export. Seeds a temporary
+# database with completed tasks, drains the generator used by
+# /export_history_csv (or /export_history_xlsx with --format xlsx) and samples
+# the process RSS while doing so. With streaming the RSS should stay flat,
+# independent of the number of rows.
+#
+#   python benchmarks/bench_export.py [--rows 1000000] [--batch 2000] [--format csv|xlsx]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool  # noqa: E402
+from exports import HISTORY_EXPORT_COLUMNS, stream_csv, stream_xlsx_export  # noqa: E402
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb() -> float:
+    # Anonymous RSS only: the pool maps up to mmap_size of the database file,
+    # and those file-backed pages would otherwise show up as "growth".
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE / (1024 * 1024)
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed(pool, rows):
+    with pool.connection() as conn:
+        conn.execute("""
+            CREATE TABLE tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, assigned_to TEXT,
+                creation_date TEXT, due_date TEXT, completed BOOLEAN DEFAULT 0, completed_by TEXT,
+                completed_on TEXT, recurring BOOLEAN DEFAULT 0, frequency_hours INTEGER,
+                always_assigned BOOLEAN DEFAULT 1, group_id TEXT, project_id INTEGER
+            )
+        """)
+        conn.execute("CREATE INDEX idx_tasks_group_completed ON tasks(group_id, completed)")
+        batch = []
+        for i in range(rows):
+            batch.append((f"Household chore number {i}", f"user{i % 7}", "2025-01-01T08:00:00",
+                          "2025-01-02T08:00:00", 1, f"user{i % 7}", "2025-01-01T18:30:00", "g1"))
+            if len(batch) == 50000:
+                conn.executemany("""
+                    INSERT INTO tasks (title, assigned_to, creation_date, due_date, completed, completed_by, completed_on, group_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, batch)
+                batch = []
+        if batch:
+            conn.executemany("""
+                INSERT INTO tasks (title, assigned_to, creation_date, due_date, completed, completed_by, completed_on, group_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"), max_size=2)
+        print(f"Seeding {args.rows} completed tasks...")
+        seed(pool, args.rows)
+
+        source = "tasks WHERE completed = 1 AND group_id=?"
+        baseline = rss_mb()
+        peak = baseline
+        total_bytes = 0
+        samples = []
+        start = time.perf_counter()
+        if args.format == "xlsx":
+            chunks = stream_xlsx_export(pool.connection, HISTORY_EXPORT_COLUMNS, source, ["g1"], "History", args.batch)
+        else:
+            chunks = stream_csv(pool.connection, HISTORY_EXPORT_COLUMNS, source, ["g1"], args.batch)
+        for i, chunk in enumerate(chunks):
+            total_bytes += len(chunk)
+            if i % 50 == 0:
+                current = rss_mb()
+                peak = max(peak, current)
+                samples.append(current)
+        elapsed = time.perf_counter() - start
+        pool.close_all()
+
+    print(f"format            : {args.format}")
+    print(f"rows exported     : {args.rows}")
+    print(f"bytes exported    : {total_bytes / (1024 * 1024):.1f} MB")
+    print(f"elapsed           : {elapsed:.2f} s ({args.rows / elapsed:,.0f} rows/s)")
+    print(f"RSS before export : {baseline:.1f} MB")
+    print(f"RSS peak          : {peak:.1f} MB (+{peak - baseline:.1f} MB)")
+    if samples:
+        print(f"RSS first/last    : {samples[0]:.1f} MB / {samples[-1]:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+# bench_load.py
+#
+# HTTP load test for app.py. It seeds a synthetic database: N groups, each with
+# members, open tasks, completed history and projects with todos. It then
+# serves the real app with a threaded werkzeug server on localhost and drives
+# it with concurrent keep-alive clients, using a weighted mix of routes
+# (ROUTES below). Twilio and Firebase are replaced by the built-in stand-ins
+# (SMS_TRANSPORT=fake, PUSH_SENDER=stub), so nothing leaves the machine.
+#
+# Reported per route and in total: p50/p95/p99 latency, throughput, error
+# count and SQL statements per request. Statements are counted through a trace
+# callback on every pooled connection, attributed to the request whose thread
+# ran them, including the body of streamed exports. sqlite reports every
+# trigger step and every executemany row with the text of the outer
+# statement, so consecutive identical statements count once.
+#
+# Results are written as JSON (--out). Pass a previous file with --compare to
+# print the change per route, e.g. before and after a commit:
+#
+#   python benchmarks/bench_load.py --clients 8 --duration 20 --out before.json
+#   python benchmarks/bench_load.py --clients 8 --duration 20 --compare before.json
+
+import argparse
+import collections
+import http.client
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# (name, weight); the request for each name is built in Workload.request().
+ROUTES = [
+    ("tasks", 30),
+    ("tasks_delta", 10),
+    ("projects", 15),
+    ("history", 10),
+    ("user_groups", 10),
+    ("join", 8),
+    ("create_task", 5),
+    ("history_csv", 5),
+    ("history_xlsx", 3),
+    ("projects_csv", 4),
+]
+
+
+def load_app(tmp):
+    os.environ["DATABASE_PATH"] = os.path.join(tmp, "load.db")
+    os.environ.setdefault("ENABLE_SCHEDULER", "0")
+    os.environ.setdefault("ENABLE_PUSH_NOTIFIER", "0")
+    os.environ.setdefault("ENABLE_ARCHIVER", "0")
+    os.environ.setdefault("SMS_TRANSPORT", "fake")
+    os.environ.setdefault("PUSH_SENDER", "stub")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.chdir(BACKEND)
+    import app  # noqa: E402
+    app.create_app()
+    return app
+
+
+def seed(app_module, args, rng):
+    # Returns the ids of unassigned open tasks, which "join" consumes.
+    now = datetime.utcnow()
+    iso = lambda dt: dt.isoformat()  # noqa: E731
+    conn = app_module.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        for g in range(args.groups):
+            cursor.execute("INSERT INTO groups (name, creator) VALUES (?, ?)", (f"group {g}", f"user{g}_0"))
+            gid = cursor.lastrowid
+            members = [f"user{g}_{m}" for m in range(args.members)]
+            cursor.executemany("INSERT INTO user_groups (username, group_id, role) VALUES (?, ?, 'member')",
+                               [(m, gid) for m in members])
+            cursor.executemany("INSERT INTO device_tokens (username, token) VALUES (?, ?)",
+                               [(m, f"token-{m}") for m in members])
+            tasks = []
+            for t in range(args.tasks):
+                created = now - timedelta(hours=rng.randint(1, 24 * 30))
+                assigned = rng.choice(members) if t % 2 else None
+                tasks.append((f"Task {t} of group {g}", assigned, iso(created), iso(created + timedelta(hours=24)),
+                              0, None, None, str(gid)))
+            for t in range(args.history):
+                created = now - timedelta(days=rng.randint(1, 365))
+                done = created + timedelta(hours=rng.randint(1, 72))
+                tasks.append((f"Done {t} of group {g}", rng.choice(members), iso(created),
+                              iso(created + timedelta(hours=24)), 1, rng.choice(members), iso(done), str(gid)))
+            cursor.executemany("""
+                INSERT INTO tasks (title, assigned_to, creation_date, due_date, completed, completed_by,
+                                   completed_on, group_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, tasks)
+            for p in range(args.projects):
+                cursor.execute("""
+                    INSERT INTO projects (name, description, created_by, creation_date, group_id)
+                    VALUES (?, '', ?, ?, ?)
+                """, (f"Project {p}", members[0], iso(now - timedelta(days=p)), str(gid)))
+                pid = cursor.lastrowid
+                cursor.executemany("""
+                    INSERT INTO project_todos (project_id, title, description, creation_date, completed)
+                    VALUES (?, ?, '', ?, ?)
+                """, [(pid, f"Todo {d}", iso(now), d % 3 == 0) for d in range(args.todos)])
+                cursor.executemany("INSERT INTO project_assignments (project_id, username) VALUES (?, ?)",
+                                   [(pid, m) for m in members[:2]])
+        conn.commit()
+        cursor.execute("SELECT id FROM tasks WHERE completed = 0 AND assigned_to IS NULL")
+        joinable = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    rng.shuffle(joinable)
+    return collections.deque(joinable)
+
+
+class QueryCounter:
+    # Counts SQL statements per request thread. acquire() of the pool is
+    # wrapped so that every connection handed out carries the trace callback.
+    def __init__(self, pool):
+        self._local = threading.local()
+        original_acquire = pool.acquire
+
+        def acquire():
+            conn = original_acquire()
+            conn.set_trace_callback(self._trace)
+            return conn
+
+        pool.acquire = acquire
+
+    def _trace(self, statement):
+        local = self._local
+        if getattr(local, "active", False) and statement != local.last:
+            local.count += 1
+            local.last = statement
+
+    def middleware(self, wsgi_app, totals, lock):
+        def wrapped(environ, start_response):
+            route = environ.get("HTTP_X_BENCH_ROUTE", "other")
+            self._local.active = True
+            self._local.count = 0
+            self._local.last = None
+            body = wsgi_app(environ, start_response)
+            try:
+                yield from body
+            finally:
+                if hasattr(body, "close"):
+                    body.close()
+                self._local.active = False
+                with lock:
+                    totals[route][0] += 1
+                    totals[route][1] += self._local.count
+        return wrapped
+
+
+class Workload:
+    def __init__(self, args, joinable, rng):
+        self.args = args
+        self.joinable = joinable
+        self.lock = threading.Lock()
+        names = [name for name, _ in ROUTES if name in args.routes]
+        weights = [weight for name, weight in ROUTES if name in args.routes]
+        self.names, self.weights = names, weights
+        self.seed = rng.randrange(1 << 30)
+
+    def request(self, name, rng):
+        # Returns (method, path, json body or None).
+        gid = rng.randint(1, self.args.groups)
+        if name == "tasks":
+            return "GET", f"/api/tasks?group_id={gid}&limit={self.args.page}", None
+        if name == "tasks_delta":
+            since = (datetime.utcnow() - timedelta(seconds=30)).isoformat()
+            return "GET", f"/api/tasks?group_id={gid}&updated_since={since}", None
+        if name == "projects":
+            return "GET", f"/api/projects?group_id={gid}", None
+        if name == "history":
+            return "GET", f"/api/history?group_id={gid}&limit={self.args.page}", None
+        if name == "user_groups":
+            return "GET", f"/api/users/user{gid - 1}_{rng.randrange(self.args.members)}/groups", None
+        if name == "join":
+            with self.lock:
+                task_id = self.joinable.popleft() if self.joinable else rng.randint(1, 1000)
+            return "POST", f"/api/tasks/{task_id}/join", {"username": f"user{gid - 1}_0"}
+        if name == "create_task":
+            return "POST", "/api/tasks", {"title": "load test", "group_id": str(gid), "duration_hours": 24}
+        if name == "history_csv":
+            return "GET", f"/export_history_csv?group_id={gid}", None
+        if name == "history_xlsx":
+            return "GET", f"/export_history_xlsx?group_id={gid}", None
+        if name == "projects_csv":
+            return "GET", "/api/projects/export_csv", None
+        raise ValueError(name)
+
+
+def client(port, workload, deadline, warmup_until, samples, errors, revalidate, client_id):
+    rng = random.Random(workload.seed + client_id)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    etags = {}
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        name = rng.choices(workload.names, workload.weights)[0]
+        method, path, payload = workload.request(name, rng)
+        headers = {"X-Bench-Route": name}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers["Content-Type"] = "application/json"
+        if revalidate and method == "GET" and path in etags:
+            headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            errors[name] += 1
+            continue
+        elapsed = time.perf_counter() - start
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+        if start < warmup_until:
+            continue
+        samples[name].append(elapsed)
+        # A lost join race (task already taken) is an expected 400.
+        if response.status >= 500 or (response.status >= 400 and name != "join"):
+            errors[name] += 1
+    conn.close()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(values, seconds, error_count, query_totals):
+    values = sorted(values)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None  # noqa: E731
+    requests, queries = query_totals
+    return {
+        "requests": len(values),
+        "errors": error_count,
+        "rps": round(len(values) / seconds, 1),
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "mean_ms": ms(sum(values) / len(values)) if values else None,
+        "queries_per_request": round(queries / requests, 2) if requests else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results, previous=None):
+    print(f"{'route':>14} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6}")
+    rows = list(results["routes"].items()) + [("TOTAL", results["total"])]
+    for name, r in rows:
+        if not r["requests"]:
+            continue
+        line = (f"{name:>14} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8.1f} {r['p50_ms']:>8.2f} "
+                f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['queries_per_request'] or 0:>6.1f}")
+        old = (previous or {}).get("routes", {}).get(name) if name != "TOTAL" else (previous or {}).get("total")
+        if old and old.get("p95_ms") and old.get("rps"):
+            line += (f"   p95 {(r['p95_ms'] / old['p95_ms'] - 1) * 100:+6.1f}%"
+                     f"  rps {(r['rps'] / old['rps'] - 1) * 100:+6.1f}%")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--tasks", type=int, default=200, help="open tasks per group")
+    parser.add_argument("--history", type=int, default=500, help="completed tasks per group")
+    parser.add_argument("--projects", type=int, default=10, help="projects per group")
+    parser.add_argument("--todos", type=int, default=10, help="todos per project")
+    parser.add_argument("--page", type=int, default=100, help="limit for paged task/history requests")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of measurement")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds before measurement starts")
+    parser.add_argument("--routes", default=",".join(name for name, _ in ROUTES),
+                        help="comma separated subset of routes to drive")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="send If-None-Match with the last ETag seen for a URL")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+    args.routes = [r.strip() for r in args.routes.split(",") if r.strip()]
+    unknown = set(args.routes) - {name for name, _ in ROUTES}
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_request(self, *a, **kw):
+            pass
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app_module = load_app(tmp)
+        seed_start = time.perf_counter()
+        joinable = seed(app_module, args, rng)
+        seed_seconds = time.perf_counter() - seed_start
+
+        query_totals = collections.defaultdict(lambda: [0, 0])
+        query_lock = threading.Lock()
+        counter = QueryCounter(app_module.db_pool)
+        wsgi = counter.middleware(app_module.app.wsgi_app, query_totals, query_lock)
+        server = make_server("127.0.0.1", 0, wsgi, threaded=True, request_handler=KeepAliveHandler)
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        workload = Workload(args, joinable, rng)
+        samples = collections.defaultdict(list)
+        errors = collections.Counter()
+        start = time.perf_counter()
+        warmup_until = start + args.warmup
+        deadline = warmup_until + args.duration
+        threads = [threading.Thread(target=client, args=(server.server_port, workload, deadline, warmup_until,
+                                                         samples, errors, args.revalidate, i))
+                   for i in range(args.clients)]
+        # Query counts include the warm-up; they are per request, so that only
+        # matters for routes whose plan changes as caches fill.
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        server.shutdown()
+        app_module.push_notifier.stop()
+        app_module.sms_queue.stop()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "seed_seconds": round(seed_seconds, 2),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "routes": {
+            name: summarize(samples[name], args.duration, errors[name], query_totals[name])
+            for name in workload.names
+        },
+    }
+    all_samples = [v for name in workload.names for v in samples[name]]
+    all_queries = [sum(query_totals[n][0] for n in workload.names), sum(query_totals[n][1] for n in workload.names)]
+    results["total"] = summarize(all_samples, args.duration, sum(errors.values()), all_queries)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print(f"commit {results['meta']['commit']}, {args.clients} clients, {args.duration:.0f}s, "
+          f"{args.groups} groups (seeded in {seed_seconds:.1f}s)")
+    print_report(results, previous)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
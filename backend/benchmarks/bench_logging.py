@@ -0,0 +1,113 @@
+# bench_logging.py
+#
+# Per-request cost of logging. Drives a few real routes through Flask's test
+# client against a throwaway database and compares:
+#   print        the old unconditional print(f"[DEBUG] ...") helper
+#   info         debug lines disabled (the default)
+#   debug        every debug line formatted and queued
+#   debug-json   same, JSON output
+#   debug-10%    debug lines sampled at 10%
+# Output goes to /dev/null so only formatting and handler overhead is measured.
+#
+#   python benchmarks/bench_logging.py [--requests 2000]
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def load_app(tmp):
+    os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+    os.environ.setdefault("ENABLE_SCHEDULER", "0")
+    os.environ.setdefault("ENABLE_PUSH_NOTIFIER", "0")
+    os.environ.setdefault("ENABLE_ARCHIVER", "0")
+    os.environ.setdefault("SMS_TRANSPORT", "fake")
+    os.environ.setdefault("PUSH_SENDER", "stub")
+    os.chdir(BACKEND)
+    import app  # noqa: E402
+    app.create_app()
+    return app
+
+
+def seed(client, tasks=200):
+    for i in range(tasks):
+        client.post("/api/tasks", json={"title": f"bench {i}", "group_id": "bench", "duration_hours": 24})
+
+
+def drive(client, count):
+    # Reads and in-place edits only, so the table does not grow between runs.
+    start = time.perf_counter()
+    for i in range(count):
+        if i % 4 == 0:
+            client.put(f"/api/tasks/{i % 200 + 1}", json={"title": f"bench {i}"})
+        elif i % 4 == 1:
+            client.get("/api/projects?group_id=bench")
+        else:
+            client.get("/api/tasks?group_id=bench&limit=50")
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        app_module = load_app(tmp)
+        client = app_module.app.test_client()
+        seed(client)
+        drive(client, 200)  # warm-up
+
+        configs = [
+            ("info", dict(level="INFO")),
+            ("debug", dict(level="DEBUG")),
+            ("debug-json", dict(level="DEBUG", fmt="json")),
+            ("debug-10%", dict(level="DEBUG", debug_sample=0.1)),
+        ]
+        best = {}
+
+        original_log = app_module.log
+
+        def print_log(msg, *log_args):
+            print(f"[DEBUG] {msg % log_args if log_args else msg}")
+
+        def run_print():
+            app_module.log = print_log
+            try:
+                with contextlib.redirect_stdout(devnull):
+                    app_module.log_config.configure_logging(level="INFO", stream=devnull)
+                    return drive(client, args.requests)
+            finally:
+                app_module.log = original_log
+
+        def run_config(kwargs):
+            app_module.log_config.configure_logging(stream=devnull, **kwargs)
+            return drive(client, args.requests)
+
+        runs = [("print", run_print)] + [(name, lambda kw=kwargs: run_config(kw)) for name, kwargs in configs]
+        # Configurations are interleaved in random order and the best round is
+        # kept, to factor out drift (page cache, CPU frequency) between runs.
+        for _ in range(args.rounds):
+            random.shuffle(runs)
+            for name, run in runs:
+                us = run()
+                best[name] = min(us, best.get(name, us))
+        app_module.log_config.shutdown_logging()
+        results = [("print", best["print"])] + [(name, best[name]) for name, _ in configs]
+
+    baseline = best["info"]
+    print(f"{'config':>12} {'us/request':>11} {'vs info':>9}")
+    for name, us in results:
+        print(f"{name:>12} {us:>11.1f} {us - baseline:>+9.1f}")
+
+
+if __name__ == "__main__":
+    main()
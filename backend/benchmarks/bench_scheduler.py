@@ -0,0 +1,103 @@
+# bench_scheduler.py
+#
+# Shows how the recurring scheduler scales with the number of recurring tasks:
+# heap rebuild cost (one indexed scan at startup) and the cost of a tick that
+# processes a fixed number of due tasks. Tick cost should stay flat as the
+# table grows, since only due entries are popped from the heap.
+#
+#   python benchmarks/bench_scheduler.py [--sizes 1000,10000,100000] [--due 100]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool  # noqa: E402
+from scheduler import RecurringTaskScheduler  # noqa: E402
+
+TASKS_DDL = """
+    CREATE TABLE tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        assigned_to TEXT,
+        creation_date TEXT,
+        due_date TEXT,
+        completed BOOLEAN DEFAULT 0,
+        completed_by TEXT,
+        completed_on TEXT,
+        recurring BOOLEAN DEFAULT 0,
+        frequency_hours INTEGER,
+        always_assigned BOOLEAN DEFAULT 1,
+        group_id TEXT,
+        project_id INTEGER,
+        updated_at TEXT,
+        next_occurrence_id INTEGER
+    )
+"""
+
+
+def seed(pool, count, due_count, now):
+    with pool.connection() as conn:
+        conn.execute(TASKS_DDL)
+        conn.execute("""
+            CREATE INDEX idx_tasks_recurring_heads ON tasks(due_date)
+            WHERE recurring = 1 AND next_occurrence_id IS NULL
+        """)
+        rows = []
+        for i in range(count):
+            if i < due_count:
+                due = now - timedelta(minutes=1 + i % 60)
+            else:
+                due = now + timedelta(hours=1 + random.random() * 24 * 30)
+            rows.append((f"task {i}", f"user{i % 20}", now.isoformat(), due.isoformat(),
+                         i % 2, 1, f"group{i % 500}", 24))
+        conn.executemany("""
+            INSERT INTO tasks (title, assigned_to, creation_date, due_date, completed, recurring, group_id, frequency_hours)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+
+
+def run(size, due_count):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"), max_size=2)
+        now = datetime.utcnow()
+        seed(pool, size, due_count, now)
+        scheduler = RecurringTaskScheduler(pool.connection, batch_size=max(due_count, 1))
+
+        start = time.perf_counter()
+        scheduler.rebuild()
+        rebuild_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        processed = scheduler.tick(now)
+        due_tick_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            scheduler.tick(now)
+        idle_tick_us = (time.perf_counter() - start) * 1000
+
+        pool.close_all()
+    return {"tasks": size, "processed": processed, "rebuild_ms": rebuild_ms,
+            "due_tick_ms": due_tick_ms, "idle_tick_us": idle_tick_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--due", type=int, default=100)
+    args = parser.parse_args()
+    print(f"{'tasks':>8} {'processed':>9} {'rebuild ms':>11} {'due tick ms':>12} {'idle tick us':>13}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = run(size, min(args.due, size))
+        print(f"{r['tasks']:>8} {r['processed']:>9} {r['rebuild_ms']:>11.1f} {r['due_tick_ms']:>12.2f} {r['idle_tick_us']:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# bench_search.py
+#
+# Full-text search at scale. Builds a database with the real schema, then
+# inserts --rows documents (80% tasks, 15% project todos, 5% SOPs) spread over
+# --groups groups, through the regular tables so the search_fts triggers do
+# the indexing. Text is drawn from a synthetic vocabulary with a Zipf-like
+# distribution, so there are very common and very rare words.
+#
+# Reports indexing throughput (including all the other triggers on those
+# tables), database size, and p50/p95 latency of search.search() for several
+# query types, on the first page and on a deep page. A single word is always
+# matched as a prefix; "common word" therefore measures the expensive case of
+# a long prefix (not covered by the prefix indexes) of a very frequent word.
+#
+#   python benchmarks/bench_search.py [--rows 1000000] [--groups 1000] [--queries 200]
+
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+SYLLABLES = ["wa", "sche", "kel", "ler", "mül", "bo", "den", "fen", "ster", "kü", "che", "bad", "gar",
+             "ten", "putz", "ein", "kauf", "rei", "ni", "gung", "mas", "chi", "ne", "tür", "dach", "hof"]
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def load_app(tmp):
+    os.environ["DATABASE_PATH"] = os.path.join(tmp, "search.db")
+    os.environ.setdefault("ENABLE_SCHEDULER", "0")
+    os.environ.setdefault("ENABLE_PUSH_NOTIFIER", "0")
+    os.environ.setdefault("ENABLE_ARCHIVER", "0")
+    os.environ.setdefault("SMS_TRANSPORT", "fake")
+    os.environ.setdefault("PUSH_SENDER", "stub")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.chdir(BACKEND)
+    import app  # noqa: E402
+    app.create_app()
+    return app
+
+
+def seed(db_path, args, words, rng):
+    cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(words))))
+    text = lambda n: " ".join(rng.choices(words, cum_weights=cum_weights, k=n))  # noqa: E731
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    n_tasks, n_todos = int(args.rows * 0.8), int(args.rows * 0.15)
+    n_sops = args.rows - n_tasks - n_todos
+    projects_per_group = 10
+    start = time.perf_counter()
+    conn.executemany("INSERT INTO projects (name, description, created_by, creation_date, group_id) VALUES (?, '', 'bench', '2026-01-01', ?)",
+                     [(f"project {p}", str(g)) for g in range(1, args.groups + 1) for p in range(projects_per_group)])
+    for table, count, make in (
+        ("tasks", n_tasks, lambda: ("INSERT INTO tasks (title, creation_date, due_date, group_id) VALUES (?, '2026-01-01', '2026-01-02', ?)",
+                                    (text(rng.randint(2, 6)), str(rng.randint(1, args.groups))))),
+        ("project_todos", n_todos, lambda: ("INSERT INTO project_todos (project_id, title, description) VALUES (?, ?, ?)",
+                                            (rng.randint(1, args.groups * projects_per_group), text(rng.randint(2, 5)),
+                                             text(rng.randint(10, 40))))),
+        ("sops", n_sops, lambda: ("INSERT INTO sops (title, content, version, group_id) VALUES (?, ?, '1', ?)",
+                                  (text(rng.randint(2, 5)), text(rng.randint(50, 200)), str(rng.randint(1, args.groups))))),
+    ):
+        done = 0
+        while done < count:
+            batch = [make() for _ in range(min(args.batch, count - done))]
+            conn.executemany(batch[0][0], [params for _, params in batch])
+            conn.commit()
+            done += len(batch)
+        print(f"  {table}: {count} rows")
+    elapsed = time.perf_counter() - start
+    conn.execute("INSERT INTO search_fts (search_fts) VALUES ('optimize')")
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--groups", type=int, default=1000)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=200, help="queries per query type")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = vocabulary(args.vocabulary, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        app_module = load_app(tmp)
+        import search  # noqa: E402
+
+        db_path = app_module.DATABASE
+        print(f"indexing {args.rows} documents over {args.groups} groups")
+        seconds = seed(db_path, args, words, rng)
+        size_mb = os.path.getsize(db_path) / (1024 * 1024)
+        print(f"indexed in {seconds:.1f}s ({args.rows / seconds:,.0f} rows/s), database {size_mb:.0f} MB\n")
+
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        query_types = [
+            ("common word", lambda: words[rng.randrange(5)]),
+            ("rare word", lambda: words[rng.randrange(len(words) // 2, len(words))]),
+            ("2-char prefix", lambda: words[rng.randrange(50)][:2]),
+            ("3-char prefix", lambda: words[rng.randrange(50)][:3]),
+            ("4-char prefix", lambda: words[rng.randrange(50)][:4]),
+            ("6-char prefix", lambda: words[rng.randrange(50)][:6]),
+            ("two terms", lambda: f"{words[rng.randrange(20)]} {words[rng.randrange(20, 200)][:4]}"),
+        ]
+        print(f"{'query':>14} {'page':>6} {'p50 ms':>8} {'p95 ms':>8} {'hits/page':>10}")
+        for name, make_query in query_types:
+            for page_name, offset in (("first", 0), ("+100", 100)):
+                timings, hits = [], []
+                for _ in range(args.queries):
+                    q, group = make_query(), str(rng.randint(1, args.groups))
+                    start = time.perf_counter()
+                    results, _ = search.search(cursor, q, group, limit=20, offset=offset)
+                    timings.append(time.perf_counter() - start)
+                    hits.append(len(results))
+                timings.sort()
+                p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+                print(f"{name:>14} {page_name:>6} {statistics.median(timings) * 1000:>8.2f} {p95 * 1000:>8.2f} "
+                      f"{statistics.mean(hits):>10.1f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# bench_serialize.py
+#
+# Cost of turning a task list into a JSON body, from the executed query to the
+# encoded bytes, for
+#   row+jsonify   sqlite3.Row rows, dict(row) each, flask.jsonify (the old path)
+#   objects       tuple rows from serialize.tuple_cursor(), RowSet.to_json()
+#   columns       the same rows as ?shape=columns
+# Also prints the body size of each shape.
+#
+#   python benchmarks/bench_serialize.py [--rows 1000] [--runs 50]
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify  # noqa: E402
+
+from serialize import RowSet, tuple_cursor  # noqa: E402
+
+TASKS_SQL = """
+    CREATE TABLE tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, assigned_to TEXT,
+        creation_date TEXT NOT NULL, due_date TEXT NOT NULL, completed INTEGER NOT NULL DEFAULT 0,
+        completed_by TEXT, completed_on TEXT, recurring INTEGER NOT NULL DEFAULT 0,
+        frequency_hours INTEGER, always_assigned INTEGER NOT NULL DEFAULT 1, group_id TEXT,
+        project_id INTEGER, updated_at TEXT, next_occurrence_id INTEGER
+    )
+"""
+
+QUERY = "SELECT * FROM tasks WHERE group_id = 'bench' ORDER BY id"
+
+
+def seed(conn, rows):
+    conn.execute(TASKS_SQL)
+    conn.executemany(
+        "INSERT INTO tasks (title, assigned_to, creation_date, due_date, completed, recurring, group_id, updated_at)"
+        " VALUES (?, ?, ?, ?, ?, ?, 'bench', ?)",
+        [(f"Task {i}: take out the \"recycling\"", None if i % 3 else "otter", "2026-01-01T08:00:00.000000",
+          "2026-01-02T08:00:00.000000", i % 2, i % 5 == 0, "2026-01-01T08:00:00.000000") for i in range(rows)])
+    conn.commit()
+
+
+def old_path(conn):
+    conn.row_factory = sqlite3.Row
+    return jsonify([dict(row) for row in conn.execute(QUERY).fetchall()]).get_data()
+
+
+def new_path(conn, shape):
+    cursor = tuple_cursor(conn)
+    cursor.execute(QUERY)
+    return RowSet.fetch(cursor).to_json(shape).encode("utf-8")
+
+
+def best_ms(fn, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        conn.row_factory = sqlite3.Row
+        seed(conn, args.rows)
+        flask_app = Flask(__name__)
+        with flask_app.app_context():
+            results = [
+                ("row+jsonify", lambda: old_path(conn)),
+                ("objects", lambda: new_path(conn, "objects")),
+                ("columns", lambda: new_path(conn, "columns")),
+            ]
+            baseline = None
+            print(f"{args.rows} rows")
+            print(f"{'path':>12} {'ms':>8} {'speedup':>8} {'bytes':>9}")
+            for name, fn in results:
+                ms = best_ms(fn, args.runs)
+                baseline = baseline or ms
+                print(f"{name:>12} {ms:>8.2f} {baseline / ms:>7.1f}x {len(fn()):>9}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
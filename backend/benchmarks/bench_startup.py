@@ -0,0 +1,80 @@
+# bench_startup.py
+#
+# Cold-start cost of the backend, measured in fresh interpreter processes:
+#   import        "import app" (should not touch the database or any SDK)
+#   create_app    one-time setup: logging, schema check / init_db()
+#   first req     first request through the test client
+# once against a new database file (full init_db() plus migrations) and then
+# against the same, already migrated file (one PRAGMA user_version read).
+# It also lists the slowest modules from -X importtime.
+#
+#   python benchmarks/bench_startup.py [--runs 5]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.create_app()
+t2 = time.perf_counter()
+app.app.test_client().get("/api/heartbeat")
+t3 = time.perf_counter()
+print(json.dumps({"import": (t1 - t0) * 1000, "create_app": (t2 - t1) * 1000, "first_request": (t3 - t2) * 1000}))
+"""
+
+
+def probe(db_path, extra_args=()):
+    env = dict(os.environ, DATABASE_PATH=db_path, ENABLE_SCHEDULER="0", ENABLE_PUSH_NOTIFIER="0",
+               ENABLE_ARCHIVER="0", SMS_TRANSPORT="fake", PUSH_SENDER="stub", LOG_LEVEL="WARNING")
+    result = subprocess.run([sys.executable, *extra_args, "-c", PROBE], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, fresh in (("new db", True), ("migrated db", False)):
+            samples = []
+            for i in range(args.runs):
+                db_path = os.path.join(tmp, f"fresh{i}.db" if fresh else "shared.db")
+                samples.append(json.loads(probe(db_path).stdout.strip().splitlines()[-1]))
+            rows.append((label, {k: statistics.median(s[k] for s in samples) for k in samples[0]}))
+
+        importtime = probe(os.path.join(tmp, "shared.db"), ["-X", "importtime"]).stderr
+
+    print(f"{'':>12} {'import ms':>10} {'create_app ms':>14} {'first req ms':>13}")
+    for label, r in rows:
+        print(f"{label:>12} {r['import']:>10.1f} {r['create_app']:>14.1f} {r['first_request']:>13.1f}")
+
+    # "import time: self [us] | cumulative | imported package", nested imports
+    # are indented by two spaces per level. Depth 1 = imported by app.py.
+    modules = []
+    for line in importtime.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            name = parts[2].rstrip()
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            if depth == 1:
+                modules.append((int(parts[1]), name.strip()))
+    print("\nslowest imports of app.py (cumulative ms):")
+    for cumulative, name in sorted(modules, reverse=True)[:8]:
+        print(f"  {cumulative / 1000:>8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# db_pool.py
+#
+# Small SQLite connection pool. Connections are opened once, configured once
+# with the pragmas below and then handed out again and again instead of paying
+# for sqlite3.connect() + schema parsing on every call.
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 64 * 1024 * 1024),
+    ("cache_size", -16000),  # negative = KiB, so ~16 MB page cache per connection
+    ("busy_timeout", 5000),
+)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, database: str, max_size: int = 8, timeout: float = 30.0, pragmas=DEFAULT_PRAGMAS):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = pragmas
+        self._cond = threading.Condition()
+        self._idle = []
+        self._open = 0
+        self._in_use = 0
+        self._local = threading.local()
+        self._stats = {
+            "checkouts": 0,
+            "connections_opened": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "high_water_mark": 0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread=False because a connection may be handed to a
+        # different worker thread after it has been returned to the pool.
+        conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        start = None
+        with self._cond:
+            while True:
+                conn = self._take_idle()
+                if conn is not None:
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                if start is None:
+                    start = time.perf_counter()
+                    self._stats["waits"] += 1
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+            if self._in_use > self._stats["high_water_mark"]:
+                self._stats["high_water_mark"] = self._in_use
+            if start is not None:
+                waited = time.perf_counter() - start
+                self._stats["wait_time_total"] += waited
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats["connections_opened"] += 1
+        self._local.last = conn
+        return conn
+
+    def _take_idle(self):
+        # Prefer the connection this thread used last: its page cache is warm
+        # and it keeps a worker thread on the same connection between requests.
+        if not self._idle:
+            return None
+        last = getattr(self._local, "last", None)
+        for i, conn in enumerate(self._idle):
+            if conn is last:
+                return self._idle.pop(i)
+        return self._idle.pop()
+
+    def release(self, conn: sqlite3.Connection):
+        broken = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            broken = True
+        with self._cond:
+            self._in_use -= 1
+            if broken:
+                self._open -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+        if broken:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "max_size": self.max_size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+            })
+        checkouts = stats["checkouts"] or 1
+        stats["wait_time_avg"] = stats["wait_time_total"] / checkouts
+        return stats
+
+
+class PooledConnection:
+    # Thin proxy around a pooled sqlite3.Connection. Existing code calls
+    # conn.close() when it is done; for request-scoped connections that is a
+    # no-op (the connection goes back to the pool on teardown), otherwise it
+    # returns the connection to the pool right away.
+
+    def __init__(self, pool: ConnectionPool, conn: sqlite3.Connection, release_on_close: bool = True):
+        self._pool = pool
+        self._conn = conn
+        self._release_on_close = release_on_close
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self):
+        if self._release_on_close:
+            self.release()
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn)
+
+
+class SnapshotConnection:
+    # Hands one connection, inside a read transaction owned by the caller, to
+    # code that ends its own work with commit() or close(), e.g. the
+    # sub-requests of /api/batch. Those calls (and "with conn:") are no-ops
+    # here, so none of that code can end the shared snapshot for the others.
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,141 @@
+# events.py
+#
+# In-process publish/subscribe bus behind the /api/events Server-Sent Events
+# stream. Endpoints publish small diffs per group as "task" and "project_todo"
+# events ({"op", "id", "fields"} with op create/update/delete, or {"op": "bulk",
+# "changes": [...]}), plus "resync" when a client has to refetch. The archiver
+# publishes op "archive" (inside "bulk" task events, empty fields): the task
+# left the live list and is only in history from then on. Every open stream of
+# that group receives them, so clients no longer need to poll /api/tasks.
+#
+# Each group keeps the last HISTORY_SIZE events in a ring buffer. A client that
+# reconnects with Last-Event-ID gets everything it missed replayed; if the id is
+# older than the buffer, or was issued by a previous process (ids carry a
+# per-process epoch), it gets a single "resync" event and should refetch.
+#
+# The bus lives in one process. With several worker processes a client only
+# sees the writes made through the worker it is connected to, and a stream
+# occupies a worker thread for as long as it is open, so deployments need a
+# threaded (gthread) or async worker class.
+
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+HISTORY_SIZE = 1000
+SUBSCRIBER_QUEUE_SIZE = 1000
+KEEPALIVE_SECONDS = 15.0
+
+
+class _Subscriber:
+    __slots__ = ("group_id", "queue", "overflowed")
+
+    def __init__(self, group_id):
+        self.group_id = group_id
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class EventBus:
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self.history_size = history_size
+        self.epoch = format(int(time.time() * 1000), "x")
+        self._seq = itertools.count(1)
+        self._history = {}  # group_id -> deque of (seq, event_id, type, data)
+        self._subscribers = {}  # group_id -> set of _Subscriber
+        self._lock = threading.Lock()
+        self._stats = {"published": 0, "delivered": 0, "overflows": 0, "replayed": 0, "resyncs": 0}
+
+    def publish(self, group_id, event_type: str, data: dict):
+        group_id = str(group_id)
+        with self._lock:
+            seq = next(self._seq)
+            event = (seq, f"{self.epoch}-{seq}", event_type, json.dumps(data, default=str))
+            history = self._history.get(group_id)
+            if history is None:
+                history = self._history[group_id] = deque(maxlen=self.history_size)
+            history.append(event)
+            self._stats["published"] += 1
+            for sub in self._subscribers.get(group_id, ()):
+                if sub.overflowed:
+                    continue
+                try:
+                    sub.queue.put_nowait(event)
+                    self._stats["delivered"] += 1
+                except queue.Full:
+                    # A stalled client is told to resync instead of blocking publishers.
+                    sub.overflowed = True
+                    self._stats["overflows"] += 1
+
+    def subscribe(self, group_id, last_event_id: str = None):
+        # Returns (subscriber, backlog). backlog is None when the client has to
+        # resync, otherwise the events it missed (possibly empty).
+        group_id = str(group_id)
+        sub = _Subscriber(group_id)
+        with self._lock:
+            self._subscribers.setdefault(group_id, set()).add(sub)
+            backlog = []
+            if last_event_id:
+                backlog = self._backlog_locked(group_id, last_event_id)
+                if backlog is None:
+                    self._stats["resyncs"] += 1
+                else:
+                    self._stats["replayed"] += len(backlog)
+        return sub, backlog
+
+    def _backlog_locked(self, group_id, last_event_id):
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        history = self._history.get(group_id, ())
+        if history and history[0][0] > seq + 1:
+            return None  # the events in between have fallen out of the buffer
+        return [event for event in history if event[0] > seq]
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.group_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.group_id]
+
+    def stream(self, group_id, last_event_id: str = None, keepalive: float = KEEPALIVE_SECONDS):
+        # Generator of text/event-stream chunks for one client.
+        sub, backlog = self.subscribe(group_id, last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            if backlog is None:
+                yield _format(None, "resync", "{}")
+            else:
+                for _, event_id, event_type, data in backlog:
+                    yield _format(event_id, event_type, data)
+            while True:
+                if sub.overflowed:
+                    yield _format(None, "resync", "{}")
+                    return
+                try:
+                    _, event_id, event_type, data = sub.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _format(event_id, event_type, data)
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["epoch"] = self.epoch
+            stats["subscribers"] = sum(len(s) for s in self._subscribers.values())
+            stats["groups_with_history"] = len(self._history)
+        return stats
+
+
+def _format(event_id, event_type, data):
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event_type}\ndata: {data}\n\n"
@@ -0,0 +1,249 @@
+# exports.py
+#
+# Streaming exports, encoded chunk by chunk, so memory stays flat no matter how
+# many rows are exported.
+#
+# A download can last as long as the slowest client wants, so nothing is held
+# open across it. Rows are read in keyset chunks of batch_size rows
+# (... AND key > last key ORDER BY key LIMIT n), each chunk with its own short
+# connection checkout from connection_factory. Between chunks the export holds
+# no connection and no WAL read snapshot, so slow downloads neither starve the
+# API pool nor hold back checkpoints. The app passes a separate small pool
+# whose checkout timeout bounds how long an export waits for a connection.
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from xlsx_writer import stream_xlsx
+
+EXPORT_BATCH_SIZE = 2000
+
+HISTORY_EXPORT_COLUMNS = ["id", "title", "assigned_to", "creation_date", "due_date", "completed", "completed_by",
+                          "completed_on", "recurring", "frequency_hours", "always_assigned", "group_id", "project_id"]
+PROJECT_EXPORT_COLUMNS = ["id", "name", "description", "created_by", "creation_date", "group_id"]
+# ISO timestamp columns that become real date cells in XLSX exports.
+EXPORT_DATE_COLUMNS = {"creation_date", "due_date", "completed_on"}
+
+
+class ExportArgsError(ValueError):
+    pass
+
+
+def _date_bound(value: str, end: bool) -> str:
+    # Accepts a date (YYYY-MM-DD) or a full ISO timestamp. A bare end date is
+    # inclusive, i.e. it is turned into "< next day".
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportArgsError(f"Invalid date: {value}")
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.isoformat()
+
+
+def parse_export_args(args, all_columns: list, date_column: str):
+    # Reads ?columns=a,b,c&from=...&to=... and returns (columns, where_sql, params).
+    columns = all_columns
+    if args.get("columns"):
+        columns = [c.strip() for c in args["columns"].split(",") if c.strip()]
+        unknown = [c for c in columns if c not in all_columns]
+        if unknown or not columns:
+            raise ExportArgsError(f"Unknown columns: {', '.join(unknown) or '(none given)'}")
+    conditions = []
+    params = []
+    if args.get("from"):
+        conditions.append(f"{date_column} >= ?")
+        params.append(_date_bound(args["from"], end=False))
+    if args.get("to"):
+        to_value = args["to"]
+        conditions.append(f"{date_column} {'<' if len(to_value) == 10 else '<='} ?")
+        params.append(_date_bound(to_value, end=True))
+    where_sql = "".join(f" AND {c}" for c in conditions)
+    return columns, where_sql, params
+
+
+def iter_keyset(connection_factory, sql: str, params, key_sql: str, key_columns, batch_size: int = EXPORT_BATCH_SIZE):
+    # sql is "SELECT ... FROM ... WHERE ..." without ORDER BY. key_sql are the
+    # (unique) key expressions to order by and key_columns the names under
+    # which the select list returns them. Yields lists of rows.
+    after = None
+    while True:
+        chunk_sql = sql
+        chunk_params = list(params)
+        if after is not None:
+            chunk_sql += f" AND ({key_sql}) > ({', '.join('?' * len(after))})"
+            chunk_params += after
+        chunk_sql += f" ORDER BY {key_sql} LIMIT ?"
+        with connection_factory() as conn:
+            rows = conn.execute(chunk_sql, chunk_params + [batch_size]).fetchall()
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        after = [rows[-1][name] for name in key_columns]
+
+
+def iter_rows(connection_factory, columns: list, source: str, params, key: str = "id",
+              batch_size: int = EXPORT_BATCH_SIZE):
+    # Yields lists of row tuples with the given columns of "FROM <source>",
+    # source being "<table> WHERE <conditions>", in key order.
+    sql = f"SELECT {key} AS _key, {', '.join(columns)} FROM {source}"
+    for rows in iter_keyset(connection_factory, sql, params, key, ("_key",), batch_size):
+        yield [tuple(row)[1:] for row in rows]
+
+
+def stream_csv(connection_factory, columns: list, source: str, params, batch_size: int = EXPORT_BATCH_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in iter_rows(connection_factory, columns, source, params, batch_size=batch_size):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_xlsx_export(connection_factory, columns: list, source: str, params, sheet_name: str,
+                       batch_size: int = EXPORT_BATCH_SIZE):
+    batches = iter_rows(connection_factory, columns, source, params, batch_size=batch_size)
+    return stream_xlsx(columns, batches, sheet_name=sheet_name, date_columns=EXPORT_DATE_COLUMNS)
+
+
+# ---- group archive (/api/groups/export) ----
+#
+# One query per table covers all of the user's groups. Every query is read in
+# keyset chunks ordered by (group id, id), so the sections can be merged group
+# by group while the archive is written out, without ever holding more than one
+# batch of rows per section.
+
+_USER_GROUP_IDS = "SELECT CAST(group_id AS TEXT) FROM user_groups WHERE username=?"
+
+# (archive key, NDJSON record type, SQL, key). Parents come before the records
+# that reference them, which the NDJSON importer relies on. The group id
+# columns are all TEXT, so every section sorts group ids the same way.
+ARCHIVE_SECTIONS = [
+    ("projects", "project", f"""
+        SELECT group_id AS _gid, * FROM projects
+        WHERE group_id IN ({_USER_GROUP_IDS})
+    """, "group_id, id"),
+    ("sops", "sop", f"""
+        SELECT group_id AS _gid, * FROM sops
+        WHERE group_id IN ({_USER_GROUP_IDS})
+    """, "group_id, id"),
+    ("tasks", "task", f"""
+        SELECT group_id AS _gid, * FROM tasks_all  -- live and archived (migration 10)
+        WHERE group_id IN ({_USER_GROUP_IDS})
+    """, "group_id, id"),
+    ("project_todos", "project_todo", f"""
+        SELECT p.group_id AS _gid, pt.* FROM project_todos pt JOIN projects p ON p.id = pt.project_id
+        WHERE p.group_id IN ({_USER_GROUP_IDS})
+    """, "p.group_id, pt.id"),
+    ("project_assignments", "project_assignment", f"""
+        SELECT p.group_id AS _gid, pa.* FROM project_assignments pa JOIN projects p ON p.id = pa.project_id
+        WHERE p.group_id IN ({_USER_GROUP_IDS})
+    """, "p.group_id, pa.id"),
+    ("sop_agreements", "sop_agreement", f"""
+        SELECT s.group_id AS _gid, sa.* FROM sop_agreements sa JOIN sops s ON s.id = sa.sop_id
+        WHERE s.group_id IN ({_USER_GROUP_IDS})
+    """, "s.group_id, sa.id"),
+]
+
+
+class _GroupedCursor:
+    # Wraps row batches ordered by _gid and hands out the rows of one group at a time.
+    def __init__(self, batches):
+        self.batches = batches
+        self.buffer = []
+        self.pos = 0
+
+    def _peek(self):
+        if self.pos >= len(self.buffer):
+            self.buffer = next(self.batches, [])
+            self.pos = 0
+            if not self.buffer:
+                return None
+        return self.buffer[self.pos]
+
+    def rows_for(self, group_id):
+        # Rows of groups that sort before group_id are skipped, so a group
+        # that is not in the list can never stall the groups after it.
+        while True:
+            row = self._peek()
+            if row is None or row["_gid"] > group_id:
+                return
+            self.pos += 1
+            if row["_gid"] == group_id:
+                yield row
+
+
+def _record(row) -> dict:
+    rec = dict(row)
+    rec.pop("_gid", None)
+    return rec
+
+
+def stream_group_archive(connection_factory, username: str, fmt: str = "json",
+                         batch_size: int = EXPORT_BATCH_SIZE):
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    # One entry per group id of _USER_GROUP_IDS, in the order the sections
+    # use, even if the user is a member twice or the groups row is missing.
+    # Of several memberships the strongest role wins (admin < editor < user).
+    with connection_factory() as conn:
+        rows = conn.execute("""
+            SELECT g.*, ug._gid, ug.role FROM (
+                SELECT CAST(group_id AS TEXT) AS _gid, MIN(role) AS role FROM user_groups
+                WHERE username=? GROUP BY 1
+            ) ug
+            LEFT JOIN groups g ON CAST(g.id AS TEXT) = ug._gid
+            ORDER BY ug._gid
+        """, (username,)).fetchall()
+    groups = []
+    group_ids = []
+    for row in rows:
+        group = dict(row)
+        gid = group.pop("_gid")
+        if group["id"] is None:
+            group["id"] = gid
+        groups.append(group)
+        group_ids.append(gid)
+    cursors = [(key, kind, _GroupedCursor(iter_keyset(connection_factory, sql, (username,), key_sql,
+                                                      ("_gid", "id"), batch_size)))
+               for key, kind, sql, key_sql in ARCHIVE_SECTIONS]
+
+    if fmt == "ndjson":
+        yield (dumps({"type": "header", "username": username, "groups": groups}) + "\n").encode("utf-8")
+        for group_id in group_ids:
+            for key, kind, grouped in cursors:
+                out = []
+                for row in grouped.rows_for(group_id):
+                    rec = _record(row)
+                    rec["type"] = kind
+                    rec["group_id"] = group_id
+                    out.append(dumps(rec))
+                    if len(out) >= batch_size:
+                        yield ("\n".join(out) + "\n").encode("utf-8")
+                        out = []
+                if out:
+                    yield ("\n".join(out) + "\n").encode("utf-8")
+        return
+
+    yield ('{"username":' + dumps(username) + ',"groups":' + dumps(groups) + ',"data":{').encode("utf-8")
+    for gi, group_id in enumerate(group_ids):
+        parts = [("," if gi else "") + dumps(group_id) + ":{"]
+        for si, (key, kind, grouped) in enumerate(cursors):
+            parts.append(("," if si else "") + dumps(key) + ":[")
+            first = True
+            for row in grouped.rows_for(group_id):
+                parts.append(("" if first else ",") + dumps(_record(row)))
+                first = False
+                if len(parts) >= batch_size:
+                    yield "".join(parts).encode("utf-8")
+                    parts = []
+            parts.append("]")
+        parts.append("}")
+        yield "".join(parts).encode("utf-8")
+    yield b"}}"
@@ -0,0 +1,303 @@
+# importer.py
+#
+# Bulk import of group archives (see /api/groups/import and /api/groups/export).
+#
+# Everything is validated before it is written, rows are inserted with
+# executemany() in bounded batches, and the whole import runs in a single
+# IMMEDIATE transaction. New primary keys for tasks, projects and SOPs are
+# allocated up front while we hold the write lock, which lets us remap the
+# exported ids on the fly: tasks keep their project, todos and assignments
+# keep their project, agreements keep their SOP and recurring series keep
+# their next_occurrence_id links.
+#
+# Two input shapes are supported:
+#   JSON    {"username": ..., "data": {"<group_id>": {"tasks": [...], "projects": [...],
+#            "project_todos": [...], "project_assignments": [...], "sops": [...],
+#            "sop_agreements": [...]}}}
+#           Projects may also carry nested "todos" / "assignments" lists (the
+#           /api/projects shape).
+#   NDJSON  one record per line: {"type": "task" | "project" | "project_todo" |
+#           "project_assignment" | "sop" | "sop_agreement", "group_id": ..., ...}.
+#           Records that reference a project or SOP must come after it.
+
+IMPORT_BATCH_SIZE = 500
+
+TASK_COLUMNS = ["id", "title", "assigned_to", "creation_date", "due_date", "completed", "completed_by",
+                "completed_on", "recurring", "frequency_hours", "always_assigned", "group_id", "project_id"]
+PROJECT_COLUMNS = ["id", "name", "description", "created_by", "creation_date", "group_id"]
+TODO_COLUMNS = ["project_id", "title", "description", "due_date", "is_task", "assigned_to", "points",
+                "creation_date", "completed", "completed_by", "completed_on"]
+ASSIGNMENT_COLUMNS = ["project_id", "username"]
+SOP_COLUMNS = ["id", "title", "content", "version", "published_date", "effective_date", "group_id"]
+AGREEMENT_COLUMNS = ["sop_id", "username", "agreed_at", "sop_version"]
+
+RECORD_TYPES = ("task", "project", "project_todo", "project_assignment", "sop", "sop_agreement")
+
+
+class ImportValidationError(ValueError):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors[:5]))
+        self.errors = errors
+
+
+def _require_text(rec, field, where, errors):
+    value = rec.get(field)
+    if not isinstance(value, str) or not value.strip():
+        errors.append(f"{where}: '{field}' is required")
+
+
+def _optional_int(rec, field, where, errors):
+    value = rec.get(field)
+    if value is None or isinstance(value, bool):
+        return
+    if isinstance(value, int):
+        return
+    if isinstance(value, str):
+        try:
+            int(value)
+            return
+        except ValueError:
+            pass
+    errors.append(f"{where}: '{field}' must be an integer")
+
+
+def validate_record(kind: str, rec, where: str) -> list:
+    errors = []
+    if not isinstance(rec, dict):
+        return [f"{where}: expected an object"]
+    if kind == "task":
+        _require_text(rec, "title", where, errors)
+        for field in ("id", "project_id", "frequency_hours", "next_occurrence_id"):
+            _optional_int(rec, field, where, errors)
+    elif kind == "project":
+        _require_text(rec, "name", where, errors)
+        _optional_int(rec, "id", where, errors)
+        for sub, sub_kind in (("todos", "project_todo"), ("assignments", "project_assignment")):
+            items = rec.get(sub)
+            if items is None:
+                continue
+            if not isinstance(items, list):
+                errors.append(f"{where}: '{sub}' must be a list")
+                continue
+            for i, item in enumerate(items):
+                if sub_kind == "project_assignment" and isinstance(item, str):
+                    continue
+                errors += validate_record(sub_kind, item, f"{where}.{sub}[{i}]")
+    elif kind == "project_todo":
+        _require_text(rec, "title", where, errors)
+        for field in ("project_id", "points"):
+            _optional_int(rec, field, where, errors)
+    elif kind == "project_assignment":
+        _require_text(rec, "username", where, errors)
+        _optional_int(rec, "project_id", where, errors)
+    elif kind == "sop":
+        _require_text(rec, "title", where, errors)
+        _require_text(rec, "version", where, errors)
+        _optional_int(rec, "id", where, errors)
+    elif kind == "sop_agreement":
+        _require_text(rec, "username", where, errors)
+        _require_text(rec, "sop_version", where, errors)
+        _optional_int(rec, "sop_id", where, errors)
+    else:
+        errors.append(f"{where}: unknown record type '{kind}'")
+    return errors
+
+
+def validate_payload(data) -> list:
+    if not isinstance(data, dict):
+        return ["data: expected an object keyed by group id"]
+    errors = []
+    for group_id, group_data in data.items():
+        if not isinstance(group_data, dict):
+            errors.append(f"data[{group_id}]: expected an object")
+            continue
+        for key, kind in (("tasks", "task"), ("projects", "project"), ("project_todos", "project_todo"),
+                          ("project_assignments", "project_assignment"), ("sops", "sop"),
+                          ("sop_agreements", "sop_agreement")):
+            items = group_data.get(key, [])
+            if not isinstance(items, list):
+                errors.append(f"data[{group_id}].{key}: expected a list")
+                continue
+            for i, rec in enumerate(items):
+                errors += validate_record(kind, rec, f"data[{group_id}].{key}[{i}]")
+                if len(errors) >= 100:
+                    return errors
+    return errors
+
+
+def _int_or_none(value):
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _flag(value, default=0):
+    if value is None:
+        return default
+    return int(bool(value))
+
+
+class GroupImporter:
+    # Use as a context manager: commits on success, rolls back on error.
+
+    def __init__(self, conn, batch_size: int = IMPORT_BATCH_SIZE):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch_size = batch_size
+        self._buffers = {name: [] for name in ("tasks", "projects", "project_todos", "project_assignments",
+                                                "sops", "sop_agreements")}
+        self._project_ids = {}  # (group_id, old id) -> new id
+        self._sop_ids = {}
+        self._task_ids = {}
+        self._series_links = []  # (new task id, group_id, old next_occurrence_id)
+        self.counts = {name: 0 for name in self._buffers}
+        self.recurring_imported = False
+        self.group_ids = set()
+
+    def __enter__(self):
+        self.cursor.execute("BEGIN IMMEDIATE")
+        self._next_id = {table: self._max_id(table) + 1 for table in ("tasks", "projects", "sops")}
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+        return False
+
+    def _max_id(self, table):
+        self.cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+        max_id = self.cursor.fetchone()[0]
+        self.cursor.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,))
+        row = self.cursor.fetchone()
+        return max(max_id, row[0] if row else 0)
+
+    def _allocate(self, table):
+        new_id = self._next_id[table]
+        self._next_id[table] += 1
+        return new_id
+
+    def _push(self, table, row):
+        buffer = self._buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self._flush(table)
+
+    def _flush(self, table):
+        buffer = self._buffers[table]
+        if not buffer:
+            return
+        columns = {
+            "tasks": TASK_COLUMNS,
+            "projects": PROJECT_COLUMNS,
+            "project_todos": TODO_COLUMNS,
+            "project_assignments": ASSIGNMENT_COLUMNS,
+            "sops": SOP_COLUMNS,
+            "sop_agreements": AGREEMENT_COLUMNS,
+        }[table]
+        self.cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            buffer
+        )
+        self.counts[table] += len(buffer)
+        self._buffers[table] = []
+
+    # ---- records ----
+
+    def add(self, kind: str, group_id: str, rec: dict):
+        self.group_ids.add(group_id)
+        getattr(self, f"add_{kind}")(group_id, rec)
+
+    def add_project(self, group_id, rec):
+        new_id = self._allocate("projects")
+        if rec.get("id") is not None:
+            self._project_ids[(group_id, int(rec["id"]))] = new_id
+        self._push("projects", (new_id, rec["name"], rec.get("description"), rec.get("created_by"),
+                                rec.get("creation_date"), group_id))
+        for todo in rec.get("todos") or []:
+            self._add_todo_for(new_id, todo)
+        for assignment in rec.get("assignments") or []:
+            username = assignment if isinstance(assignment, str) else assignment["username"]
+            self._push("project_assignments", (new_id, username))
+
+    def _project_ref(self, group_id, old_id):
+        if old_id is None or old_id == "":
+            return None
+        return self._project_ids.get((group_id, int(old_id)))
+
+    def add_task(self, group_id, rec):
+        new_id = self._allocate("tasks")
+        if rec.get("id") is not None:
+            self._task_ids[(group_id, int(rec["id"]))] = new_id
+        if rec.get("next_occurrence_id") is not None:
+            self._series_links.append((new_id, group_id, int(rec["next_occurrence_id"])))
+        recurring = _flag(rec.get("recurring"))
+        self.recurring_imported = self.recurring_imported or bool(recurring)
+        self._push("tasks", (
+            new_id, rec["title"], rec.get("assigned_to"), rec.get("creation_date"), rec.get("due_date"),
+            _flag(rec.get("completed")), rec.get("completed_by"), rec.get("completed_on"), recurring,
+            _int_or_none(rec.get("frequency_hours")), _flag(rec.get("always_assigned"), 1), group_id,
+            self._project_ref(group_id, rec.get("project_id"))
+        ))
+
+    def _add_todo_for(self, project_id, rec):
+        self._push("project_todos", (
+            project_id, rec["title"], rec.get("description"), rec.get("due_date"), _flag(rec.get("is_task")),
+            rec.get("assigned_to"), _int_or_none(rec.get("points")) or 0, rec.get("creation_date"),
+            _flag(rec.get("completed")), rec.get("completed_by"), rec.get("completed_on")
+        ))
+
+    def add_project_todo(self, group_id, rec):
+        project_id = self._project_ref(group_id, rec.get("project_id"))
+        if project_id is None:
+            raise ImportValidationError([f"project_todo '{rec['title']}' references unknown project {rec.get('project_id')}"])
+        self._add_todo_for(project_id, rec)
+
+    def add_project_assignment(self, group_id, rec):
+        project_id = self._project_ref(group_id, rec.get("project_id"))
+        if project_id is None:
+            raise ImportValidationError([f"project_assignment '{rec['username']}' references unknown project {rec.get('project_id')}"])
+        self._push("project_assignments", (project_id, rec["username"]))
+
+    def add_sop(self, group_id, rec):
+        new_id = self._allocate("sops")
+        if rec.get("id") is not None:
+            self._sop_ids[(group_id, int(rec["id"]))] = new_id
+        self._push("sops", (new_id, rec["title"], rec.get("content"), rec["version"], rec.get("published_date"),
+                            rec.get("effective_date"), group_id))
+
+    def add_sop_agreement(self, group_id, rec):
+        sop_id = self._sop_ids.get((group_id, _int_or_none(rec.get("sop_id"))))
+        if sop_id is None:
+            raise ImportValidationError([f"sop_agreement of '{rec['username']}' references unknown SOP {rec.get('sop_id')}"])
+        self._push("sop_agreements", (sop_id, rec["username"], rec.get("agreed_at"), rec["sop_version"]))
+
+    def add_group_data(self, group_id, group_data: dict):
+        self.group_ids.add(group_id)
+        # Parents first so that references can be remapped.
+        for rec in group_data.get("projects", []):
+            self.add_project(group_id, rec)
+        for rec in group_data.get("sops", []):
+            self.add_sop(group_id, rec)
+        for rec in group_data.get("tasks", []):
+            self.add_task(group_id, rec)
+        for rec in group_data.get("project_todos", []):
+            self.add_project_todo(group_id, rec)
+        for rec in group_data.get("project_assignments", []):
+            self.add_project_assignment(group_id, rec)
+        for rec in group_data.get("sop_agreements", []):
+            self.add_sop_agreement(group_id, rec)
+
+    def finish(self):
+        for table in self._buffers:
+            self._flush(table)
+        if self._series_links:
+            # 0 marks "superseded by an occurrence that was not part of the
+            # archive", so the scheduler does not treat the row as a live head.
+            links = [(self._task_ids.get((group_id, old_next), 0), new_id)
+                     for new_id, group_id, old_next in self._series_links]
+            for i in range(0, len(links), self.batch_size):
+                self.cursor.executemany("UPDATE tasks SET next_occurrence_id=? WHERE id=?",
+                                        links[i:i + self.batch_size])
@@ -0,0 +1,155 @@
+# log_config.py
+#
+# Logging setup for the backend.
+#
+# Records are handed to a QueueHandler and written by a QueueListener thread,
+# so request threads never block on stdout. Messages use %-style arguments,
+# which the logging module only formats for records that pass the level check:
+# a disabled debug line costs one isEnabledFor() call.
+#
+# Environment:
+#   LOG_LEVEL          level of the "tasktracker" logger (default INFO)
+#   LOG_FORMAT         "text" (default) or "json" (one object per line)
+#   LOG_DEBUG_SAMPLE   fraction of DEBUG records to keep, 0..1 (default 1)
+#   LOG_QUEUE_SIZE     records buffered before new ones are dropped (default 10000)
+#
+# Levels can be changed at runtime through set_level() (see /api/log_level).
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+APP_LOGGER = "tasktracker"
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+class RequestContextFilter(logging.Filter):
+    # Adds record.request_id. Runs in the emitting thread, before the record is
+    # queued, because the request context is gone once the listener sees it.
+    def __init__(self, request_id_getter):
+        super().__init__()
+        self.request_id_getter = request_id_getter
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = self.request_id_getter() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    # Keeps only a fraction of DEBUG records; other levels always pass.
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    # Drops records instead of blocking when the listener falls behind.
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+
+def configure_logging(request_id_getter=lambda: None, level=None, fmt=None, debug_sample=None,
+                      queue_size=None, stream=None):
+    # Installs the queue handler on the root logger (replacing a previous
+    # configuration) so module loggers such as "scheduler" share the output.
+    global _listener, _queue_handler
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    fmt = fmt or os.environ.get("LOG_FORMAT", "text")
+    if debug_sample is None:
+        debug_sample = float(os.environ.get("LOG_DEBUG_SAMPLE", "1"))
+    queue_size = queue_size or int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(SamplingFilter(debug_sample))
+    handler.addFilter(RequestContextFilter(request_id_getter))
+
+    with _lock:
+        root = logging.getLogger()
+        if _queue_handler is not None:
+            root.removeHandler(_queue_handler)
+        if _listener is not None:
+            _listener.stop()
+        root.addHandler(handler)
+        if root.level == logging.WARNING:  # untouched default
+            root.setLevel(logging.INFO)
+        logging.getLogger(APP_LOGGER).setLevel(level.upper() if isinstance(level, str) else level)
+        _queue_handler = handler
+        _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=False)
+        _listener.start()
+
+
+def shutdown_logging():
+    # Flushes whatever is still queued.
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def set_level(name: str, level) -> str:
+    logger = logging.getLogger(name or None)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    return logging.getLevelName(logger.level)
+
+
+def get_levels() -> dict:
+    levels = {"root": logging.getLevelName(logging.getLogger().level)}
+    for name, logger in sorted(logging.root.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            levels[name] = logging.getLevelName(logger.level)
+    return levels
+
+
+def stats() -> dict:
+    handler = _queue_handler
+    if handler is None:
+        return {"configured": False}
+    return {"configured": True, "queued": handler.queue.qsize(), "dropped": handler.dropped,
+            "levels": get_levels()}
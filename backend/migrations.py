@@ -0,0 +1,488 @@
+# migrations.py
+#
+# Versioned schema migrations on top of the base tables created in
+# app.init_db(). The current schema version lives in PRAGMA user_version;
+# every migration with a higher version runs once, in its own transaction,
+# and bumps user_version when it commits.
+#
+# To change the schema append a new (version, description, function) entry to
+# MIGRATIONS. Never edit or reorder a migration that has already shipped.
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Same shape as datetime.utcnow().isoformat() (but millisecond precision), so
+# timestamps written by SQL and by Python compare correctly as strings.
+SQL_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+
+def _column_names(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _m001_tasks_project_id(cursor):
+    # Replaces the old upgrade_tasks_table(): databases created before
+    # projects existed have no tasks.project_id column.
+    if "project_id" not in _column_names(cursor, "tasks"):
+        cursor.execute("ALTER TABLE tasks ADD COLUMN project_id INTEGER")
+
+
+def _m002_hot_path_indexes(cursor):
+    # One index per access path used by the API endpoints.
+    statements = [
+        # tasks WHERE group_id=? / tasks WHERE completed=1 AND group_id=?
+        "CREATE INDEX IF NOT EXISTS idx_tasks_group_completed ON tasks(group_id, completed)",
+        # tasks linked to a project
+        "CREATE INDEX IF NOT EXISTS idx_tasks_project ON tasks(project_id)",
+        # projects WHERE group_id=?
+        "CREATE INDEX IF NOT EXISTS idx_projects_group ON projects(group_id)",
+        # project_todos WHERE project_id=? (AND id=?)
+        "CREATE INDEX IF NOT EXISTS idx_project_todos_project ON project_todos(project_id)",
+        # project_assignments WHERE project_id=? AND username=?
+        "CREATE INDEX IF NOT EXISTS idx_project_assignments_project_user ON project_assignments(project_id, username)",
+        # user_groups WHERE username=? and the groups JOIN on group_id
+        "CREATE INDEX IF NOT EXISTS idx_user_groups_username_group ON user_groups(username, group_id)",
+        # user_groups WHERE group_id=? (group members)
+        "CREATE INDEX IF NOT EXISTS idx_user_groups_group ON user_groups(group_id)",
+        # group_permissions WHERE group_id IN (...) joined to permissions
+        "CREATE INDEX IF NOT EXISTS idx_group_permissions_group_perm ON group_permissions(group_id, permission_id)",
+        # sops WHERE group_id=?
+        "CREATE INDEX IF NOT EXISTS idx_sops_group ON sops(group_id)",
+        # sop_agreements WHERE username=? AND sop_id=?
+        "CREATE INDEX IF NOT EXISTS idx_sop_agreements_user_sop ON sop_agreements(username, sop_id)",
+        # device_tokens WHERE username=? AND token=?
+        "CREATE INDEX IF NOT EXISTS idx_device_tokens_user_token ON device_tokens(username, token)",
+    ]
+    for sql in statements:
+        cursor.execute(sql)
+
+
+def _m003_tasks_updated_at(cursor):
+    # updated_at drives delta sync (?updated_since=) on /api/tasks and
+    # /api/history. It is maintained by triggers so that every writer, present
+    # and future, bumps it without having to remember to.
+    if "updated_at" not in _column_names(cursor, "tasks"):
+        cursor.execute("ALTER TABLE tasks ADD COLUMN updated_at TEXT")
+    cursor.execute(f"UPDATE tasks SET updated_at = COALESCE(completed_on, creation_date, {SQL_NOW})")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_insert_updated_at
+        AFTER INSERT ON tasks WHEN NEW.updated_at IS NULL
+        BEGIN
+            UPDATE tasks SET updated_at = {SQL_NOW} WHERE id = NEW.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_update_updated_at
+        AFTER UPDATE ON tasks WHEN NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE tasks SET updated_at = {SQL_NOW} WHERE id = NEW.id;
+        END
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_group_updated ON tasks(group_id, updated_at, id)")
+    # Tombstones: a delta poll must also learn about tasks that left the table.
+    # The deletion time is the tombstone's updated_at, so deltas read it with
+    # the same (updated_at, id) keyset as the live rows.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS deleted_tasks (
+            id INTEGER PRIMARY KEY,
+            group_id TEXT,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_deleted_tasks_group_updated ON deleted_tasks(group_id, updated_at, id)")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_tombstone
+        AFTER DELETE ON tasks
+        BEGIN
+            INSERT OR REPLACE INTO deleted_tasks (id, group_id, updated_at) VALUES (OLD.id, OLD.group_id, {SQL_NOW});
+        END
+    """)
+    # A task that moves to another group is gone from the old group's list.
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_regroup_tombstone
+        AFTER UPDATE OF group_id ON tasks WHEN OLD.group_id IS NOT NEW.group_id
+        BEGIN
+            INSERT OR REPLACE INTO deleted_tasks (id, group_id, updated_at) VALUES (OLD.id, OLD.group_id, {SQL_NOW});
+        END
+    """)
+
+
+def _m004_recurring_series(cursor):
+    # A recurring task that has been superseded by its next occurrence points
+    # at it via next_occurrence_id. The live head of every series therefore is
+    # "recurring=1 AND next_occurrence_id IS NULL", which the partial index
+    # below serves in one scan ordered by due date.
+    if "next_occurrence_id" not in _column_names(cursor, "tasks"):
+        cursor.execute("ALTER TABLE tasks ADD COLUMN next_occurrence_id INTEGER")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tasks_recurring_heads ON tasks(due_date)
+        WHERE recurring = 1 AND next_occurrence_id IS NULL
+    """)
+
+
+# Column expressions shared by the stats triggers and the backfill. They match
+# the time_taken template filter: whole minutes between creation and completion.
+_STATS_TASK_MINUTES = "((strftime('%s', {t}.completed_on) - strftime('%s', {t}.creation_date)) / 60)"
+_STATS_TASK_TIMED = "({t}.completed_on IS NOT NULL AND {t}.creation_date IS NOT NULL)"
+# 0 rather than NULL when completed_on or due_date is missing (e.g. imported
+# tasks), since stats_daily.overdue is NOT NULL.
+_STATS_TASK_OVERDUE = "COALESCE({t}.completed_on > {t}.due_date, 0)"
+
+
+def _stats_task_upsert(t, sign):
+    # Adds (sign=1) or removes (sign=-1) one task completion to its rollup row.
+    return f"""
+        INSERT INTO stats_daily (group_id, day, username, completed, timed, total_minutes, overdue, points)
+        VALUES (
+            COALESCE({t}.group_id, ''),
+            COALESCE(substr({t}.completed_on, 1, 10), ''),
+            COALESCE({t}.completed_by, {t}.assigned_to, ''),
+            {sign},
+            {sign} * {_STATS_TASK_TIMED.format(t=t)},
+            {sign} * COALESCE({_STATS_TASK_MINUTES.format(t=t)}, 0),
+            {sign} * {_STATS_TASK_OVERDUE.format(t=t)},
+            0
+        )
+        ON CONFLICT(group_id, day, username) DO UPDATE SET
+            completed = completed + excluded.completed,
+            timed = timed + excluded.timed,
+            total_minutes = total_minutes + excluded.total_minutes,
+            overdue = overdue + excluded.overdue;
+    """
+
+
+def _stats_todo_upsert(t, sign):
+    return f"""
+        INSERT INTO stats_daily (group_id, day, username, completed, timed, total_minutes, overdue, points)
+        SELECT COALESCE(p.group_id, ''),
+               COALESCE(substr({t}.completed_on, 1, 10), ''),
+               COALESCE({t}.completed_by, {t}.assigned_to, ''),
+               0, 0, 0, 0,
+               {sign} * COALESCE({t}.points, 0)
+        FROM projects p WHERE p.id = {t}.project_id
+        ON CONFLICT(group_id, day, username) DO UPDATE SET
+            points = points + excluded.points;
+    """
+
+
+def _m005_stats_rollups(cursor):
+    # Per group / day / user rollup of completions, kept current by triggers so
+    # every code path that finishes a task (API, scheduler, import) is counted.
+    # /api/stats reads only this table, so it costs O(days) instead of O(tasks).
+    # Deleting a task does not touch its rollup: stats are a ledger of
+    # completions, and archived tasks must keep counting.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_daily (
+            group_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            username TEXT NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            timed INTEGER NOT NULL DEFAULT 0,
+            total_minutes INTEGER NOT NULL DEFAULT 0,
+            overdue INTEGER NOT NULL DEFAULT 0,
+            points INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (group_id, day, username)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_task_insert
+        AFTER INSERT ON tasks WHEN NEW.completed = 1
+        BEGIN {_stats_task_upsert("NEW", 1)} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_task_completed
+        AFTER UPDATE OF completed ON tasks WHEN NEW.completed = 1 AND OLD.completed = 0
+        BEGIN {_stats_task_upsert("NEW", 1)} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_task_reopened
+        AFTER UPDATE OF completed ON tasks WHEN NEW.completed = 0 AND OLD.completed = 1
+        BEGIN {_stats_task_upsert("OLD", -1)} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_todo_completed
+        AFTER UPDATE OF completed ON project_todos WHEN NEW.completed = 1 AND OLD.completed = 0
+        BEGIN {_stats_todo_upsert("NEW", 1)} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_todo_reopened
+        AFTER UPDATE OF completed ON project_todos WHEN NEW.completed = 0 AND OLD.completed = 1
+        BEGIN {_stats_todo_upsert("OLD", -1)} END
+    """)
+    # Backfill from existing data.
+    cursor.execute("DELETE FROM stats_daily")
+    cursor.execute(f"""
+        INSERT INTO stats_daily (group_id, day, username, completed, timed, total_minutes, overdue, points)
+        SELECT COALESCE(t.group_id, ''), COALESCE(substr(t.completed_on, 1, 10), ''),
+               COALESCE(t.completed_by, t.assigned_to, ''),
+               COUNT(*), SUM({_STATS_TASK_TIMED.format(t="t")}),
+               SUM(COALESCE({_STATS_TASK_MINUTES.format(t="t")}, 0)),
+               SUM({_STATS_TASK_OVERDUE.format(t="t")}), 0
+        FROM tasks t WHERE t.completed = 1
+        GROUP BY 1, 2, 3
+    """)
+    cursor.execute("""
+        INSERT INTO stats_daily (group_id, day, username, completed, timed, total_minutes, overdue, points)
+        SELECT COALESCE(p.group_id, ''), COALESCE(substr(pt.completed_on, 1, 10), ''),
+               COALESCE(pt.completed_by, pt.assigned_to, ''), 0, 0, 0, 0, SUM(COALESCE(pt.points, 0))
+        FROM project_todos pt JOIN projects p ON p.id = pt.project_id
+        WHERE pt.completed = 1
+        GROUP BY 1, 2, 3
+        ON CONFLICT(group_id, day, username) DO UPDATE SET points = points + excluded.points
+    """)
+
+
+def _m006_otp_codes(cursor):
+    # Pending OTP codes shared by all worker processes (otp_store.SqliteOtpStore).
+    # Times are Unix timestamps. A row outlives its code while the phone's rate
+    # window is open; purge_after is when the row can go altogether.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS otp_codes (
+            phone TEXT PRIMARY KEY,
+            code TEXT,
+            expires_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            window_start REAL NOT NULL,
+            window_count INTEGER NOT NULL DEFAULT 0,
+            purge_after REAL NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_otp_codes_purge ON otp_codes(purge_after)")
+
+
+def _m007_push_due_scan(cursor):
+    # push.PushNotifier announces tasks as they come due. The partial index
+    # serves its "open tasks due in (last scan, now]" range query and
+    # push_state holds the shared scanned-until mark.
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tasks_open_due ON tasks(due_date)
+        WHERE completed = 0
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS push_state (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+    # Invalid tokens are pruned with DELETE ... WHERE token=?, which
+    # idx_device_tokens_user_token (username first) cannot serve.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_device_tokens_token ON device_tokens(token)")
+
+
+# (table, collection, SQL expression for the group id in terms of {r} = NEW/OLD)
+_VERSIONED_TABLES = [
+    ("tasks", "tasks", "{r}.group_id"),
+    ("projects", "projects", "{r}.group_id"),
+    ("project_todos", "projects", "(SELECT group_id FROM projects WHERE id = {r}.project_id)"),
+    ("project_assignments", "projects", "(SELECT group_id FROM projects WHERE id = {r}.project_id)"),
+    ("sops", "sops", "{r}.group_id"),
+    ("sop_agreements", "sops", "(SELECT group_id FROM sops WHERE id = {r}.sop_id)"),
+    ("groups", "groups", "{r}.id"),
+    ("user_groups", "groups", "{r}.group_id"),
+]
+
+
+def _bump_version(scope_sql, condition="true"):
+    # An upsert fed by SELECT needs a WHERE clause to parse; it also skips
+    # rows without a group (e.g. todos whose project is already gone).
+    return f"""
+        INSERT INTO data_versions (scope, version) SELECT {scope_sql}, 1 WHERE {condition}
+        ON CONFLICT(scope) DO UPDATE SET version = version + 1;
+    """
+
+
+def _m008_data_versions(cursor):
+    # Version counters behind the ETags of the polling endpoints. Every write
+    # to a table bumps "group:<id>" of the affected group and "table:<name>" of
+    # its collection (for the endpoints that are not filtered by group). Being
+    # triggers, they also cover the scheduler, imports and future writers.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            scope TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    for table, collection, group_expr in _VERSIONED_TABLES:
+        for event, rows in (("INSERT", ["NEW"]), ("UPDATE", ["NEW", "OLD"]), ("DELETE", ["OLD"])):
+            body = _bump_version(f"'table:{collection}'")
+            for r in rows:
+                group_sql = group_expr.format(r=r)
+                condition = f"{group_sql} IS NOT NULL"
+                if r == "OLD" and event == "UPDATE":
+                    # Only when the row moved to another group.
+                    condition += f" AND {group_sql} IS NOT {group_expr.format(r='NEW')}"
+                body += _bump_version(f"'group:' || {group_sql}", condition)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                AFTER {event} ON {table}
+                BEGIN
+                    {body}
+                END
+            """)
+
+
+# Full-text search (search.py). One FTS5 table covers every searchable kind;
+# rowid = source id * 4 + kind code, so triggers can find a document by
+# primary key instead of scanning the UNINDEXED columns.
+SEARCH_KINDS = {"task": 1, "todo": 2, "sop": 3}
+
+# (table, kind, title, body, group id, columns whose change re-indexes the row)
+_SEARCH_SOURCES = [
+    ("tasks", "task", "{r}.title", "''", "{r}.group_id", "title, group_id"),
+    ("project_todos", "todo", "{r}.title", "COALESCE({r}.description, '')",
+     "(SELECT group_id FROM projects WHERE id = {r}.project_id)", "title, description, project_id"),
+    ("sops", "sop", "{r}.title", "COALESCE({r}.content, '')", "{r}.group_id", "title, content, group_id"),
+]
+
+
+def search_group_key(group_id) -> str:
+    # The search_fts.group_key token of a group: "g" plus the hex of its id,
+    # so every group id is exactly one token and no two groups share one.
+    return "g" + str(group_id).encode("utf-8").hex().upper()
+
+
+def _m009_search_index(cursor):
+    # group_id is UNINDEXED and compared exactly (as an indexed column its
+    # tokens would match other groups: "c" is a token of 'a"b c'). group_key
+    # is one unambiguous token per group (search_group_key), so "group_key :
+    # <key> AND ..." still narrows the match inside the index. group_key comes
+    # last, so highlight() and snippet() see title and body as columns 3 and 4.
+    # The prefix indexes make prefixes of up to 4 characters as cheap as whole
+    # words (for about 10% more index).
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+            kind UNINDEXED, ref_id UNINDEXED, group_id UNINDEXED, title, body, group_key,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3 4'
+        )
+    """)
+    for table, kind, title, body, group, watched in _SEARCH_SOURCES:
+        code = SEARCH_KINDS[kind]
+
+        def values(r):
+            group_id = group.format(r=r)
+            return (f"{r}.id * 4 + {code}, '{kind}', {r}.id, {group_id}, {title.format(r=r)}, "
+                    f"{body.format(r=r)}, 'g' || hex({group_id})")
+
+        columns = "rowid, kind, ref_id, group_id, title, body, group_key"
+        delete = f"DELETE FROM search_fts WHERE rowid = OLD.id * 4 + {code};"
+        insert = f"INSERT INTO search_fts ({columns}) VALUES ({values('NEW')});"
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_insert_search AFTER INSERT ON {table}
+            BEGIN {insert} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_update_search AFTER UPDATE OF {watched} ON {table}
+            BEGIN {delete} {insert} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_search AFTER DELETE ON {table}
+            BEGIN {delete} END
+        """)
+        cursor.execute(f"INSERT INTO search_fts ({columns}) SELECT {values(table)} FROM {table}")
+    # Todos take their group from the project.
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_projects_group_search AFTER UPDATE OF group_id ON projects
+        BEGIN
+            UPDATE search_fts SET group_id = NEW.group_id, group_key = 'g' || hex(NEW.group_id)
+            WHERE rowid IN (SELECT id * 4 + {SEARCH_KINDS["todo"]} FROM project_todos WHERE project_id = NEW.id);
+        END
+    """)
+    cursor.execute("INSERT INTO search_fts (search_fts) VALUES ('optimize')")
+
+
+# Columns shared by tasks and tasks_archive, in the order of SELECT * FROM tasks.
+TASK_ARCHIVE_COLUMNS = (
+    "id", "title", "assigned_to", "creation_date", "due_date", "completed", "completed_by", "completed_on",
+    "recurring", "frequency_hours", "always_assigned", "group_id", "project_id", "updated_at", "next_occurrence_id",
+)
+
+
+def _m010_tasks_archive(cursor):
+    # Cold storage for old completed tasks (archiver.TaskArchiver), so the live
+    # tasks table only holds open work and recent completions. Archived rows
+    # keep their id; AUTOINCREMENT on tasks guarantees it is never reused.
+    # tasks_all is what history and exports read: both tables, same columns.
+    columns = ", ".join(TASK_ARCHIVE_COLUMNS)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tasks_archive (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            assigned_to TEXT,
+            creation_date TEXT,
+            due_date TEXT,
+            completed BOOLEAN DEFAULT 1,
+            completed_by TEXT,
+            completed_on TEXT,
+            recurring BOOLEAN DEFAULT 0,
+            frequency_hours INTEGER,
+            always_assigned BOOLEAN DEFAULT 1,
+            group_id TEXT,
+            project_id INTEGER,
+            updated_at TEXT,
+            next_occurrence_id INTEGER,
+            archived_at TEXT NOT NULL
+        )
+    """)
+    # History pages: group_id=? ORDER BY id, and the updated_since delta.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_archive_group ON tasks_archive(group_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_archive_group_updated ON tasks_archive(group_id, updated_at, id)")
+    # The archiver's candidate scan: completed tasks by completion date.
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tasks_completed_on ON tasks(completed_on)
+        WHERE completed = 1
+    """)
+    cursor.execute(f"""
+        CREATE VIEW IF NOT EXISTS tasks_all AS
+        SELECT {columns} FROM tasks
+        UNION ALL
+        SELECT {columns} FROM tasks_archive
+    """)
+
+
+MIGRATIONS = [
+    (1, "add tasks.project_id", _m001_tasks_project_id),
+    (2, "indexes for hot query paths", _m002_hot_path_indexes),
+    (3, "tasks.updated_at for delta sync", _m003_tasks_updated_at),
+    (4, "tasks.next_occurrence_id for recurring series", _m004_recurring_series),
+    (5, "stats_daily rollups", _m005_stats_rollups),
+    (6, "otp_codes table", _m006_otp_codes),
+    (7, "push notification due scan", _m007_push_due_scan),
+    (8, "data_versions counters for ETags", _m008_data_versions),
+    (9, "search_fts full-text index", _m009_search_index),
+    (10, "tasks_archive and tasks_all view", _m010_tasks_archive),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn) -> list:
+    # Returns the versions that were applied (empty if already up to date).
+    current = get_schema_version(conn)
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.debug("Applying migration %s: %s", version, description)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            migrate(cursor)
+            # PRAGMA does not accept bound parameters; version is an int from MIGRATIONS.
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    if applied:
+        # Refresh planner statistics so the new indexes are actually picked.
+        conn.execute("ANALYZE")
+        conn.commit()
+    return applied
@@ -0,0 +1,226 @@
+# otp_store.py
+#
+# Storage for pending OTP codes, with per-phone rate limiting.
+#
+# MemoryOtpStore keeps everything in the process. Expiry times go into a
+# min-heap, so a sweep only touches entries that have actually expired
+# (amortised O(log n) each) and the store cannot grow under a flood of OTP
+# requests for numbers that never verify.
+#
+# SqliteOtpStore keeps the same data in the otp_codes table (migration 6) so
+# that every worker process sees the same codes: the OTP requested through one
+# gunicorn worker can be verified through another. Expired rows are deleted
+# through the index on purge_after.
+#
+# Both stores implement:
+#   put(phone, code)           raises OtpRateLimited when the phone asked too often
+#   verify(phone, code)        -> one of the VERIFY_* results below
+#   sweep()                    drops expired state, returns how much was removed
+#   stats()
+
+import heapq
+import threading
+import time
+
+VERIFY_OK = "ok"
+VERIFY_MISSING = "missing"
+VERIFY_EXPIRED = "expired"
+VERIFY_MISMATCH = "mismatch"
+VERIFY_LOCKED = "locked"  # too many wrong guesses, the code was discarded
+
+
+class OtpRateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too many OTP requests, retry in {int(retry_after) + 1}s")
+        self.retry_after = retry_after
+
+
+class MemoryOtpStore:
+    def __init__(self, ttl: float = 300.0, rate_limit: int = 5, rate_window: float = 900.0,
+                 max_attempts: int = 5):
+        self.ttl = ttl
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.max_attempts = max_attempts
+        # phone -> [code, expires_at, attempts, window_start, window_count]
+        self._entries = {}
+        self._heap = []  # (purge_after, phone)
+        self._lock = threading.Lock()
+        self._stats = {"issued": 0, "rate_limited": 0, "verified": 0, "failed": 0, "swept": 0}
+
+    def _sweep_locked(self, now):
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            purge_after, phone = heapq.heappop(self._heap)
+            entry = self._entries.get(phone)
+            # Entries are rescheduled by pushing a new heap item; older items are stale.
+            if entry is not None and self._purge_after(entry) <= now:
+                del self._entries[phone]
+                removed += 1
+        self._stats["swept"] += removed
+        return removed
+
+    def _purge_after(self, entry):
+        return max(entry[1], entry[3] + self.rate_window)
+
+    def sweep(self) -> int:
+        with self._lock:
+            return self._sweep_locked(time.time())
+
+    def put(self, phone: str, code: str):
+        now = time.time()
+        with self._lock:
+            self._sweep_locked(now)
+            entry = self._entries.get(phone)
+            if entry is None or entry[3] + self.rate_window <= now:
+                window_start, window_count = now, 0
+            else:
+                window_start, window_count = entry[3], entry[4]
+            if window_count >= self.rate_limit:
+                self._stats["rate_limited"] += 1
+                raise OtpRateLimited(window_start + self.rate_window - now)
+            entry = [code, now + self.ttl, 0, window_start, window_count + 1]
+            self._entries[phone] = entry
+            heapq.heappush(self._heap, (self._purge_after(entry), phone))
+            self._stats["issued"] += 1
+
+    def verify(self, phone: str, code: str) -> str:
+        now = time.time()
+        with self._lock:
+            self._sweep_locked(now)
+            entry = self._entries.get(phone)
+            if entry is None or entry[0] is None:
+                result = VERIFY_MISSING
+            elif entry[1] <= now:
+                entry[0] = None
+                result = VERIFY_EXPIRED
+            elif entry[0] != code:
+                entry[2] += 1
+                if entry[2] >= self.max_attempts:
+                    entry[0] = None
+                    result = VERIFY_LOCKED
+                else:
+                    result = VERIFY_MISMATCH
+            else:
+                # Keep the entry (without a code) so the rate window still applies.
+                entry[0] = None
+                result = VERIFY_OK
+            self._stats["verified" if result == VERIFY_OK else "failed"] += 1
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["backend"] = "memory"
+            stats["entries"] = len(self._entries)
+            stats["pending"] = sum(1 for e in self._entries.values() if e[0] is not None)
+            stats["heap_size"] = len(self._heap)
+        return stats
+
+
+class SqliteOtpStore:
+    def __init__(self, connection_factory, ttl: float = 300.0, rate_limit: int = 5,
+                 rate_window: float = 900.0, max_attempts: int = 5, sweep_interval: float = 60.0):
+        # connection_factory() must return a context manager yielding a
+        # sqlite3 connection, e.g. ConnectionPool.connection.
+        self.connection_factory = connection_factory
+        self.ttl = ttl
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"issued": 0, "rate_limited": 0, "verified": 0, "failed": 0, "swept": 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _maybe_sweep(self, now):
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.sweep(now)
+
+    def sweep(self, now=None) -> int:
+        now = now or time.time()
+        with self.connection_factory() as conn:
+            removed = conn.execute("DELETE FROM otp_codes WHERE purge_after <= ?", (now,)).rowcount
+            conn.commit()
+        self._count("swept", removed)
+        return removed
+
+    def put(self, phone: str, code: str):
+        now = time.time()
+        self._maybe_sweep(now)
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute("SELECT window_start, window_count FROM otp_codes WHERE phone=?", (phone,))
+                row = cursor.fetchone()
+                if row is None or row[0] + self.rate_window <= now:
+                    window_start, window_count = now, 0
+                else:
+                    window_start, window_count = row
+                if window_count >= self.rate_limit:
+                    conn.rollback()
+                    self._count("rate_limited")
+                    raise OtpRateLimited(window_start + self.rate_window - now)
+                expires_at = now + self.ttl
+                cursor.execute("""
+                    INSERT INTO otp_codes (phone, code, expires_at, attempts, window_start, window_count, purge_after)
+                    VALUES (?, ?, ?, 0, ?, ?, ?)
+                    ON CONFLICT(phone) DO UPDATE SET
+                        code=excluded.code, expires_at=excluded.expires_at, attempts=0,
+                        window_start=excluded.window_start, window_count=excluded.window_count,
+                        purge_after=excluded.purge_after
+                """, (phone, code, expires_at, window_start, window_count + 1,
+                      max(expires_at, window_start + self.rate_window)))
+                conn.commit()
+            except OtpRateLimited:
+                raise
+            except Exception:
+                conn.rollback()
+                raise
+        self._count("issued")
+
+    def verify(self, phone: str, code: str) -> str:
+        now = time.time()
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute("SELECT code, expires_at, attempts FROM otp_codes WHERE phone=?", (phone,))
+                row = cursor.fetchone()
+                if row is None or row[0] is None:
+                    result = VERIFY_MISSING
+                elif row[1] <= now:
+                    result = VERIFY_EXPIRED
+                elif row[0] != code:
+                    result = VERIFY_LOCKED if row[2] + 1 >= self.max_attempts else VERIFY_MISMATCH
+                else:
+                    result = VERIFY_OK
+                if result == VERIFY_MISMATCH:
+                    cursor.execute("UPDATE otp_codes SET attempts = attempts + 1 WHERE phone=?", (phone,))
+                elif result != VERIFY_MISSING:
+                    # The row stays (without a code) so the rate window still applies.
+                    cursor.execute("UPDATE otp_codes SET code=NULL WHERE phone=?", (phone,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self._count("verified" if result == VERIFY_OK else "failed")
+        return result
+
+    def stats(self) -> dict:
+        with self.connection_factory() as conn:
+            entries, pending = conn.execute(
+                "SELECT COUNT(*), COUNT(code) FROM otp_codes"
+            ).fetchone()
+        with self._lock:
+            stats = dict(self._stats)
+        stats["backend"] = "sqlite"
+        stats["entries"] = entries
+        stats["pending"] = pending
+        return stats
@@ -0,0 +1,285 @@
+# push.py
+#
+# Push notifications (FCM) for task events.
+#
+# Endpoints only call PushNotifier.publish(), which appends the event to an
+# in-memory buffer and returns. A background thread waits for a short
+# coalescing window, so a burst of events for one group (e.g. ten tasks created
+# in a row) becomes a single notification. It then sends to every device token
+# of the group's members with multicast calls of at most 500 tokens. Tokens
+# that FCM reports as unregistered (or registered to another sender) are
+# deleted from device_tokens in one statement per flush (by token,
+# idx_device_tokens_token, migration 7). The token lists are read before
+# sending and the connection is released while FCM is called.
+#
+# "due" events come from a scan over open tasks whose due date passed since the
+# previous scan. The scanned-until mark lives in push_state (migration 7) and
+# is advanced in an IMMEDIATE transaction, so with several worker processes
+# each due task is announced by exactly one of them.
+#
+# Senders only need send_multicast(tokens, title, body, data) returning a list
+# of (token, error) pairs for the tokens that failed, where error is
+# INVALID_TOKEN for tokens that should be pruned.
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+FCM_MAX_TOKENS = 500
+INVALID_TOKEN = "invalid_token"
+
+EVENT_TEXT = {
+    "task_created": "New task: {title}",
+    "task_joined": "{actor} took over: {title}",
+    "task_finished": "{actor} finished: {title}",
+    "task_due": "Task is due: {title}",
+}
+
+GROUP_TOKENS_SQL = """
+    SELECT DISTINCT dt.token, dt.username FROM device_tokens dt
+    JOIN user_groups ug ON ug.username = dt.username
+    WHERE ug.group_id = ? AND dt.token IS NOT NULL AND dt.token != ''
+"""
+
+DUE_TASKS_SQL = """
+    SELECT id, title, group_id, assigned_to FROM tasks
+    WHERE completed = 0 AND due_date > ? AND due_date <= ?
+"""
+
+
+class FcmSender:
+    # firebase_admin is imported and initialised on the first send, not when
+    # the app is imported; it pulls in the Google client libraries.
+    def __init__(self, credentials_path: str = "service-account.json"):
+        self.credentials_path = credentials_path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _ensure_app(self):
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            import firebase_admin
+            from firebase_admin import credentials
+            try:
+                firebase_admin.get_app()
+            except ValueError:
+                firebase_admin.initialize_app(credentials.Certificate(self.credentials_path))
+                logger.info("Firebase Admin initialized successfully.")
+            self._ready = True
+
+    def send_multicast(self, tokens, title, body, data):
+        self._ensure_app()
+        from firebase_admin import exceptions, messaging
+        message = messaging.MulticastMessage(
+            tokens=tokens,
+            notification=messaging.Notification(title=title, body=body),
+            data=data,
+        )
+        response = messaging.send_each_for_multicast(message)
+        failures = []
+        for token, result in zip(tokens, response.responses):
+            if result.success:
+                continue
+            error = result.exception
+            # Only these two say the token itself is dead. InvalidArgumentError
+            # is also raised for a bad message (payload too large, reserved
+            # data keys), which would otherwise prune every token of the group.
+            if isinstance(error, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+                failures.append((token, INVALID_TOKEN))
+            else:
+                if isinstance(error, exceptions.InvalidArgumentError):
+                    logger.warning("FCM rejected the message for a token: %s", error)
+                failures.append((token, str(error)))
+        return failures
+
+
+class StubSender:
+    # Records every multicast call instead of talking to FCM. Tokens listed in
+    # invalid_tokens are reported back as unregistered.
+    def __init__(self, invalid_tokens=()):
+        self.invalid_tokens = set(invalid_tokens)
+        self.calls = []
+
+    def send_multicast(self, tokens, title, body, data):
+        self.calls.append({"tokens": list(tokens), "title": title, "body": body, "data": data})
+        return [(t, INVALID_TOKEN) for t in tokens if t in self.invalid_tokens]
+
+
+class PushNotifier:
+    def __init__(self, connection_factory, sender, window: float = 2.0, due_poll_interval: float = 60.0,
+                 batch_size: int = FCM_MAX_TOKENS):
+        # connection_factory() must return a context manager yielding a
+        # sqlite3 connection, e.g. ConnectionPool.connection.
+        self.connection_factory = connection_factory
+        self.sender = sender
+        self.window = window
+        self.due_poll_interval = due_poll_interval
+        self.batch_size = min(batch_size, FCM_MAX_TOKENS)
+        self._pending = {}  # group_id -> [event, ...]
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._last_due_scan = 0.0
+        self._stats = {"events": 0, "flushes": 0, "notifications": 0, "multicast_calls": 0,
+                       "delivered": 0, "failed": 0, "pruned": 0, "due_events": 0, "errors": 0,
+                       "last_flush_ms": 0.0}
+
+    def publish(self, event: str, task: dict, actor: str = None):
+        group_id = task.get("group_id")
+        if group_id in (None, ""):
+            return
+        entry = {"event": event, "task_id": task.get("id"), "title": task.get("title") or "", "actor": actor}
+        with self._cond:
+            if self._thread is None and not self._stopping:
+                self._start_locked(scan_due=False)
+            self._pending.setdefault(str(group_id), []).append(entry)
+            self._stats["events"] += 1
+            self._cond.notify()
+
+    # ---- background thread ----
+
+    def start(self, scan_due: bool = True):
+        with self._cond:
+            if self._thread is None:
+                self._start_locked(scan_due)
+            else:
+                # Already started lazily by publish().
+                self._scan_due = self._scan_due or scan_due
+                self._cond.notify()
+
+    def _start_locked(self, scan_due):
+        self._stopping = False
+        self._scan_due = scan_due
+        self._thread = threading.Thread(target=self._run, name="push-notifier", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        # Whatever was still buffered goes out now.
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                if not self._pending:
+                    wait = None
+                    if self._scan_due:
+                        wait = max(0.0, self._last_due_scan + self.due_poll_interval - time.monotonic())
+                    self._cond.wait(wait)
+                    if self._stopping:
+                        return
+            try:
+                if self._scan_due and time.monotonic() - self._last_due_scan >= self.due_poll_interval:
+                    self._last_due_scan = time.monotonic()
+                    self.scan_due()
+                with self._cond:
+                    has_events = bool(self._pending)
+                if has_events:
+                    # Let the burst finish before sending.
+                    time.sleep(self.window)
+                    self.flush()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error("Push notifier failed: %s", e)
+                time.sleep(1.0)
+
+    # ---- sending ----
+
+    def flush(self) -> int:
+        with self._cond:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        start = time.perf_counter()
+        # Token lists are read up front, so no pool connection is held while
+        # the FCM calls block.
+        with self.connection_factory() as conn:
+            recipients = {group_id: conn.execute(GROUP_TOKENS_SQL, (group_id,)).fetchall()
+                          for group_id in pending}
+        invalid = set()
+        for group_id, events in pending.items():
+            actors = {e["actor"] for e in events}
+            # Nobody needs a push about something they just did themselves.
+            skip_user = actors.pop() if len(actors) == 1 else None
+            tokens = [token for token, username in recipients[group_id] if username != skip_user]
+            if not tokens:
+                continue
+            title, body, data = self._render(group_id, events)
+            self._stats["notifications"] += 1
+            for i in range(0, len(tokens), self.batch_size):
+                chunk = tokens[i:i + self.batch_size]
+                failures = self.sender.send_multicast(chunk, title, body, data)
+                self._stats["multicast_calls"] += 1
+                self._stats["delivered"] += len(chunk) - len(failures)
+                self._stats["failed"] += len(failures)
+                invalid.update(token for token, error in failures if error == INVALID_TOKEN)
+        if invalid:
+            with self.connection_factory() as conn:
+                conn.executemany("DELETE FROM device_tokens WHERE token=?", [(t,) for t in invalid])
+                conn.commit()
+            self._stats["pruned"] += len(invalid)
+            logger.info("Pruned %d invalid device tokens", len(invalid))
+        self._stats["flushes"] += 1
+        self._stats["last_flush_ms"] = (time.perf_counter() - start) * 1000
+        return len(pending)
+
+    def _render(self, group_id, events):
+        data = {
+            "group_id": str(group_id),
+            "events": ",".join(sorted({e["event"] for e in events})),
+            "task_ids": ",".join(str(e["task_id"]) for e in events if e["task_id"] is not None)[:1000],
+        }
+        if len(events) == 1:
+            e = events[0]
+            text = EVENT_TEXT.get(e["event"], "{title}").format(title=e["title"], actor=e["actor"] or "Someone")
+            return "Task update", text, data
+        titles = ", ".join(e["title"] for e in events[:3])
+        more = f" and {len(events) - 3} more" if len(events) > 3 else ""
+        return f"{len(events)} task updates", titles + more, data
+
+    def scan_due(self, now=None) -> int:
+        # Publishes task_due for open tasks whose due date passed since the
+        # last scan (by any process). The first scan only sets the mark.
+        now_iso = (now or datetime.utcnow()).isoformat()
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute("SELECT value FROM push_state WHERE name='due_scanned_until'")
+                row = cursor.fetchone()
+                rows = []
+                if row is not None and row[0] < now_iso:
+                    cursor.execute(DUE_TASKS_SQL, (row[0], now_iso))
+                    rows = cursor.fetchall()
+                if row is None or row[0] < now_iso:
+                    cursor.execute("INSERT OR REPLACE INTO push_state (name, value) VALUES ('due_scanned_until', ?)",
+                                   (now_iso,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        for task_id, title, group_id, assigned_to in rows:
+            self.publish("task_due", {"id": task_id, "title": title, "group_id": group_id})
+        self._stats["due_events"] += len(rows)
+        return len(rows)
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending_groups"] = len(self._pending)
+            stats["pending_events"] = sum(len(v) for v in self._pending.values())
+            stats["running"] = self._thread is not None
+        return stats
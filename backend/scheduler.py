@@ -0,0 +1,263 @@
+# scheduler.py
+#
+# Background scheduler for recurring tasks (tasks.recurring=1 with a
+# frequency_hours). Every live series head is kept in one min-heap keyed by its
+# due date, across all groups. A tick only pops the entries that are due, so
+# its cost depends on the number of due tasks, not on the size of the table.
+#
+# When the head of a series comes due:
+#   - if it was completed, the next occurrence is inserted as a new task and
+#     the old row points at it through tasks.next_occurrence_id;
+#   - if it is still open, it is reset in place to the next period.
+# In both cases assigned_to is carried over only when always_assigned is set.
+# Each tick applies all of its changes in one IMMEDIATE transaction, and rows
+# are re-validated inside that transaction, so several worker processes can
+# run a scheduler against the same database without double-spawning.
+
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+HEADS_SQL = """
+    SELECT id, due_date FROM tasks
+    WHERE recurring = 1 AND next_occurrence_id IS NULL AND due_date IS NOT NULL
+      AND frequency_hours > 0
+"""
+
+
+def _parse(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class RecurringTaskScheduler:
+    def __init__(self, connection_factory, poll_interval: float = 60.0, batch_size: int = 500,
+                 resync_interval: float = 3600.0, listener=None):
+        # connection_factory() must return a context manager yielding a
+        # sqlite3 connection, e.g. ConnectionPool.connection. listener, if
+        # given, is called after each committed tick with a list of
+        # (group_id, op, task_id, fields) tuples, op being "create" or "update".
+        self.connection_factory = connection_factory
+        self.listener = listener
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.resync_interval = resync_interval
+        self._heap = []
+        self._scheduled = {}  # task_id -> due datetime of its current heap entry
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._last_resync = 0.0
+        self._stats = {"ticks": 0, "spawned": 0, "reset": 0, "stale": 0, "errors": 0,
+                       "last_tick_ms": 0.0, "last_rebuild_ms": 0.0}
+
+    # ---- heap maintenance ----
+
+    def rebuild(self):
+        start = time.perf_counter()
+        with self.connection_factory() as conn:
+            rows = conn.execute(HEADS_SQL).fetchall()
+        heap = []
+        scheduled = {}
+        for task_id, due_date in rows:
+            try:
+                due = _parse(due_date)
+            except ValueError:
+                logger.warning("Recurring task %s has an invalid due_date %r", task_id, due_date)
+                continue
+            heap.append((due, task_id))
+            scheduled[task_id] = due
+        heapq.heapify(heap)
+        with self._cond:
+            self._heap = heap
+            self._scheduled = scheduled
+            self._cond.notify()
+        self._last_resync = time.monotonic()
+        self._stats["last_rebuild_ms"] = (time.perf_counter() - start) * 1000
+        logger.debug("Recurring scheduler rebuilt with %d series", len(heap))
+        return len(heap)
+
+    def schedule(self, task_id: int, due_date):
+        # Called after a recurring task is created or its due date changes.
+        due = _parse(due_date)
+        with self._cond:
+            self._scheduled[task_id] = due
+            heapq.heappush(self._heap, (due, task_id))
+            self._cond.notify()
+
+    def unschedule(self, task_id: int):
+        # The heap entry stays behind and is skipped when it is popped.
+        with self._cond:
+            self._scheduled.pop(task_id, None)
+
+    def _pop_due(self, now):
+        due_entries = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now and len(due_entries) < self.batch_size:
+                due, task_id = heapq.heappop(self._heap)
+                if self._scheduled.get(task_id) != due:
+                    self._stats["stale"] += 1
+                    continue
+                del self._scheduled[task_id]
+                due_entries.append((due, task_id))
+        return due_entries
+
+    # ---- tick ----
+
+    def tick(self, now=None) -> int:
+        now = now or datetime.utcnow()
+        start = time.perf_counter()
+        entries = self._pop_due(now)
+        if not entries:
+            return 0
+        try:
+            pushes = self._apply(entries, now)
+        except Exception:
+            # Put the entries back; the run loop waits poll_interval before retrying.
+            with self._cond:
+                for due, task_id in entries:
+                    self._scheduled[task_id] = due
+                    heapq.heappush(self._heap, (due, task_id))
+            self._stats["errors"] += 1
+            raise
+        with self._cond:
+            for due, task_id in pushes:
+                self._scheduled[task_id] = due
+                heapq.heappush(self._heap, (due, task_id))
+        self._stats["ticks"] += 1
+        self._stats["last_tick_ms"] = (time.perf_counter() - start) * 1000
+        return len(entries)
+
+    def _apply(self, entries, now):
+        popped_due = {task_id: due for due, task_id in entries}
+        ids = list(popped_due)
+        now_iso = now.isoformat()
+        pushes = []
+        parent_links = []
+        resets = []
+        changes = []
+        spawned = 0
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                rows = []
+                # Stay well below SQLite's bound-parameter limit.
+                for i in range(0, len(ids), 500):
+                    chunk = ids[i:i + 500]
+                    cursor.execute(f"""
+                        SELECT id, title, assigned_to, due_date, completed, frequency_hours,
+                               always_assigned, group_id, project_id
+                        FROM tasks
+                        WHERE id IN ({','.join('?' * len(chunk))})
+                          AND recurring = 1 AND next_occurrence_id IS NULL
+                    """, chunk)
+                    rows.extend(cursor.fetchall())
+                for row in rows:
+                    task_id, title, assigned_to, due_date, completed, frequency_hours, always_assigned, group_id, project_id = row
+                    if not due_date or not frequency_hours or frequency_hours <= 0:
+                        continue
+                    due = _parse(due_date)
+                    if due != popped_due[task_id]:
+                        # Changed since it was scheduled (e.g. by another worker).
+                        if due > now:
+                            pushes.append((due, task_id))
+                            continue
+                    period = timedelta(hours=frequency_hours)
+                    # Skip every period that was missed while nobody was ticking.
+                    periods = (now - due) // period + 1
+                    next_due = due + periods * period
+                    keep_assignee = assigned_to if always_assigned else None
+                    if completed:
+                        cursor.execute("""
+                            INSERT INTO tasks
+                            (title, assigned_to, creation_date, due_date, completed, recurring, group_id, frequency_hours, always_assigned, project_id)
+                            VALUES (?, ?, ?, ?, 0, 1, ?, ?, ?, ?)
+                        """, (title, keep_assignee, now_iso, next_due.isoformat(), group_id, frequency_hours, always_assigned, project_id))
+                        parent_links.append((cursor.lastrowid, task_id))
+                        pushes.append((next_due, cursor.lastrowid))
+                        spawned += 1
+                        changes.append((group_id, "create", cursor.lastrowid, {
+                            "title": title, "assigned_to": keep_assignee, "creation_date": now_iso,
+                            "due_date": next_due.isoformat(), "completed": 0, "recurring": True,
+                            "frequency_hours": frequency_hours, "always_assigned": bool(always_assigned),
+                            "group_id": group_id, "project_id": project_id}))
+                        changes.append((group_id, "update", task_id, {"next_occurrence_id": cursor.lastrowid}))
+                    else:
+                        resets.append((now_iso, next_due.isoformat(), keep_assignee, task_id))
+                        pushes.append((next_due, task_id))
+                        changes.append((group_id, "update", task_id, {
+                            "creation_date": now_iso, "due_date": next_due.isoformat(), "assigned_to": keep_assignee}))
+                if parent_links:
+                    cursor.executemany("UPDATE tasks SET next_occurrence_id=? WHERE id=?", parent_links)
+                if resets:
+                    cursor.executemany("UPDATE tasks SET creation_date=?, due_date=?, assigned_to=? WHERE id=?", resets)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self._stats["spawned"] += spawned
+        self._stats["reset"] += len(resets)
+        if spawned or resets:
+            logger.debug("Recurring scheduler: spawned %d, reset %d", spawned, len(resets))
+        if changes and self.listener is not None:
+            try:
+                self.listener(changes)
+            except Exception as e:
+                logger.error("Recurring scheduler listener failed: %s", e)
+        return pushes
+
+    # ---- background thread ----
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self.rebuild()
+        self._thread = threading.Thread(target=self._run, name="recurring-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+            try:
+                if time.monotonic() - self._last_resync >= self.resync_interval:
+                    self.rebuild()
+                while self.tick() >= self.batch_size:
+                    pass
+                wait = self.poll_interval
+            except Exception as e:
+                logger.error("Recurring scheduler tick failed: %s", e)
+                wait = self.poll_interval
+            else:
+                with self._cond:
+                    if self._heap:
+                        until_due = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                        wait = max(0.0, min(wait, until_due))
+            with self._cond:
+                if not self._stopping:
+                    self._cond.wait(wait)
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["scheduled"] = len(self._scheduled)
+            stats["heap_size"] = len(self._heap)
+            stats["next_due"] = self._heap[0][0].isoformat() if self._heap else None
+            stats["running"] = self._thread is not None
+        return stats
@@ -0,0 +1,104 @@
+# search.py
+#
+# Full-text search over task titles, project todos (title and description) and
+# SOPs (title and content). Everything lives in the search_fts FTS5 table of
+# migration 9. Triggers keep it in sync with the source tables, so every
+# writer (API, scheduler, imports) is covered. Tasks moved to tasks_archive
+# (archiver.py) leave the index with their delete: search covers live tasks.
+#
+# Queries are restricted to one group inside the index by its group_key token
+# ("group_key : g<hex id>") and then by the exact group_id, which is UNINDEXED
+# (as an indexed column its tokens would match other groups).
+# All terms must match, and the last one also matches as a prefix, so typing
+# "keller wäsch" finds "Wäsche im Keller". Diacritics are folded.
+#
+# Results are ranked, but not by bm25(): the order is local to the matches.
+# bm25() needs the number of documents containing each term across the whole
+# index, and at 1M rows that count cost more than the rest of the query. Hits
+# in the title come before hits only in the body, and newer documents (higher
+# rowid) first within each. Results carry
+# the title with <mark> around the hits, plus a short snippet of the body. Both
+# are HTML-escaped; FTS5 marks the hits with private-use sentinels that are
+# only turned into <mark> after escaping, so user text can never inject markup.
+# Paging uses limit/offset because this order has no stable key. See
+# benchmarks/bench_search.py.
+
+import html
+import re
+
+from migrations import SEARCH_KINDS, search_group_key
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SNIPPET_TOKENS = 12
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+# Private-use characters, never produced by the tokenizer or the escaping.
+_MARK_OPEN = "\ue000"
+_MARK_CLOSE = "\ue001"
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def build_match(q: str, group_id: str):
+    # Returns an FTS5 MATCH expression, or None if q has no searchable term.
+    # Terms are quoted, so user input can never be parsed as FTS5 syntax.
+    terms = [_quote(t) for t in _TERM.findall(q or "")]
+    if not terms:
+        return None
+    if len(terms[-1]) >= 4:  # at least two characters between the quotes
+        terms[-1] += "*"
+    return f"group_key : {search_group_key(group_id)} AND {{title body}} : ({' '.join(terms)})"
+
+
+def mark_hits(text):
+    # Sentinel-marked FTS5 output -> escaped HTML with <mark> around the hits.
+    if text is None:
+        return None
+    return html.escape(text, quote=False).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def parse_kinds(value):
+    # "task,todo" -> ["task", "todo"]; None -> all kinds.
+    if not value:
+        return list(SEARCH_KINDS)
+    kinds = [k.strip() for k in value.split(",") if k.strip()]
+    unknown = [k for k in kinds if k not in SEARCH_KINDS]
+    if unknown:
+        raise ValueError(f"Unknown kind: {', '.join(unknown)}")
+    return kinds
+
+
+def search(cursor, q: str, group_id: str, kinds=None, limit: int = SEARCH_DEFAULT_LIMIT, offset: int = 0):
+    # Returns (results, next_offset); next_offset is None on the last page.
+    match = build_match(q, group_id)
+    if match is None:
+        return [], None
+    kinds = kinds or list(SEARCH_KINDS)
+    sql = f"""
+        SELECT kind, ref_id, group_id,
+               highlight(search_fts, 3, '{_MARK_OPEN}', '{_MARK_CLOSE}') AS marked_title,
+               snippet(search_fts, 4, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', {SNIPPET_TOKENS}) AS snippet
+        FROM search_fts
+        WHERE search_fts MATCH ? AND group_id = ?
+    """
+    params = [match, str(group_id)]
+    if len(kinds) < len(SEARCH_KINDS):
+        sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+        params += kinds
+    sql += f" ORDER BY instr(marked_title, '{_MARK_OPEN}') = 0, rowid DESC LIMIT ? OFFSET ?"
+    params += [limit + 1, offset]
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    next_offset = offset + limit if len(rows) > limit else None
+    results = [{
+        "kind": row[0],
+        "id": row[1],
+        "group_id": row[2],
+        "title": mark_hits(row[3]),
+        "snippet": mark_hits(row[4]),
+    } for row in rows[:limit]]
+    return results, next_offset
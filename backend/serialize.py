@@ -0,0 +1,105 @@
+# serialize.py
+#
+# Turning cursor rows into JSON response bodies, in one place.
+#
+# Pooled connections use sqlite3.Row, which is convenient in handlers but
+# expensive on list endpoints. Each row used to become a Row, then a dict, and
+# then jsonify sorted the keys of every one of those dicts. tuple_cursor()
+# returns a cursor that yields plain, column-ordered tuples. RowSet keeps the
+# column names once, next to those tuples, and encodes them in one of two shapes:
+#   objects   [{"id": 1, "title": "..."}, ...]              (the existing shape)
+#   columns   {"columns": ["id", "title"], "rows": [[1, "..."], ...]}
+# Both shapes go through the C JSON encoder without sort_keys. "columns" needs
+# no dict per row and repeats no field names, so a long task list is about half
+# the size. See benchmarks/bench_serialize.py.
+#
+# Single-row responses are built with task_dict(), todo_dict() and
+# project_dict(). task_dict() returns recurring and always_assigned as
+# booleans; todos and projects keep their stored values, as /api/projects
+# returns them.
+
+import json
+
+SHAPES = ("objects", "columns")
+
+TASK_FIELDS = (
+    "id", "title", "assigned_to", "creation_date", "due_date", "completed", "completed_by",
+    "completed_on", "recurring", "frequency_hours", "always_assigned", "group_id", "project_id",
+)
+_TASK_BOOL_FIELDS = frozenset(("recurring", "always_assigned"))
+
+PROJECT_FIELDS = ("id", "name", "description", "created_by", "creation_date", "group_id")
+# Todo fields as nested in a project; standalone todos also carry project_id.
+TODO_FIELDS = (
+    "id", "title", "description", "due_date", "is_task", "assigned_to", "points",
+    "creation_date", "completed", "completed_by", "completed_on",
+)
+
+_encode = json.JSONEncoder(separators=(",", ":"), default=str).encode
+
+
+def tuple_cursor(conn):
+    # A cursor whose rows are plain tuples in SELECT order, regardless of the
+    # connection's row factory.
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor
+
+
+def parse_shape(args) -> str:
+    shape = args.get("shape") or "objects"
+    if shape not in SHAPES:
+        raise ValueError(f"shape must be one of {', '.join(SHAPES)}")
+    return shape
+
+
+class RowSet:
+    __slots__ = ("columns", "rows")
+
+    def __init__(self, columns, rows):
+        self.columns = tuple(columns)
+        self.rows = rows
+
+    @classmethod
+    def fetch(cls, cursor):
+        # cursor should come from tuple_cursor() and have just been executed.
+        return cls([d[0] for d in cursor.description], cursor.fetchall())
+
+    def __len__(self):
+        return len(self.rows)
+
+    def value(self, index: int, column: str):
+        return self.rows[index][self.columns.index(column)]
+
+    def truncate(self, size: int):
+        self.rows = self.rows[:size]
+
+    def objects(self) -> list:
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+    def to_json(self, shape: str = "objects") -> str:
+        if shape == "columns":
+            return _encode({"columns": self.columns, "rows": self.rows})
+        return _encode(self.objects())
+
+
+def task_dict(row) -> dict:
+    # row is a sqlite3.Row (or anything indexable by column name) from tasks.
+    return {name: bool(row[name]) if name in _TASK_BOOL_FIELDS else row[name] for name in TASK_FIELDS}
+
+
+def todo_dict(row) -> dict:
+    # row is a sqlite3.Row (or anything indexable by column name) from project_todos.
+    todo = {name: row[name] for name in TODO_FIELDS}
+    todo["project_id"] = row["project_id"]
+    return todo
+
+
+def project_dict(row, fields=PROJECT_FIELDS) -> dict:
+    # row is a sqlite3.Row from projects; fields must be among PROJECT_FIELDS.
+    return {name: row[name] for name in fields}
+
+
+def to_json(value) -> str:
+    return _encode(value)
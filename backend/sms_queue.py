@@ -0,0 +1,224 @@
+# sms_queue.py
+#
+# Background delivery of SMS (OTP codes). Requests only enqueue a message and
+# return; a small pool of worker threads hands messages to the transport, which
+# keeps one client (and so one HTTP connection pool) for the whole process.
+# Failed sends are retried with exponential backoff and jitter. Retries wait in
+# a heap instead of sleeping in a worker, so one flaky number does not hold up
+# the rest of the queue.
+#
+# Transports only need a send(to, body) method returning a message id. Raise
+# PermanentSendError for errors that retrying cannot fix (invalid number, ...).
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentSendError(Exception):
+    pass
+
+
+class TwilioTransport:
+    def __init__(self, account_sid: str, auth_token: str, from_number: str):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from twilio.rest import Client
+                    self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    def send(self, to: str, body: str) -> str:
+        from twilio.base.exceptions import TwilioRestException
+        try:
+            message = self._get_client().messages.create(body=body, from_=self.from_number, to=to)
+        except TwilioRestException as e:
+            # 4xx means the request itself is wrong; only rate limiting is worth a retry.
+            if e.status and 400 <= e.status < 500 and e.status != 429:
+                raise PermanentSendError(str(e)) from e
+            raise
+        return message.sid
+
+
+class FakeSmsTransport:
+    # Local stand-in for tests and load benchmarks. Optionally sleeps to mimic
+    # the provider round-trip and fails a fraction of the sends.
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, keep: int = 1000):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = deque(maxlen=keep)
+        self._ids = itertools.count(1)
+
+    def send(self, to: str, body: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("fake transport failure")
+        sid = f"FAKE{next(self._ids)}"
+        self.sent.append((sid, to, body))
+        return sid
+
+
+class _Message:
+    __slots__ = ("to", "body", "enqueued", "attempts")
+
+    def __init__(self, to, body):
+        self.to = to
+        self.body = body
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+
+
+class SmsQueue:
+    def __init__(self, transport, workers: int = 4, max_attempts: int = 5, backoff_base: float = 1.0,
+                 backoff_max: float = 60.0, max_pending: int = 10000):
+        self.transport = transport
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_pending = max_pending
+        self._ready = deque()
+        self._delayed = []  # heap of (retry_at, seq, message)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._in_flight = 0
+        self._latencies = deque(maxlen=1000)  # enqueue -> delivered, in ms
+        self._stats = {"enqueued": 0, "sent": 0, "failed": 0, "retries": 0, "dropped": 0,
+                       "last_latency_ms": 0.0, "max_latency_ms": 0.0}
+
+    def submit(self, to: str, body: str) -> bool:
+        # Returns False when the backlog is full and the message was dropped.
+        with self._cond:
+            if not self._threads:
+                self._start_locked()
+            if len(self._ready) + len(self._delayed) >= self.max_pending:
+                self._stats["dropped"] += 1
+                logger.warning("SMS queue full, dropping message to %s", to)
+                return False
+            self._ready.append(_Message(to, body))
+            self._stats["enqueued"] += 1
+            self._cond.notify()
+        return True
+
+    # ---- workers ----
+
+    def start(self):
+        with self._cond:
+            if not self._threads:
+                self._start_locked()
+
+    def _start_locked(self):
+        # Started on first use rather than at import, so that forking servers
+        # get their threads in the worker process.
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"sms-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        # Waits until nothing is queued, delayed or in flight.
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._ready or self._delayed or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, 0.05))
+        return True
+
+    def _next_message(self):
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return None
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    self._ready.append(heapq.heappop(self._delayed)[2])
+                if self._ready:
+                    self._in_flight += 1
+                    return self._ready.popleft()
+                wait = self._delayed[0][0] - now if self._delayed else None
+                self._cond.wait(wait)
+
+    def _run(self):
+        while True:
+            message = self._next_message()
+            if message is None:
+                return
+            try:
+                self._deliver(message)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _deliver(self, message):
+        message.attempts += 1
+        start = time.monotonic()
+        try:
+            sid = self.transport.send(message.to, message.body)
+        except Exception as e:
+            permanent = isinstance(e, PermanentSendError)
+            if permanent or message.attempts >= self.max_attempts:
+                with self._cond:
+                    self._stats["failed"] += 1
+                logger.error("Giving up on SMS to %s after %d attempt(s): %s", message.to, message.attempts, e)
+                return
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (message.attempts - 1))
+            delay *= random.uniform(0.5, 1.0)
+            with self._cond:
+                self._stats["retries"] += 1
+                heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), message))
+                self._cond.notify()
+            logger.warning("SMS to %s failed (attempt %d), retrying in %.1fs: %s",
+                           message.to, message.attempts, delay, e)
+            return
+        now = time.monotonic()
+        latency_ms = (now - message.enqueued) * 1000
+        with self._cond:
+            self._stats["sent"] += 1
+            self._stats["last_latency_ms"] = latency_ms
+            self._stats["max_latency_ms"] = max(self._stats["max_latency_ms"], latency_ms)
+            self._latencies.append(latency_ms)
+        logger.info("SMS %s to %s delivered in %.0f ms (send %.0f ms, attempt %d)",
+                    sid, message.to, latency_ms, (now - start) * 1000, message.attempts)
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            latencies = sorted(self._latencies)
+            stats["queued"] = len(self._ready)
+            stats["waiting_retry"] = len(self._delayed)
+            stats["in_flight"] = self._in_flight
+            stats["workers"] = len(self._threads)
+        if latencies:
+            stats["avg_latency_ms"] = sum(latencies) / len(latencies)
+            stats["p95_latency_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        else:
+            stats["avg_latency_ms"] = stats["p95_latency_ms"] = 0.0
+        return stats
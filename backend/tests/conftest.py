@@ -0,0 +1,37 @@
+# conftest.py
+#
+# The app module reads its configuration from the environment at import time,
+# so the test database and the background components are set up here, before
+# any test imports it. All tests share one throwaway database.
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+_tmp = tempfile.mkdtemp(prefix="tasktracker-tests-")
+os.environ["DATABASE_PATH"] = os.path.join(_tmp, "test.db")
+os.environ["ENABLE_SCHEDULER"] = "0"
+os.environ["ENABLE_PUSH_NOTIFIER"] = "0"
+os.environ["ENABLE_ARCHIVER"] = "0"
+os.environ["SMS_TRANSPORT"] = "fake"
+os.environ["PUSH_SENDER"] = "stub"
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app
+    app.create_app()
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session["username"] = "otter"
+    return client
@@ -0,0 +1,35 @@
+# test_archiver.py
+
+from datetime import datetime
+
+from archiver import TaskArchiver
+
+GROUP = "archive-test"
+# Far enough in the past that no other test's tasks are due for archiving.
+COMPLETED_ON = "2001-01-01T00:00:00"
+NOW = datetime(2001, 6, 1)
+
+
+def test_archived_tasks_leave_live_reads_but_stay_in_history(app_module, client):
+    with app_module.db_pool.connection() as conn:
+        old_id = conn.execute("INSERT INTO tasks (title, creation_date, due_date, completed, completed_by, completed_on, group_id) "
+                              "VALUES ('gartenschlauch alt', ?, ?, 1, 'otter', ?, ?)",
+                              (COMPLETED_ON, COMPLETED_ON, COMPLETED_ON, GROUP)).lastrowid
+        recent_id = conn.execute("INSERT INTO tasks (title, creation_date, due_date, completed, completed_by, completed_on, group_id) "
+                                 "VALUES ('gartenschlauch neu', ?, ?, 1, 'otter', ?, ?)",
+                                 (COMPLETED_ON, COMPLETED_ON, "2001-05-30T00:00:00", GROUP)).lastrowid
+        conn.commit()
+    tasks_token = client.get(f"/api/tasks?group_id={GROUP}").headers["X-Sync-Token"]
+    history_token = client.get(f"/api/history?group_id={GROUP}").headers["X-Sync-Token"]
+
+    archiver = TaskArchiver(app_module.db_pool.connection, max_age_days=90)
+    assert archiver.run_once(now=NOW) == 1
+
+    tasks = client.get(f"/api/tasks?group_id={GROUP}&updated_since={tasks_token}").json
+    assert (tasks["tasks"], tasks["removed"]) == ([], [old_id])
+    history = client.get(f"/api/history?group_id={GROUP}&updated_since={history_token}").json
+    assert (history["tasks"], history["removed"]) == ([], [])
+    assert sorted(t["id"] for t in client.get(f"/api/history?group_id={GROUP}").json) == sorted([old_id, recent_id])
+
+    hits = client.get("/api/search", query_string={"q": "gartenschlauch", "group_id": GROUP}).json["results"]
+    assert [hit["id"] for hit in hits] == [recent_id]
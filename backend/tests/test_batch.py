@@ -0,0 +1,83 @@
+# test_batch.py
+#
+# /api/batch runs its sub-requests on a thread pool, all on one connection
+# inside one read transaction: they see the same snapshot even when a write
+# commits in between, and a handler's commit()/close() cannot end it.
+
+import threading
+
+GROUP = "batch-test"
+
+
+def insert_task(app_module, title):
+    with app_module.db_pool.connection() as conn:
+        conn.execute(
+            "INSERT INTO tasks (title, creation_date, due_date, completed, group_id) VALUES (?, ?, ?, 0, ?)",
+            (title, "2026-03-01T00:00:00", "2026-03-02T00:00:00", GROUP))
+        conn.commit()
+
+
+def titles(response):
+    assert response["status"] == 200
+    return [task["title"] for task in response["body"]]
+
+
+def test_items_share_one_snapshot(app_module, client, monkeypatch):
+    insert_task(app_module, "before")
+    first_done = threading.Event()
+    run_batch_item = app_module.run_batch_item
+
+    def ordered(conn, item, cookie, request_id):
+        if item["id"] == "first":
+            result = run_batch_item(conn, item, cookie, request_id)
+            # What a handler finishing its own work would do.
+            conn.commit()
+            conn.close()
+            first_done.set()
+            return result
+        assert first_done.wait(5)
+        insert_task(app_module, "during")
+        return run_batch_item(conn, item, cookie, request_id)
+
+    monkeypatch.setattr(app_module, "run_batch_item", ordered)
+    path = f"/api/tasks?group_id={GROUP}"
+    response = client.post("/api/batch", json={"requests": [
+        {"id": "first", "path": path}, {"id": "second", "path": path}]})
+    assert response.status_code == 200
+    first, second = response.json["responses"]
+    assert titles(first) == titles(second) == ["before"]
+    assert [t["title"] for t in client.get(path).json] == ["before", "during"]
+
+
+def test_items_run_in_parallel(app_module, client, monkeypatch):
+    # Each item waits for the other; run one after the other they would time out.
+    barrier = threading.Barrier(2, timeout=5)
+    run_batch_item = app_module.run_batch_item
+
+    def meet(conn, item, cookie, request_id):
+        barrier.wait()
+        return run_batch_item(conn, item, cookie, request_id)
+
+    monkeypatch.setattr(app_module, "run_batch_item", meet)
+    response = client.post("/api/batch", json={"requests": [
+        {"id": 1, "path": f"/api/tasks?group_id={GROUP}"}, {"id": 2, "path": f"/api/projects?group_id={GROUP}"}]})
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json["responses"]] == [200, 200]
+
+
+def test_streamed_routes_are_refused(client):
+    response = client.post("/api/batch", json={"requests": [
+        {"id": "events", "path": f"/api/events?group_id={GROUP}"},
+        {"id": "tasks", "path": f"/api/tasks?group_id={GROUP}"}]})
+    assert response.status_code == 200
+    events, tasks = response.json["responses"]
+    assert events["status"] == 400
+    assert "Streamed" in events["body"]["error"]
+    assert tasks["status"] == 200
+
+
+def test_nested_batches_are_refused(client):
+    response = client.post("/api/batch", json={"requests": [
+        {"id": 1, "path": f"/api/tasks?group_id={GROUP}"}, {"id": 2, "path": "/api/batch/"}]})
+    assert response.status_code == 400
+    assert response.json == {"error": "Batches cannot be nested", "index": 1}
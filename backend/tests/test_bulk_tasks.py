@@ -0,0 +1,114 @@
+# test_bulk_tasks.py
+#
+# The bulk endpoints validate every item, apply the valid ones in one
+# transaction and answer one result per input item, in input order. Each
+# affected group gets a single coalesced "bulk" change event.
+
+import json
+import queue
+
+GROUP = "bulk-test"
+OTHER_GROUP = "bulk-test-other"
+
+
+def create(client, tasks):
+    response = client.post("/api/tasks/bulk", json={"tasks": tasks})
+    assert response.status_code == 200
+    return response.json["results"]
+
+
+def create_ids(client, count, assigned_to=None):
+    results = create(client, [{"title": f"bulk {i}", "group_id": GROUP, "duration_hours": 24,
+                               "assigned_to": assigned_to} for i in range(count)])
+    return [result["task"]["id"] for result in results]
+
+
+def statuses(results):
+    return [(result["index"], result["status"]) for result in results]
+
+
+def drain(sub):
+    events = []
+    while True:
+        try:
+            _, _, event_type, data = sub.queue.get_nowait()
+        except queue.Empty:
+            return events
+        events.append((event_type, json.loads(data)))
+
+
+def fetch_task(app_module, task_id):
+    with app_module.db_pool.connection() as conn:
+        return conn.execute("SELECT title, group_id, assigned_to, completed, completed_by, recurring, frequency_hours "
+                            "FROM tasks WHERE id = ?", (task_id,)).fetchone()
+
+
+def test_bulk_create(app_module, client):
+    subs = [app_module.event_bus.subscribe(group)[0] for group in (GROUP, OTHER_GROUP)]
+    try:
+        results = create(client, [
+            {"title": "wash car", "group_id": GROUP, "duration_hours": 24, "assigned_to": "otter"},
+            {"title": "", "group_id": GROUP, "duration_hours": 24},
+            "not an object",
+            {"title": "water plants", "group_id": GROUP, "duration_hours": "soon"},
+            {"title": "take out bins", "group_id": OTHER_GROUP, "duration_hours": 2, "frequency_hours": 168},
+        ])
+        events = [drain(sub) for sub in subs]
+    finally:
+        for sub in subs:
+            app_module.event_bus.unsubscribe(sub)
+
+    assert statuses(results) == [(0, 201), (1, 400), (2, 400), (3, 400), (4, 201)]
+    car, bins = results[0]["task"], results[4]["task"]
+    assert tuple(fetch_task(app_module, car["id"])) == ("wash car", GROUP, "otter", 0, None, 0, None)
+    assert tuple(fetch_task(app_module, bins["id"])) == ("take out bins", OTHER_GROUP, None, 0, None, 1, 168)
+    assert bins["id"] in app_module.recurring_scheduler._scheduled
+    assert car["id"] not in app_module.recurring_scheduler._scheduled
+
+    # One coalesced event per group.
+    for group_events, task in zip(events, (car, bins)):
+        assert len(group_events) == 1
+        event_type, data = group_events[0]
+        assert event_type == "task" and data["op"] == "bulk"
+        assert [(c["op"], c["id"]) for c in data["changes"]] == [("create", task["id"])]
+
+
+def test_bulk_complete(app_module, client):
+    ids = create_ids(client, 3)
+    assert client.post(f"/api/tasks/{ids[2]}/finish", json={"username": "beaver"}).status_code == 200
+    response = client.post("/api/tasks/bulk/complete", json={
+        "username": "otter", "task_ids": [ids[0], ids[1], ids[2], ids[0], 999_999_999, "x"]})
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert statuses(results) == [(0, 200), (1, 200), (2, 409), (3, 409), (4, 404), (5, 400)]
+    assert results[2]["error"] == "Task is already completed"
+    assert results[3]["error"] == "Duplicate id in request"
+    assert results[0]["task"]["completed_by"] == "otter"
+    assert [tuple(fetch_task(app_module, task_id))[3:5] for task_id in ids] == [
+        (1, "otter"), (1, "otter"), (1, "beaver")]
+
+
+def test_bulk_reassign(app_module, client):
+    ids = create_ids(client, 3, assigned_to="otter")
+    client.post("/api/tasks/bulk/complete", json={"username": "otter", "task_ids": [ids[2]]})
+    response = client.post("/api/tasks/bulk/reassign", json={"assignments": [
+        {"id": ids[0], "assigned_to": "beaver"},
+        {"id": ids[1], "assigned_to": ""},
+        {"id": ids[2], "assigned_to": "beaver"},
+        "not an object",
+        {"id": None, "assigned_to": "beaver"},
+    ]})
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert statuses(results) == [(0, 200), (1, 200), (2, 409), (3, 400), (4, 400)]
+    assert [fetch_task(app_module, task_id)[2] for task_id in ids] == ["beaver", None, "otter"]
+
+
+def test_bulk_requests_are_validated(app_module, client):
+    assert client.post("/api/tasks/bulk", json={"tasks": []}).status_code == 400
+    assert client.post("/api/tasks/bulk/complete", json={"task_ids": [1]}).status_code == 400
+    assert client.post("/api/tasks/bulk/reassign", json={"assignments": {"id": 1}}).status_code == 400
+    too_many = [{"id": i, "assigned_to": "otter"} for i in range(app_module.BULK_MAX_ITEMS + 1)]
+    response = client.post("/api/tasks/bulk/reassign", json={"assignments": too_many})
+    assert response.status_code == 400
+    assert response.json["error"] == f"At most {app_module.BULK_MAX_ITEMS} items per request"
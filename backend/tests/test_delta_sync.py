@@ -0,0 +1,122 @@
+# test_delta_sync.py
+#
+# Delta sync (?updated_since=) must not lose rows whose updated_at equals the
+# newest one the client has already seen. updated_at has millisecond
+# precision, so with several writers such ties are common. Tasks that left
+# the list (deleted, moved to another group) come back as "removed" ids.
+
+GROUP = "delta-test"
+TIED = "2026-03-01T08:00:00.000"
+
+
+def insert_tasks(app_module, titles, updated_at, completed=0):
+    with app_module.db_pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO tasks (title, creation_date, due_date, completed, group_id, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(title, "2026-03-01T00:00:00", "2026-03-02T00:00:00", completed, GROUP, updated_at) for title in titles])
+        conn.commit()
+
+
+def follow_delta(client, path, token, limit=2, removed=None, group_id=GROUP):
+    # Pulls every delta page for token; returns (titles, next sync token).
+    # Removed task ids are appended to removed if given.
+    titles = []
+    response = client.get(f"{path}?group_id={group_id}&updated_since={token}&limit={limit}")
+    while True:
+        assert response.status_code == 200
+        titles += [task["title"] for task in response.json["tasks"]]
+        if removed is not None:
+            removed += response.json["removed"]
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            return titles, response.headers["X-Sync-Token"]
+        response = client.get(f"{path}?group_id={group_id}&cursor={next_cursor}&limit={limit}")
+
+
+def test_rows_tied_with_the_sync_token_are_delivered(app_module, client):
+    insert_tasks(app_module, ["a1", "a2", "a3"], TIED)
+    full = client.get(f"/api/tasks?group_id={GROUP}")
+    assert [t["title"] for t in full.json] == ["a1", "a2", "a3"]
+    token = full.headers["X-Sync-Token"]
+
+    # Committed after the client read its token, in the same millisecond.
+    insert_tasks(app_module, ["b1", "b2", "b3"], TIED)
+    titles, token = follow_delta(client, "/api/tasks", token)
+    assert titles == ["b1", "b2", "b3"]
+
+    titles, same_token = follow_delta(client, "/api/tasks", token)
+    assert titles == []
+    assert same_token == token
+
+    insert_tasks(app_module, ["c1"], TIED)
+    assert follow_delta(client, "/api/tasks", token)[0] == ["c1"]
+
+
+def test_delta_pages_split_inside_a_tie(app_module, client):
+    insert_tasks(app_module, [f"h{i}" for i in range(5)], "2026-03-02T08:00:00.000", completed=1)
+    full = client.get(f"/api/history?group_id={GROUP}&limit=2")
+    token = full.headers["X-Sync-Token"]
+    insert_tasks(app_module, [f"t{i}" for i in range(5)], "2026-03-02T08:00:00.000", completed=1)
+    titles, _ = follow_delta(client, "/api/history", token, limit=2)
+    assert titles == [f"t{i}" for i in range(5)]
+
+
+def test_plain_timestamp_includes_rows_at_that_timestamp(app_module, client):
+    insert_tasks(app_module, ["p1", "p2"], "2026-03-03T08:00:00.000")
+    titles, _ = follow_delta(client, "/api/tasks", "2026-03-03T08:00:00.000")
+    assert titles == ["p1", "p2"]
+
+
+def test_invalid_sync_token_is_rejected(client):
+    assert client.get(f"/api/tasks?group_id={GROUP}&updated_since=not-a-token").status_code == 400
+
+
+def task_ids(app_module, titles):
+    with app_module.db_pool.connection() as conn:
+        placeholders = ",".join("?" * len(titles))
+        return dict(conn.execute(f"SELECT title, id FROM tasks WHERE title IN ({placeholders})", titles).fetchall())
+
+
+def test_deleted_tasks_are_reported_once(app_module, client):
+    group = "delta-delete"
+    with app_module.db_pool.connection() as conn:
+        conn.executemany("INSERT INTO tasks (title, creation_date, due_date, group_id) VALUES (?, '2026-03-04', '2026-03-05', ?)",
+                         [(f"d{i}", group) for i in range(4)])
+        conn.commit()
+    ids = task_ids(app_module, [f"d{i}" for i in range(4)])
+    token = client.get(f"/api/tasks?group_id={group}").headers["X-Sync-Token"]
+
+    assert client.delete(f"/api/tasks/{ids['d1']}").status_code == 200
+    assert client.delete(f"/api/tasks/{ids['d2']}").status_code == 200
+    client.post(f"/api/tasks/{ids['d3']}/join", json={"username": "otter"})
+    removed = []
+    titles, token = follow_delta(client, "/api/tasks", token, limit=1, removed=removed, group_id=group)
+    # Pages of one: every tombstone and the updated row each get a page.
+    assert (titles, sorted(removed)) == (["d3"], sorted([ids["d1"], ids["d2"]]))
+
+    removed = []
+    assert follow_delta(client, "/api/tasks", token, removed=removed, group_id=group)[0] == []
+    assert removed == []
+
+
+def test_a_task_moved_to_another_group_is_removed_from_the_old_one(app_module, client):
+    with app_module.db_pool.connection() as conn:
+        task_id = conn.execute("INSERT INTO tasks (title, creation_date, due_date, group_id) "
+                               "VALUES ('mover', '2026-03-04', '2026-03-05', 'delta-from')").lastrowid
+        conn.commit()
+    token = client.get("/api/tasks?group_id=delta-from").headers["X-Sync-Token"]
+    with app_module.db_pool.connection() as conn:
+        conn.execute("UPDATE tasks SET group_id = 'delta-to' WHERE id = ?", (task_id,))
+        conn.commit()
+    removed = []
+    assert follow_delta(client, "/api/tasks", token, removed=removed, group_id="delta-from")[0] == []
+    assert removed == [task_id]
+
+
+def test_columns_shape_delta_carries_removed(app_module, client):
+    insert_tasks(app_module, ["col1"], "2026-03-06T08:00:00.000")
+    [task_id] = task_ids(app_module, ["col1"]).values()
+    assert client.delete(f"/api/tasks/{task_id}").status_code == 200
+    body = client.get(f"/api/tasks?group_id={GROUP}&updated_since=2026-03-06T08:00:00.000&shape=columns").json
+    assert body["rows"] == []
+    assert body["removed"] == [task_id]
@@ -0,0 +1,87 @@
+# test_exports.py
+
+import csv
+import io
+import json
+
+from exports import HISTORY_EXPORT_COLUMNS, stream_csv, stream_group_archive
+
+GROUP = "export-test"
+
+
+def seed_history(app_module, count):
+    with app_module.db_pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO tasks (title, creation_date, due_date, completed, completed_on, group_id) VALUES (?, ?, ?, 1, ?, ?)",
+            [(f"done {i}", "2026-02-01T00:00:00", "2026-02-02T00:00:00", "2026-02-01T12:00:00", GROUP)
+             for i in range(count)])
+        conn.commit()
+
+
+def test_csv_export_reads_in_chunks_without_holding_a_connection(app_module):
+    seed_history(app_module, 25)
+    pool = app_module.export_pool
+    chunks = stream_csv(pool.connection, ["id", "title"], "tasks_all WHERE completed = 1 AND group_id=?", [GROUP],
+                        batch_size=4)
+    body = ""
+    for chunk in chunks:
+        # Between chunks the export holds neither a connection nor a snapshot.
+        assert pool.stats()["in_use"] == 0
+        body += chunk.decode("utf-8")
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == ["id", "title"]
+    titles = [row[1] for row in rows[1:]]
+    assert titles == [f"done {i}" for i in range(25)]
+
+
+def test_history_export_route_uses_the_export_pool(app_module, client):
+    seed_history(app_module, 3)
+    api_checkouts = app_module.db_pool.stats()["checkouts"]
+    export_checkouts = app_module.export_pool.stats()["checkouts"]
+    response = client.get(f"/export_history_csv?group_id={GROUP}&columns=title")
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).splitlines()[0] == "title"
+    assert app_module.export_pool.stats()["checkouts"] > export_checkouts
+    assert app_module.db_pool.stats()["checkouts"] == api_checkouts
+
+
+def test_group_archive_merges_sections_across_chunks(app_module):
+    with app_module.db_pool.connection() as conn:
+        group_ids = []
+        for name in ("export a", "export b"):
+            group_ids.append(str(conn.execute("INSERT INTO groups (name) VALUES (?)", (name,)).lastrowid))
+            conn.execute("INSERT INTO user_groups (username, group_id, role) VALUES ('exporter', ?, 'admin')",
+                         (group_ids[-1],))
+        for gid in group_ids:
+            conn.executemany("INSERT INTO tasks (title, creation_date, due_date, group_id) VALUES (?, '2026-01-01', '2026-01-02', ?)",
+                             [(f"{gid}-{i}", gid) for i in range(7)])
+            project_id = conn.execute("INSERT INTO projects (name, description, created_by, creation_date, group_id) "
+                                      "VALUES ('p', '', 'exporter', '2026-01-01', ?)", (gid,)).lastrowid
+            conn.executemany("INSERT INTO project_todos (project_id, title) VALUES (?, ?)",
+                             [(project_id, f"todo {i}") for i in range(5)])
+        conn.commit()
+    archive = json.loads(b"".join(stream_group_archive(app_module.export_pool.connection, "exporter", batch_size=2)))
+    assert sorted(archive["data"]) == sorted(group_ids)
+    for gid in group_ids:
+        assert [t["title"] for t in archive["data"][gid]["tasks"]] == [f"{gid}-{i}" for i in range(7)]
+        assert len(archive["data"][gid]["project_todos"]) == 5
+
+
+def test_group_archive_with_duplicate_and_dangling_memberships(app_module):
+    with app_module.db_pool.connection() as conn:
+        group_ids = [str(conn.execute("INSERT INTO groups (name) VALUES (?)", (name,)).lastrowid)
+                     for name in ("member twice", "member once")]
+        # A membership without a groups row sorts before both real groups.
+        dangling = "0"
+        conn.executemany("INSERT INTO user_groups (username, group_id, role) VALUES ('duplicate', ?, ?)",
+                         [(group_ids[0], "user"), (group_ids[0], "admin"), (dangling, "user"), (group_ids[1], "user")])
+        for gid in group_ids + [dangling]:
+            conn.executemany("INSERT INTO tasks (title, creation_date, due_date, group_id) VALUES (?, '2026-01-01', '2026-01-02', ?)",
+                             [(f"{gid}-{i}", gid) for i in range(3)])
+        conn.commit()
+    archive = json.loads(b"".join(stream_group_archive(app_module.export_pool.connection, "duplicate", batch_size=2)))
+    assert sorted(archive["data"]) == sorted(group_ids + [dangling])
+    assert [g["id"] for g in archive["groups"]].count(int(group_ids[0])) == 1
+    assert {g["role"] for g in archive["groups"] if str(g["id"]) == group_ids[0]} == {"admin"}
+    for gid in group_ids + [dangling]:
+        assert [t["title"] for t in archive["data"][gid]["tasks"]] == [f"{gid}-{i}" for i in range(3)]
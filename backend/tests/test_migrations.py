@@ -0,0 +1,28 @@
+# test_migrations.py
+
+from migrations import SCHEMA_VERSION, get_schema_version
+
+
+def test_schema_is_current(app_module):
+    with app_module.db_pool.connection() as conn:
+        assert get_schema_version(conn) == SCHEMA_VERSION
+
+
+def test_stats_triggers_accept_completed_tasks_without_dates(app_module):
+    # Migration 5: the rollup triggers must not fail on NULL completed_on /
+    # due_date (e.g. imported tasks).
+    with app_module.db_pool.connection() as conn:
+        conn.execute("INSERT INTO tasks (title, completed, completed_by, group_id) VALUES ('imported', 1, 'otter', 'migr')")
+        task_id = conn.execute("INSERT INTO tasks (title, group_id) VALUES ('open', 'migr')").lastrowid
+        conn.execute("UPDATE tasks SET completed = 1, completed_by = 'otter' WHERE id = ?", (task_id,))
+        conn.execute("UPDATE tasks SET completed = 0 WHERE id = ?", (task_id,))
+        conn.commit()
+        row = conn.execute("SELECT completed, overdue FROM stats_daily WHERE group_id = 'migr' AND username = 'otter'").fetchone()
+    assert (row["completed"], row["overdue"]) == (1, 0)
+
+
+def test_device_token_pruning_uses_index(app_module):
+    # Migration 7: push.py deletes invalid tokens by token alone.
+    with app_module.db_pool.connection() as conn:
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN DELETE FROM device_tokens WHERE token=?", ("t",))]
+    assert any("USING INDEX idx_device_tokens_token" in detail for detail in plan), plan
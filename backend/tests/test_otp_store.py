@@ -0,0 +1,103 @@
+# test_otp_store.py
+#
+# Both OTP stores must behave the same: codes expire after ttl, are discarded
+# after max_attempts wrong guesses, and a phone gets at most rate_limit codes
+# per rate_window, whether or not it verified them.
+
+import itertools
+
+import pytest
+
+import otp_store
+from otp_store import (MemoryOtpStore, OtpRateLimited, SqliteOtpStore, VERIFY_EXPIRED, VERIFY_LOCKED,
+                       VERIFY_MISMATCH, VERIFY_MISSING, VERIFY_OK)
+
+_phones = itertools.count()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(otp_store, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, app_module, clock):
+    options = dict(ttl=300, rate_limit=3, rate_window=900, max_attempts=3)
+    if request.param == "memory":
+        return MemoryOtpStore(**options)
+    return SqliteOtpStore(app_module.db_pool.connection, **options)
+
+
+@pytest.fixture
+def phone():
+    # The sqlite store shares the test database; every test gets its own number.
+    return f"+4366{next(_phones):08d}"
+
+
+def test_code_verifies_once(store, phone):
+    store.put(phone, "123456")
+    assert store.verify(phone, "123456") == VERIFY_OK
+    assert store.verify(phone, "123456") == VERIFY_MISSING
+    assert store.verify(phone + "0", "123456") == VERIFY_MISSING
+
+
+def test_code_expires_after_ttl(store, clock, phone):
+    store.put(phone, "123456")
+    clock.now += 299
+    store.put(phone, "654321")  # a new code restarts the ttl
+    clock.now += 299
+    assert store.verify(phone, "654321") == VERIFY_OK
+    store.put(phone, "111111")
+    clock.now += 300
+    assert store.verify(phone, "111111") == VERIFY_EXPIRED
+    assert store.verify(phone, "111111") == VERIFY_MISSING
+
+
+def test_wrong_guesses_lock_the_code(store, phone):
+    store.put(phone, "123456")
+    assert store.verify(phone, "000000") == VERIFY_MISMATCH
+    assert store.verify(phone, "000001") == VERIFY_MISMATCH
+    assert store.verify(phone, "000002") == VERIFY_LOCKED
+    # The code is gone, even the right one no longer works.
+    assert store.verify(phone, "123456") == VERIFY_MISSING
+    # A new code starts with a clean attempt count.
+    store.put(phone, "222222")
+    assert store.verify(phone, "000000") == VERIFY_MISMATCH
+    assert store.verify(phone, "222222") == VERIFY_OK
+
+
+def test_rate_window(store, clock, phone):
+    for code in ("1", "2", "3"):
+        store.put(phone, code)
+        assert store.verify(phone, code) == VERIFY_OK
+        clock.now += 100
+    with pytest.raises(OtpRateLimited) as raised:
+        store.put(phone, "4")
+    assert raised.value.retry_after == pytest.approx(600)
+    # Sweeping must not drop the entry while its window is open.
+    store.sweep()
+    with pytest.raises(OtpRateLimited):
+        store.put(phone, "4")
+    assert store.stats()["rate_limited"] == 2
+    clock.now += 600
+    store.put(phone, "4")
+    assert store.verify(phone, "4") == VERIFY_OK
+
+
+def test_sweep_drops_entries_once_code_and_window_are_over(store, clock, phone):
+    store.put(phone, "123456")
+    clock.now += 300
+    assert store.sweep() == 0  # expired, but the rate window is still open
+    clock.now += 600
+    assert store.sweep() >= 1
+    assert store.verify(phone, "123456") == VERIFY_MISSING
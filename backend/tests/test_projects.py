@@ -0,0 +1,39 @@
+# test_projects.py
+
+GROUP = "projects-test"
+
+
+def test_projects_nest_todos_and_assignments_across_chunks(app_module, client):
+    # More projects than fit in one IN (...) chunk.
+    with app_module.db_pool.connection() as conn:
+        conn.executemany("INSERT INTO projects (name, description, created_by, creation_date, group_id) VALUES (?, '', 'otter', '2026-01-01', ?)",
+                         [(f"p{i}", GROUP) for i in range(620)])
+        ids = [row[0] for row in conn.execute("SELECT id FROM projects WHERE group_id=? ORDER BY id", (GROUP,))]
+        conn.executemany("INSERT INTO project_todos (project_id, title, completed) VALUES (?, ?, ?)",
+                         [(pid, f"todo {pid}", pid % 2) for pid in ids])
+        conn.executemany("INSERT INTO project_assignments (project_id, username) VALUES (?, 'otter')", [(pid,) for pid in ids])
+        conn.commit()
+    projects = client.get(f"/api/projects?group_id={GROUP}").json
+    assert len(projects) == 620
+    for project in projects:
+        assert [t["title"] for t in project["todos"]] == [f"todo {project['id']}"]
+        assert project["assignments"] == ["otter"]
+    open_only = client.get(f"/api/projects?group_id={GROUP}&completed=0&include=todos").json
+    assert all(t["completed"] == 0 for p in open_only for t in p["todos"])
+    assert sum(len(p["todos"]) for p in open_only) == len([i for i in ids if i % 2 == 0])
+    assert "assignments" not in open_only[0]
+
+
+def test_single_project_and_todo_payloads_match_the_list(client):
+    # Create, convert and list all serialize through serialize.py.
+    project = client.post("/api/projects", json={"name": "payloads", "group_id": "payloads-test",
+                                                 "created_by": "otter"}).json
+    todo = client.post(f"/api/projects/{project['id']}/todos", json={"title": "first", "points": 3}).json
+    converted = client.post(f"/api/projects/{project['id']}/todos/{todo['id']}/convert",
+                            json={"assigned_to": "otter", "duration_hours": 2, "points": 5}).json
+    [listed] = client.get("/api/projects?group_id=payloads-test").json
+    assert {k: v for k, v in listed.items() if k != "todos"} == project
+    [listed_todo] = listed["todos"]
+    assert converted == dict(listed_todo, project_id=project["id"])
+    assert todo["project_id"] == project["id"] and todo["points"] == 3
+    assert (converted["is_task"], converted["assigned_to"], converted["points"]) == (1, "otter", 5)
@@ -0,0 +1,110 @@
+# test_push.py
+#
+# PushNotifier against StubSender: the batching and pruning the FCM fan-out
+# depends on, without talking to FCM.
+
+import itertools
+import time
+
+import pytest
+
+from push import FCM_MAX_TOKENS, PushNotifier, StubSender
+
+
+_names = itertools.count()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def make_group(app_module):
+    # Creates a group whose members have the given number of device tokens
+    # each. Returns (group_id, {username: [token, ...]}).
+    def make(tokens_per_user):
+        with app_module.db_pool.connection() as conn:
+            group_id = conn.execute("INSERT INTO groups (name) VALUES (?)", (f"push {next(_names)}",)).lastrowid
+            tokens = {}
+            for username, count in tokens_per_user.items():
+                username = f"{username}-{group_id}"
+                conn.execute("INSERT INTO user_groups (username, group_id, role) VALUES (?, ?, 'user')",
+                             (username, group_id))
+                tokens[username] = [f"tok-{group_id}-{username}-{i}" for i in range(count)]
+                conn.executemany("INSERT INTO device_tokens (username, token) VALUES (?, ?)",
+                                 [(username, t) for t in tokens[username]])
+            conn.commit()
+        return str(group_id), tokens
+    return make
+
+
+@pytest.fixture
+def notifier(app_module):
+    created = []
+
+    def make(sender, window=0.05):
+        notifier = PushNotifier(app_module.db_pool.connection, sender, window=window)
+        created.append(notifier)
+        return notifier
+    yield make
+    for notifier in created:
+        notifier.stop()
+
+
+def task(group_id, task_id, title):
+    return {"id": task_id, "title": title, "group_id": group_id}
+
+
+def test_events_within_the_window_become_one_notification(make_group, notifier):
+    group_id, tokens = make_group({"a": 1, "b": 1})
+    sender = StubSender()
+    push = notifier(sender, window=0.3)
+    for i in range(3):
+        push.publish("task_created", task(group_id, i, f"task {i}"))
+    wait_for(lambda: push.stats()["flushes"] >= 1)
+    assert len(sender.calls) == 1
+    call = sender.calls[0]
+    assert call["title"] == "3 task updates"
+    assert call["data"]["task_ids"] == "0,1,2"
+    assert sorted(call["tokens"]) == sorted(t for ts in tokens.values() for t in ts)
+
+
+def test_large_groups_are_sent_in_chunks_of_500(make_group, notifier):
+    group_id, tokens = make_group({"a": 700, "b": 500})
+    sender = StubSender()
+    push = notifier(sender)
+    push.publish("task_created", task(group_id, 1, "big group"))
+    wait_for(lambda: push.stats()["flushes"] >= 1)
+    assert sorted(len(call["tokens"]) for call in sender.calls) == [200, FCM_MAX_TOKENS, FCM_MAX_TOKENS]
+    assert push.stats()["delivered"] == 1200
+
+
+def test_the_actor_gets_no_push_about_their_own_change(make_group, notifier):
+    group_id, tokens = make_group({"actor": 2, "other": 1})
+    actor, other = sorted(tokens)
+    sender = StubSender()
+    push = notifier(sender)
+    push.publish("task_finished", task(group_id, 1, "done"), actor=actor)
+    wait_for(lambda: push.stats()["flushes"] >= 1)
+    [call] = sender.calls
+    assert call["tokens"] == tokens[other]
+    assert call["body"] == f"{actor} finished: done"
+
+
+def test_invalid_tokens_are_pruned_in_bulk(app_module, make_group, notifier):
+    group_id, tokens = make_group({"a": 3, "b": 3})
+    all_tokens = [t for ts in tokens.values() for t in ts]
+    invalid = all_tokens[::2]
+    sender = StubSender(invalid_tokens=invalid)
+    push = notifier(sender)
+    push.publish("task_created", task(group_id, 1, "prune"))
+    wait_for(lambda: push.stats()["flushes"] >= 1)
+    assert push.stats()["pruned"] == len(invalid)
+    with app_module.db_pool.connection() as conn:
+        placeholders = ",".join("?" * len(all_tokens))
+        left = {row[0] for row in conn.execute(f"SELECT token FROM device_tokens WHERE token IN ({placeholders})",
+                                               all_tokens)}
+    assert left == set(all_tokens) - set(invalid)
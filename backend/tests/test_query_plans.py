@@ -0,0 +1,147 @@
+# test_query_plans.py
+#
+# The hot endpoints must be served by the indexes from migrations 2 and 3, not
+# by table scans. Every statement an endpoint runs is recorded (with its
+# parameters inlined by the trace callback) and run again under EXPLAIN QUERY
+# PLAN.
+
+import re
+import threading
+
+import pytest
+
+GROUP = "plans"
+USER = "plan-user"
+
+
+class StatementRecorder:
+    # Wraps ConnectionPool.acquire() so that every connection handed out
+    # reports its statements while recording is switched on.
+    def __init__(self, pool, monkeypatch):
+        self.statements = []
+        self.active = False
+        self._lock = threading.Lock()
+        original_acquire = pool.acquire
+
+        def acquire():
+            conn = original_acquire()
+            conn.set_trace_callback(self._trace)
+            return conn
+
+        monkeypatch.setattr(pool, "acquire", acquire)
+
+    def _trace(self, statement):
+        if self.active and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            with self._lock:
+                self.statements.append(statement)
+
+    def record(self, fn):
+        self.statements = []
+        self.active = True
+        try:
+            fn()
+        finally:
+            self.active = False
+        return list(self.statements)
+
+
+@pytest.fixture(scope="module")
+def seeded(app_module):
+    with app_module.db_pool.connection() as conn:
+        cursor = conn.execute("INSERT INTO groups (name) VALUES (?)", ("query plans",))
+        group_id = cursor.lastrowid
+        conn.execute("INSERT INTO user_groups (username, group_id, role) VALUES (?, ?, 'admin')", (USER, group_id))
+        conn.executemany(
+            "INSERT INTO tasks (title, creation_date, due_date, completed, completed_on, group_id) VALUES (?, ?, ?, ?, ?, ?)",
+            [(f"task {i}", "2026-01-01T00:00:00", "2026-01-02T00:00:00", i % 2,
+              "2026-01-01T12:00:00" if i % 2 else None, gid)
+             for i in range(200) for gid in (GROUP, str(group_id))])
+        for i in range(20):
+            project_id = conn.execute("INSERT INTO projects (name, description, created_by, creation_date, group_id) "
+                                      "VALUES (?, '', ?, '2026-01-01', ?)", (f"plan project {i}", USER, GROUP)).lastrowid
+            conn.executemany("INSERT INTO project_todos (project_id, title) VALUES (?, ?)",
+                             [(project_id, f"todo {j}") for j in range(5)])
+            conn.execute("INSERT INTO project_assignments (project_id, username) VALUES (?, ?)", (project_id, USER))
+        conn.executemany("INSERT INTO sops (title, content, version, published_date, effective_date, group_id) "
+                         "VALUES (?, '', '1', '2026-01-01', '2026-01-01', ?)",
+                         [(f"sop {i}", gid) for i in range(20) for gid in (GROUP, "other plans")])
+        conn.executemany("INSERT INTO device_tokens (username, token) VALUES (?, ?)",
+                         [(f"device-user-{i}", f"device-token-{i}") for i in range(50)])
+        conn.execute("INSERT OR IGNORE INTO permissions (name) VALUES ('manage_sops')")
+        conn.execute("INSERT INTO group_permissions (group_id, permission_id) "
+                     "SELECT ?, id FROM permissions WHERE name = 'manage_sops'", (group_id,))
+        conn.commit()
+    return group_id
+
+
+@pytest.fixture
+def recorder(app_module, monkeypatch):
+    return StatementRecorder(app_module.db_pool, monkeypatch)
+
+
+def plan_of(app_module, statement):
+    with app_module.db_pool.connection() as conn:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statement).fetchall()]
+
+
+def assert_uses_indexes(app_module, statements, tables):
+    # Each of the tables (name or "name|alias") must be read through an index
+    # at least once, and none of them may be scanned, not even a covering index.
+    plans = [detail for statement in statements for detail in plan_of(app_module, statement)]
+    for table in tables:
+        scans = [d for d in plans if re.match(rf"SCAN ({table})\b", d)]
+        assert not scans, f"full scan of {table}: {scans}"
+        searches = [d for d in plans if re.match(rf"SEARCH ({table})\b.*USING (COVERING )?INDEX", d)]
+        assert searches, f"no index used for {table}: {plans}"
+
+
+def test_task_list_uses_index(app_module, client, seeded, recorder):
+    statements = recorder.record(lambda: client.get(f"/api/tasks?group_id={GROUP}&limit=50"))
+    assert statements
+    assert_uses_indexes(app_module, statements, ["tasks"])
+
+
+def test_task_delta_uses_index(app_module, client, seeded, recorder):
+    statements = recorder.record(
+        lambda: client.get(f"/api/tasks?group_id={GROUP}&updated_since=2000-01-01T00:00:00&limit=50"))
+    assert_uses_indexes(app_module, statements, ["tasks", "deleted_tasks|d"])
+
+
+def test_history_uses_indexes(app_module, client, seeded, recorder):
+    statements = recorder.record(lambda: client.get(f"/api/history?group_id={GROUP}&limit=50"))
+    assert_uses_indexes(app_module, statements, ["tasks", "tasks_archive"])
+
+
+def test_user_groups_uses_indexes(app_module, client, seeded, recorder):
+    statements = recorder.record(lambda: client.get(f"/api/users/{USER}/groups"))
+    assert_uses_indexes(app_module, statements, ["user_groups|ug", "tasks"])
+
+
+def test_group_members_uses_index(app_module, client, seeded, recorder):
+    statements = recorder.record(lambda: client.get(f"/api/groups/{seeded}/members"))
+    assert_uses_indexes(app_module, statements, ["user_groups|ug"])
+
+
+def test_projects_use_indexes(app_module, client, seeded, recorder):
+    statements = recorder.record(lambda: client.get(f"/api/projects?group_id={GROUP}"))
+    assert_uses_indexes(app_module, statements, ["projects", "project_todos", "project_assignments"])
+
+
+def test_register_token_uses_index(app_module, client, seeded, recorder):
+    statements = recorder.record(
+        lambda: client.post("/api/register_token", json={"username": USER, "token": "device-token-7"}))
+    assert_uses_indexes(app_module, statements, ["device_tokens"])
+
+
+def test_sops_use_index(app_module, client, seeded, recorder):
+    with client.session_transaction() as session:
+        session["username"] = USER
+    response = None
+
+    def get_sops():
+        nonlocal response
+        response = client.get(f"/api/sops?group_id={GROUP}")
+    statements = recorder.record(get_sops)
+    assert response.status_code == 200
+    assert len(response.json) == 20
+    assert_uses_indexes(app_module, statements, ["sops"])
@@ -0,0 +1,95 @@
+# test_scheduler.py
+#
+# The recurring scheduler keeps the live head of every series in a heap. A
+# tick spawns the next occurrence of a completed head, resets an open one in
+# place, and skips every period that was missed while nobody was ticking.
+
+from datetime import datetime
+
+from scheduler import RecurringTaskScheduler
+
+GROUP = "scheduler-test"
+DUE = "2002-01-01T08:00:00"
+
+
+def insert_task(app_module, title, due_date=DUE, recurring=1, frequency_hours=24, completed=0,
+                assigned_to=None, always_assigned=0, next_occurrence_id=None):
+    with app_module.db_pool.connection() as conn:
+        task_id = conn.execute(
+            "INSERT INTO tasks (title, assigned_to, creation_date, due_date, completed, recurring, group_id, "
+            "frequency_hours, always_assigned, next_occurrence_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (title, assigned_to, "2001-12-31T08:00:00", due_date, completed, recurring, GROUP,
+             frequency_hours, always_assigned, next_occurrence_id)).lastrowid
+        conn.commit()
+    return task_id
+
+
+def fetch_task(app_module, task_id):
+    with app_module.db_pool.connection() as conn:
+        row = conn.execute("SELECT title, assigned_to, creation_date, due_date, completed, next_occurrence_id "
+                           "FROM tasks WHERE id = ?", (task_id,)).fetchone()
+    return dict(zip(("title", "assigned_to", "creation_date", "due_date", "completed", "next_occurrence_id"), row))
+
+
+def test_rebuild_schedules_only_live_series_heads(app_module):
+    head = insert_task(app_module, "head")
+    superseded = insert_task(app_module, "superseded", next_occurrence_id=head)
+    one_off = insert_task(app_module, "one-off", recurring=0)
+    no_period = insert_task(app_module, "no period", frequency_hours=0)
+    no_due = insert_task(app_module, "no due date", due_date=None)
+
+    scheduler = RecurringTaskScheduler(app_module.db_pool.connection)
+    scheduler.rebuild()
+    assert scheduler._scheduled[head] == datetime.fromisoformat(DUE)
+    for task_id in (superseded, one_off, no_period, no_due):
+        assert task_id not in scheduler._scheduled
+    assert scheduler.stats()["scheduled"] == scheduler.stats()["heap_size"]
+
+
+def test_tick_spawns_completed_and_resets_open_heads(app_module):
+    done = insert_task(app_module, "done", completed=1, assigned_to="otter")
+    kept = insert_task(app_module, "done, always assigned", completed=1, assigned_to="otter", always_assigned=1)
+    open_ = insert_task(app_module, "open", assigned_to="otter")
+    changes = []
+    scheduler = RecurringTaskScheduler(app_module.db_pool.connection, listener=changes.extend)
+    for task_id in (done, kept, open_):
+        scheduler.schedule(task_id, DUE)
+
+    # Two and a half periods late: the missed occurrences are skipped.
+    now = datetime(2002, 1, 3, 20, 0)
+    assert scheduler.tick(now=now) == 3
+    next_due = "2002-01-04T08:00:00"
+
+    spawned = fetch_task(app_module, done)["next_occurrence_id"]
+    assert fetch_task(app_module, spawned) == {
+        "title": "done", "assigned_to": None, "creation_date": now.isoformat(), "due_date": next_due,
+        "completed": 0, "next_occurrence_id": None}
+    spawned_kept = fetch_task(app_module, kept)["next_occurrence_id"]
+    assert fetch_task(app_module, spawned_kept)["assigned_to"] == "otter"
+    assert fetch_task(app_module, open_) == {
+        "title": "open", "assigned_to": None, "creation_date": now.isoformat(), "due_date": next_due,
+        "completed": 0, "next_occurrence_id": None}
+
+    assert {(op, task_id) for _, op, task_id, _ in changes} == {
+        ("create", spawned), ("update", done), ("create", spawned_kept), ("update", kept), ("update", open_)}
+    stats = scheduler.stats()
+    assert (stats["spawned"], stats["reset"]) == (2, 1)
+    # The new heads are scheduled for the next period, nothing else is due.
+    assert scheduler._scheduled == {task_id: datetime.fromisoformat(next_due)
+                                    for task_id in (spawned, spawned_kept, open_)}
+    assert scheduler.tick(now=now) == 0
+
+
+def test_rescheduled_and_unscheduled_entries_are_skipped(app_module):
+    moved = insert_task(app_module, "moved")
+    dropped = insert_task(app_module, "dropped")
+    scheduler = RecurringTaskScheduler(app_module.db_pool.connection)
+    scheduler.schedule(moved, DUE)
+    scheduler.schedule(dropped, DUE)
+    scheduler.schedule(moved, "2002-02-01T08:00:00")
+    scheduler.unschedule(dropped)
+
+    assert scheduler.tick(now=datetime(2002, 1, 2)) == 0
+    assert scheduler.stats()["stale"] == 2
+    assert fetch_task(app_module, moved)["due_date"] == DUE
+    assert fetch_task(app_module, dropped)["due_date"] == DUE
@@ -0,0 +1,43 @@
+# test_search.py
+
+GROUP = "search-test"
+
+
+def add_task(app_module, title, group_id=GROUP):
+    with app_module.db_pool.connection() as conn:
+        conn.execute("INSERT INTO tasks (title, creation_date, due_date, group_id) VALUES (?, '2026-01-01', '2026-01-02', ?)",
+                     (title, group_id))
+        conn.commit()
+
+
+def search(client, q, group_id=GROUP):
+    response = client.get("/api/search", query_string={"q": q, "group_id": group_id})
+    assert response.status_code == 200
+    return response.get_json()["results"]
+
+
+def test_highlights_escape_user_html(app_module, client):
+    add_task(app_module, '<img src=x onerror="alert(1)"> kellerfenster & <mark>tür</mark>')
+    [hit] = search(client, "kellerfenster")
+    assert hit["title"] == ('&lt;img src=x onerror="alert(1)"&gt; <mark>kellerfenster</mark> &amp; '
+                            '&lt;mark&gt;tür&lt;/mark&gt;')
+
+
+def test_search_stays_in_the_exact_group(app_module, client):
+    # Tokenized, group 'a"b c' contains the token of group "c".
+    add_task(app_module, "dachrinne reinigen", group_id='a"b c')
+    add_task(app_module, "dachrinne prüfen", group_id="c")
+    assert [hit["title"] for hit in search(client, "dachrinne", group_id="c")] == ["<mark>dachrinne</mark> prüfen"]
+    assert [hit["group_id"] for hit in search(client, "dachrinne", group_id='a"b c')] == ['a"b c']
+    assert search(client, "dachrinne", group_id="b") == []
+
+
+def test_todos_follow_their_project_to_another_group(app_module, client):
+    with app_module.db_pool.connection() as conn:
+        project_id = conn.execute("INSERT INTO projects (name, description, created_by, creation_date, group_id) "
+                                  "VALUES ('p', '', 'otter', '2026-01-01', 'old group')").lastrowid
+        conn.execute("INSERT INTO project_todos (project_id, title) VALUES (?, 'regenfass leeren')", (project_id,))
+        conn.execute("UPDATE projects SET group_id = 'new group' WHERE id = ?", (project_id,))
+        conn.commit()
+    assert search(client, "regenfass", group_id="old group") == []
+    assert [hit["kind"] for hit in search(client, "regenfass", group_id="new group")] == ["todo"]
@@ -0,0 +1,70 @@
+# test_sms_queue.py
+
+import time
+
+from sms_queue import FakeSmsTransport, PermanentSendError, SmsQueue
+
+
+class FlakyTransport(FakeSmsTransport):
+    # Fails the first `failures` sends, then delivers. Records when each
+    # attempt was made.
+    def __init__(self, failures, error=ConnectionError):
+        super().__init__()
+        self.failures = failures
+        self.error = error
+        self.attempts = []
+
+    def send(self, to, body):
+        self.attempts.append(time.monotonic())
+        if len(self.attempts) <= self.failures:
+            raise self.error("send failed")
+        return super().send(to, body)
+
+
+def run(queue, *messages):
+    try:
+        for to, body in messages:
+            assert queue.submit(to, body)
+        assert queue.drain(timeout=5.0)
+        return queue.stats()
+    finally:
+        queue.stop()
+
+
+def test_messages_are_delivered_by_the_workers():
+    transport = FakeSmsTransport()
+    stats = run(SmsQueue(transport, workers=2), *[(f"+4100000000{i}", f"code {i}") for i in range(5)])
+    assert stats["sent"] == 5
+    assert sorted(body for _, _, body in transport.sent) == [f"code {i}" for i in range(5)]
+
+
+def test_failed_sends_are_retried_with_exponential_backoff():
+    transport = FlakyTransport(failures=3)
+    stats = run(SmsQueue(transport, workers=1, backoff_base=0.05), ("+41000000001", "code"))
+    assert (stats["sent"], stats["retries"], stats["failed"]) == (1, 3, 0)
+    gaps = [b - a for a, b in zip(transport.attempts, transport.attempts[1:])]
+    # Delay n is base * 2**(n-1), scaled by a jitter factor in [0.5, 1].
+    for n, gap in enumerate(gaps, start=1):
+        assert gap >= 0.05 * 2 ** (n - 1) * 0.5
+
+
+def test_retries_stop_after_max_attempts():
+    transport = FlakyTransport(failures=10)
+    stats = run(SmsQueue(transport, workers=1, max_attempts=3, backoff_base=0.01), ("+41000000002", "code"))
+    assert (stats["sent"], stats["retries"], stats["failed"]) == (0, 2, 1)
+    assert len(transport.attempts) == 3
+
+
+def test_permanent_errors_are_not_retried():
+    transport = FlakyTransport(failures=1, error=PermanentSendError)
+    stats = run(SmsQueue(transport, workers=1, backoff_base=0.01), ("+41000000003", "code"))
+    assert (stats["sent"], stats["retries"], stats["failed"]) == (0, 0, 1)
+
+
+def test_a_retrying_message_does_not_hold_up_the_queue():
+    # The first message waits in the retry heap; the second goes out meanwhile.
+    transport = FlakyTransport(failures=1)
+    stats = run(SmsQueue(transport, workers=1, backoff_base=0.5),
+                ("+41000000004", "flaky"), ("+41000000005", "next"))
+    assert [body for _, _, body in transport.sent] == ["next", "flaky"]
+    assert stats["sent"] == 2
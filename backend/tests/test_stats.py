@@ -0,0 +1,94 @@
+# test_stats.py
+#
+# /api/stats reads the trigger-maintained stats_daily rollup. Whatever path a
+# completion takes (finish, import, reopen and finish again, archiving), the
+# rollup must agree with a direct aggregate over the group's completed tasks.
+
+from datetime import datetime
+
+from archiver import TaskArchiver
+
+GROUP = "stats-test"
+
+
+def insert_task(app_module, title, creation_date, due_date, completed_by=None, completed_on=None):
+    with app_module.db_pool.connection() as conn:
+        task_id = conn.execute(
+            "INSERT INTO tasks (title, creation_date, due_date, completed, completed_by, completed_on, group_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (title, creation_date, due_date, int(completed_by is not None), completed_by, completed_on, GROUP)).lastrowid
+        conn.commit()
+    return task_id
+
+
+def direct_aggregate(app_module):
+    # Per user: (completed, overdue, average minutes from creation to completion).
+    with app_module.db_pool.connection() as conn:
+        rows = conn.execute("""
+            SELECT COALESCE(completed_by, assigned_to, ''), COUNT(*),
+                   SUM(COALESCE(completed_on > due_date, 0)),
+                   SUM(completed_on IS NOT NULL AND creation_date IS NOT NULL),
+                   SUM((strftime('%s', completed_on) - strftime('%s', creation_date)) / 60)
+            FROM tasks_all WHERE group_id = ? AND completed = 1
+            GROUP BY 1
+        """, (GROUP,)).fetchall()
+    return {username: (completed, overdue, minutes / timed if timed else None)
+            for username, completed, overdue, timed, minutes in rows}
+
+
+def api_stats(client):
+    response = client.get(f"/api/stats?group_id={GROUP}")
+    assert response.status_code == 200
+    return {u["username"]: (u["completed"], u["overdue"], u["avg_minutes"])
+            for u in response.json["users"] if u["completed"]}
+
+
+def finish(client, task_id, username):
+    assert client.post(f"/api/tasks/{task_id}/finish", json={"username": username}).status_code == 200
+
+
+def test_rollup_matches_direct_aggregate(app_module, client):
+    created = [client.post("/api/tasks", json={"title": f"stats {i}", "group_id": GROUP, "duration_hours": 24}).json["id"]
+               for i in range(4)]
+    finish(client, created[0], "otter")
+    finish(client, created[1], "otter")
+    finish(client, created[2], "beaver")
+    # Imported: overdue, and one without a completion date at all.
+    insert_task(app_module, "imported late", "2025-01-01T00:00:00", "2025-01-02T00:00:00",
+                "beaver", "2025-01-03T12:00:00")
+    insert_task(app_module, "imported undated", "2025-01-01T00:00:00", None, "otter")
+    # Old enough to be archived below.
+    archived = insert_task(app_module, "archived", "1999-12-01T00:00:00", "1999-12-02T00:00:00",
+                           "otter", "1999-12-03T00:00:00")
+    assert api_stats(client) == direct_aggregate(app_module)
+
+    # Reopen one of otter's tasks and let beaver finish it instead.
+    with app_module.db_pool.connection() as conn:
+        conn.execute("UPDATE tasks SET completed = 0, completed_by = NULL, completed_on = NULL WHERE id = ?",
+                     (created[1],))
+        conn.commit()
+    assert api_stats(client) == direct_aggregate(app_module)
+    finish(client, created[1], "beaver")
+    assert api_stats(client) == direct_aggregate(app_module)
+
+    assert TaskArchiver(app_module.db_pool.connection, max_age_days=90).run_once(now=datetime(2000, 6, 1)) == 1
+    with app_module.db_pool.connection() as conn:
+        assert conn.execute("SELECT 1 FROM tasks_archive WHERE id = ?", (archived,)).fetchone()
+    stats = api_stats(client)
+    assert stats == direct_aggregate(app_module)
+    assert {username: completed for username, (completed, _, _) in stats.items()} == {"otter": 3, "beaver": 3}
+    assert stats["beaver"][1] == 1
+
+
+def test_daily_window_and_open_tasks(app_module, client):
+    group = "stats-daily-test"
+    today = datetime.utcnow().date().isoformat()
+    ids = [client.post("/api/tasks", json={"title": f"daily {i}", "group_id": group, "duration_hours": 24}).json["id"]
+           for i in range(3)]
+    finish(client, ids[0], "otter")
+    body = client.get(f"/api/stats?group_id={group}&days=7").json
+    assert [(d["day"], d["completed"]) for d in body["daily"]] == [(today, 1)]
+    assert (body["open_tasks"], body["open_overdue"]) == (2, 0)
+    assert client.get(f"/api/stats?group_id={group}&username=beaver").json["users"] == []
+    assert client.get("/api/stats").status_code == 400
+    assert client.get(f"/api/stats?group_id={group}&days=x").status_code == 400
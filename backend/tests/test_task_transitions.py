@@ -0,0 +1,61 @@
+# test_task_transitions.py
+#
+# /join and /finish are single conditional UPDATE ... RETURNING statements, so
+# of several clients racing on the same task exactly one wins and all the
+# others get a 409.
+
+import threading
+
+import pytest
+
+RACERS = 8
+TASKS = 5
+
+
+def create_tasks(app_module, count):
+    with app_module.db_pool.connection() as conn:
+        ids = [conn.execute("INSERT INTO tasks (title, creation_date, due_date, group_id) "
+                            "VALUES (?, '2026-01-01', '2026-01-02', 'race')", (f"race {i}",)).lastrowid
+               for i in range(count)]
+        conn.commit()
+    return ids
+
+
+def race(app_module, path, task_ids):
+    # Every racer posts once per task, all of them released together.
+    barrier = threading.Barrier(RACERS)
+    results = {task_id: [] for task_id in task_ids}
+    lock = threading.Lock()
+
+    def run(n):
+        client = app_module.app.test_client()
+        barrier.wait()
+        for task_id in task_ids:
+            response = client.post(f"/api/tasks/{task_id}/{path}", json={"username": f"racer{n}"})
+            with lock:
+                results[task_id].append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(RACERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.mark.parametrize("path, column, conflict", [
+    ("join", "assigned_to", "Task is already assigned"),
+    ("finish", "completed_by", "Task is already completed"),
+])
+def test_racing_transitions_have_one_winner(app_module, path, column, conflict):
+    task_ids = create_tasks(app_module, TASKS)
+    results = race(app_module, path, task_ids)
+    with app_module.db_pool.connection() as conn:
+        stored = dict(conn.execute(f"SELECT id, {column} FROM tasks WHERE id IN ({','.join('?' * len(task_ids))})",
+                                   task_ids).fetchall())
+    for task_id, responses in results.items():
+        statuses = sorted(status for status, _ in responses)
+        assert statuses == [200] + [409] * (RACERS - 1), statuses
+        winner = next(body for status, body in responses if status == 200)
+        assert winner[column] == stored[task_id]
+        assert all(body == {"error": conflict} for status, body in responses if status == 409)
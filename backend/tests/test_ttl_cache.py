@@ -0,0 +1,51 @@
+# test_ttl_cache.py
+
+from ttl_cache import TTLCache
+
+
+def test_set_after_racing_invalidate_is_dropped():
+    cache = TTLCache(ttl=60)
+    generation = cache.generation("otter")
+    old_value = frozenset({"manage_sops"})  # read from the database
+    cache.invalidate("otter")               # permission revoked meanwhile
+    cache.set("otter", old_value, generation)
+    assert cache.get("otter") is None
+    assert cache.stats()["stale_sets"] == 1
+
+    generation = cache.generation("otter")
+    cache.set("otter", frozenset(), generation)
+    assert cache.get("otter") == frozenset()
+
+
+def test_set_after_racing_clear_is_dropped():
+    cache = TTLCache(ttl=60)
+    generation = cache.generation("otter")
+    cache.clear()
+    cache.set("otter", frozenset({"manage_sops"}), generation)
+    assert cache.get("otter") is None
+
+
+def test_other_keys_are_unaffected():
+    cache = TTLCache(ttl=60)
+    generation = cache.generation("otter")
+    cache.invalidate("weasel")
+    cache.set("otter", frozenset({"a"}), generation)
+    assert cache.get("otter") == frozenset({"a"})
+
+
+def test_revoked_permission_is_not_cached_for_the_ttl(app_module, monkeypatch):
+    # The invalidation lands while get_user_permissions() is reading.
+    cache = app_module.permission_cache
+    cache.invalidate("racer")
+    original_generation = cache.generation
+
+    def generation_then_revoke(key):
+        value = original_generation(key)
+        cache.invalidate(key)
+        return value
+
+    monkeypatch.setattr(cache, "generation", generation_then_revoke)
+    with app_module.app.app_context():
+        app_module.get_user_permissions("racer")
+    monkeypatch.undo()
+    assert cache.get("racer") is None
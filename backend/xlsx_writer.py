@@ -0,0 +1,238 @@
+# xlsx_writer.py
+#
+# Minimal streaming writer for Office Open XML spreadsheets (.xlsx).
+#
+# The worksheet XML is deflated into the zip entry row batch by row batch and
+# every compressed chunk is yielded as soon as it is produced, so a response
+# can start before the export is complete and the server never holds the
+# whole file. Strings are de-duplicated through the shared-strings table (up
+# to MAX_SHARED_STRINGS distinct values, after that they are written inline to
+# keep memory bounded). ISO timestamps in date columns become real date cells.
+
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+MAX_SHARED_STRINGS = 200_000
+EXCEL_EPOCH = datetime(1899, 12, 30)
+DATE_STYLE = 1  # index into cellXfs in STYLES_XML
+HEADER_STYLE = 2
+
+# XML 1.0 does not allow most control characters, not even escaped.
+_ILLEGAL_XML_CHARS = re.compile("[\\x00-\\x08\\x0b\\x0c\\x0e-\\x1f\\ufffe\\uffff]")
+
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '<Relationship Id="rId3" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+    'Target="sharedStrings.xml"/>'
+    '</Relationships>'
+)
+
+# cellXfs: 0 = default, 1 = date/time (same layout as the human_date filter), 2 = bold header
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="dd.mm.yyyy, hh:mm"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews>'
+    '<sheetData>'
+)
+SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+def column_letter(index: int) -> str:
+    # 0 -> A, 25 -> Z, 26 -> AA, ...
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def to_excel_date(value):
+    # Returns the Excel serial number for an ISO timestamp, or None.
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.replace(tzinfo=None)
+    delta = dt - EXCEL_EPOCH
+    return delta.days + delta.seconds / 86400 + delta.microseconds / 86400e6
+
+
+class _ChunkSink:
+    # Write-only, non-seekable file object: zipfile then streams entries with
+    # data descriptors, and we hand out whatever has been written so far.
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _SharedStrings:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.index = {}
+        self.count = 0
+
+    def lookup(self, value: str):
+        # Returns the shared-string index, or None once the table is full.
+        idx = self.index.get(value)
+        if idx is None:
+            if len(self.index) >= self.limit:
+                return None
+            idx = self.index[value] = len(self.index)
+        self.count += 1
+        return idx
+
+
+def _clean(value: str) -> str:
+    return escape(_ILLEGAL_XML_CHARS.sub("", value))
+
+
+def stream_xlsx(columns: list, row_batches, sheet_name: str = "Sheet1", date_columns=(),
+                max_shared_strings: int = MAX_SHARED_STRINGS):
+    # columns: header names. row_batches: iterable of lists of row tuples in
+    # column order. Yields the .xlsx file as a sequence of byte chunks.
+    sink = _ChunkSink()
+    shared = _SharedStrings(max_shared_strings)
+    letters = [column_letter(i) for i in range(len(columns))]
+    date_columns = set(date_columns)
+    date_idx = {i for i, name in enumerate(columns) if name in date_columns}
+
+    def cell_xml(col, row_num, value, style=0):
+        ref = f"{letters[col]}{row_num}"
+        s_attr = f' s="{style}"' if style else ""
+        if value is None or value == "":
+            return ""
+        if isinstance(value, bool):
+            return f'<c r="{ref}" t="b"{s_attr}><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float)):
+            return f'<c r="{ref}"{s_attr}><v>{value}</v></c>'
+        if col in date_idx and style == 0:
+            serial = to_excel_date(value)
+            if serial is not None:
+                return f'<c r="{ref}" s="{DATE_STYLE}"><v>{serial:.10f}</v></c>'
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", "replace")
+        value = str(value)
+        idx = shared.lookup(value)
+        if idx is not None:
+            return f'<c r="{ref}" t="s"{s_attr}><v>{idx}</v></c>'
+        return f'<c r="{ref}" t="inlineStr"{s_attr}><is><t xml:space="preserve">{_clean(value)}</t></is></c>'
+
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+        zf.writestr("_rels/.rels", ROOT_RELS_XML)
+        zf.writestr("xl/workbook.xml", WORKBOOK_XML.format(name=_clean(sheet_name[:31])))
+        zf.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS_XML)
+        zf.writestr("xl/styles.xml", STYLES_XML)
+        yield sink.drain()
+
+        with zf.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True) as sheet:
+            header = "".join(cell_xml(i, 1, name, HEADER_STYLE) for i, name in enumerate(columns))
+            sheet.write((SHEET_HEADER + f'<row r="1">{header}</row>').encode("utf-8"))
+            row_num = 1
+            for rows in row_batches:
+                parts = []
+                for row in rows:
+                    row_num += 1
+                    cells = "".join(cell_xml(i, row_num, value) for i, value in enumerate(row))
+                    parts.append(f'<row r="{row_num}">{cells}</row>')
+                sheet.write("".join(parts).encode("utf-8"))
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            sheet.write(SHEET_FOOTER.encode("utf-8"))
+        yield sink.drain()
+
+        with zf.open("xl/sharedStrings.xml", mode="w", force_zip64=True) as sst:
+            sst.write(
+                ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                 '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                 f'count="{shared.count}" uniqueCount="{len(shared.index)}">').encode("utf-8")
+            )
+            batch = []
+            # dicts keep insertion order, which is the shared-string index order
+            for value in shared.index:
+                batch.append(f'<si><t xml:space="preserve">{_clean(value)}</t></si>')
+                if len(batch) >= 1000:
+                    sst.write("".join(batch).encode("utf-8"))
+                    batch = []
+            batch.append("</sst>")
+            sst.write("".join(batch).encode("utf-8"))
+        yield sink.drain()
+    yield sink.drain()